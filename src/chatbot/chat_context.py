@@ -1,6 +1,10 @@
 import logging
-from typing import override, List, Any, Callable, Dict
-from uuid import UUID
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import override, List, Any, Callable, Dict, Iterator, Tuple
+from uuid import UUID, uuid4
 from threading import Lock
 from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.callbacks.manager import CallbackManager
@@ -9,17 +13,223 @@ from langchain_core.outputs import LLMResult
 from langchain_core.messages import ToolMessage
 from chatbot.config import config
 from chatbot.chat_history import ChatMessage
+from chatbot.services.llm_scheduler import Priority
+from chatbot.utils.metrics import Histogram
+from chatbot.utils.usage import TokenUsage, get_usage_ledger
+from chatbot.utils.waterfall import LatencySpan
+
+logger = logging.getLogger(__name__)
+
+# runs kept for the latency waterfall of a context, the oldest are forgotten beyond
+_MAX_SPANS = 1000
+_MAX_PARENT_RUNS = 10_000
+
+
+class CallRegistry:
+    """
+    Calls in progress, e.g. to tools or LLMs, and the latency of completed ones, per name.
+    Calls that never end, e.g. in cancelled or crashed runs, are forgotten after ttl_sec
+    or once max_calls are in progress, oldest first, and counted as orphaned.
+    Usage:
+         registry.start(run_id, "search_web")
+         tool_name = registry.end(run_id)
+         p95 = registry.get_stats()["latency_sec"]["search_web"]["p95"]
+    """
+
+    def __init__(self, max_calls: int = 256, ttl_sec: float = 600.0):
+        self._max_calls = max_calls
+        self._ttl_sec = ttl_sec
+        # name, start time and caller's data of the calls in progress, oldest first
+        self._calls: OrderedDict[UUID, Tuple[str, float, Any]] = OrderedDict()
+        self._latency_sec: Dict[str, Histogram] = {}
+        self._orphaned = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def start(self, run_id: UUID, name: str, data: Any = None) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            self._expire(now)
+            self._calls[run_id] = (name, now, data)
+            while len(self._calls) > self._max_calls:
+                self._forget_oldest()
+
+    def end(self, run_id: UUID) -> str | None:
+        """Returns the name of the call, or None if the call is unknown or was forgotten"""
+        call = self.finish(run_id)
+        return call[0] if call is not None else None
+
+    def finish(self, run_id: UUID) -> Tuple[str, float, Any] | None:
+        """Returns the name, duration (seconds) and data of the call, if known and not forgotten"""
+        with self._lock:
+            call = self._calls.pop(run_id, None)
+            if call is None:
+                return None
+            name, start_time, data = call
+            histogram = self._latency_sec.setdefault(name, Histogram())
+        duration_sec = time.perf_counter() - start_time
+        histogram.record(duration_sec)
+        return name, duration_sec, data
+
+    def _expire(self, now: float) -> None:
+        # calls are ordered by start time, so the expired ones come first
+        while self._calls:
+            _, start_time, _ = next(iter(self._calls.values()))
+            if now - start_time <= self._ttl_sec:
+                break
+            self._forget_oldest()
+
+    def _forget_oldest(self) -> None:
+        run_id, (name, _, _) = self._calls.popitem(last=False)
+        self._orphaned += 1
+        logger.debug(f"Forgot call {run_id} to {name}, which never ended")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the calls in progress, the orphaned calls, and the latency per name"""
+        with self._lock:
+            self._expire(time.perf_counter())
+            histograms = dict(self._latency_sec)
+            stats: Dict[str, Any] = {
+                "in_progress": len(self._calls),
+                "orphaned": self._orphaned,
+            }
+        stats["latency_sec"] = {
+            name: histogram.summary() for name, histogram in histograms.items()
+        }
+        return stats
 
 
 class ChatContext(BaseCallbackHandler):
     """Can be used to post status update messages to the UI"""
 
-    def __init__(self, status_update_func: Callable[[str], None] | None = None):
+    # status updates are cheap, so deliver them in order on the caller's thread, also in async runs
+    run_inline = True
+
+    def __init__(
+        self,
+        status_update_func: Callable[[str], None] | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline_sec: float | None = None,
+        conversation_id: str | None = None,
+    ):
         self._status_update_func = status_update_func
-        self._tool_call_registry: Dict[UUID, str] = {}
+        # scheduling class of the LLM requests made on behalf of this context
+        self.priority = priority
+        # time allowed for an answer, by default from the config file; enforced on LLM requests
+        # by the hedging wrapper, see llm_hedging in the config file
+        if deadline_sec is None:
+            deadline_sec = config.get_llm_hedging_config().get("deadline_sec")
+        self.deadline_sec = deadline_sec
+        # conversation to resume, e.g. after a restart, if the chatbot keeps conversations
+        self.conversation_id = conversation_id
+        # tool calls in progress, and their latency once completed
+        self.tool_calls = CallRegistry()
+        # LLM requests in progress, with their thread_id and chatbot name, and their latency per model
+        self.llm_calls = CallRegistry()
+        # tokens consumed on behalf of this context
+        self.usage = TokenUsage()
+        # timed steps of the answer, and the parent of every run, to nest steps in the waterfall
+        self._start_time = time.perf_counter()
+        self._spans: Dict[UUID, LatencySpan] = {}
+        self._parent_runs: Dict[UUID, UUID | None] = {}
         self._lock = Lock()
         self._verbose = config.get_log_level() == logging.DEBUG
 
+    def _start_span(
+        self, run_id: UUID, parent_run_id: UUID | None, name: str, kind: str
+    ) -> None:
+        now = time.perf_counter() - self._start_time
+        with self._lock:
+            self._add_parent_run(run_id, parent_run_id)
+            # nest under the closest timed ancestor, skipping the chains in between
+            depth = 0
+            while parent_run_id is not None:
+                parent_span = self._spans.get(parent_run_id)
+                if parent_span is not None:
+                    depth = parent_span.depth + 1
+                    break
+                parent_run_id = self._parent_runs.get(parent_run_id)
+            self._spans[run_id] = LatencySpan(
+                name=name, kind=kind, start_sec=now, depth=depth
+            )
+            if len(self._spans) > _MAX_SPANS:
+                del self._spans[next(iter(self._spans))]
+
+    def _add_parent_run(self, run_id: UUID, parent_run_id: UUID | None) -> None:
+        self._parent_runs[run_id] = parent_run_id
+        if len(self._parent_runs) > _MAX_PARENT_RUNS:
+            del self._parent_runs[next(iter(self._parent_runs))]
+
+    def _end_span(self, run_id: UUID, error: bool = False) -> None:
+        now = time.perf_counter() - self._start_time
+        with self._lock:
+            span = self._spans.get(run_id)
+            if span is not None and span.end_sec is None:
+                span.end_sec = now
+                span.error = error
+
+    @contextmanager
+    def measure(self, name: str, kind: str) -> Iterator[None]:
+        """Times a step of the answer that reports no callbacks, e.g. a vector store search"""
+        run_id = uuid4()
+        self._start_span(run_id, None, name, kind)
+        try:
+            yield
+        except BaseException:
+            self._end_span(run_id, error=True)
+            raise
+        self._end_span(run_id)
+
+    def get_waterfall(self) -> List[LatencySpan]:
+        """Returns the timed steps of the answer so far, in order of start time"""
+        now = time.perf_counter() - self._start_time
+        with self._lock:
+            # steps still in progress end now
+            spans = [
+                replace(span, end_sec=span.end_sec or now)
+                for span in self._spans.values()
+            ]
+        return sorted(spans, key=lambda span: span.start_sec)
+
+    @override
+    def on_chain_start(
+        self,
+        serialized: Dict[str, Any],
+        inputs: Dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Records the parent of chains, e.g. graph nodes, to nest the steps they make"""
+        with self._lock:
+            self._add_parent_run(run_id, parent_run_id)
+
+    @override
+    def on_retriever_start(
+        self,
+        serialized: Dict[str, Any],
+        query: str,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        **kwargs: Any,
+    ) -> None:
+        name = (serialized or {}).get("name", "retriever")
+        self._start_span(run_id, parent_run_id, name, "retrieval")
+
+    @override
+    def on_retriever_end(self, documents: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_span(run_id)
+
+    @override
+    def on_retriever_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end_span(run_id, error=True)
+
     @override
     def on_text(self, text: str, **kwargs: Any) -> None:
         """Updates status on demand from graph nodes"""
@@ -33,12 +243,21 @@ class ChatContext(BaseCallbackHandler):
 
     @override
     def on_tool_start(
-        self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        tags: List[str] | None = None,
+        **kwargs,
     ) -> None:
         """Updates status on tool call start"""
         tool_name = serialized.get("name", "tool")
-        with self._lock:
-            self._tool_call_registry[run_id] = tool_name
+        self.tool_calls.start(run_id, tool_name)
+        # calls to remote agents are tagged by their tools
+        kind = "a2a" if "a2a" in (tags or []) else "tool"
+        self._start_span(run_id, parent_run_id, tool_name, kind)
 
         max_output = 100
         args_str = input_str.strip("{}")
@@ -49,8 +268,8 @@ class ChatContext(BaseCallbackHandler):
     @override
     def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs) -> None:
         """Updates status on tool call end"""
-        with self._lock:
-            tool_name = self._tool_call_registry.pop(run_id, "tool")
+        self._end_span(run_id)
+        tool_name = self.tool_calls.end(run_id) or "tool"
 
         max_output = 100
         result_str = (
@@ -67,15 +286,30 @@ class ChatContext(BaseCallbackHandler):
         self, error: BaseException, *, run_id: UUID, **kwargs: Any
     ) -> None:
         """Updates status on tool call error"""
-        with self._lock:
-            name = self._tool_call_registry.pop(run_id, "tool")
+        self._end_span(run_id, error=True)
+        name = self.tool_calls.end(run_id) or "tool"
         self.update_status(f"❌ Failed {name}: {repr(error)}")
 
     @override
     def on_chat_model_start(
-        self, serialized: Dict[str, Any], messages: List[List[ChatMessage]], **kwargs
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[ChatMessage]],
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: Dict[str, Any] | None = None,
+        **kwargs,
     ):
         """Updates status on LLM request"""
+        metadata = metadata or {}
+        model_name = metadata.get("ls_model_name") or (serialized or {}).get(
+            "name", "LLM"
+        )
+        self._start_span(run_id, parent_run_id, model_name, "llm")
+        self.llm_calls.start(
+            run_id, model_name, (metadata.get("thread_id"), metadata.get("chatbot"))
+        )
         if not self._verbose:
             return
         self.update_status("=== CHAT REQUEST ===")
@@ -84,8 +318,18 @@ class ChatContext(BaseCallbackHandler):
                 self.update_status(f"{message.type.upper()}: {message.content}")
 
     @override
-    def on_llm_end(self, response: LLMResult, **kwargs):
+    def on_llm_new_token(self, token: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Records when the first token of a streamed LLM response arrived"""
+        with self._lock:
+            span = self._spans.get(run_id)
+            if span is not None and span.first_token_sec is None:
+                span.first_token_sec = time.perf_counter() - self._start_time
+
+    @override
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
         """Updates status on LLM response"""
+        self._end_span(run_id)
+        self._record_usage(response, run_id)
         if not self._verbose:
             return
         self.update_status("=== CHAT RESPONSE ===")
@@ -96,10 +340,39 @@ class ChatContext(BaseCallbackHandler):
                 self.update_status(content)
 
     @override
-    def on_llm_error(self, error: BaseException, **kwargs):
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
         """Updates status on LLM error"""
+        self._end_span(run_id, error=True)
+        self.llm_calls.end(run_id)
         self.update_status(f"❌ LLM failed: {repr(error)}")
 
+    def _record_usage(self, response: LLMResult, run_id: UUID) -> None:
+        """Accumulates the tokens of the response, for this context and process-wide"""
+        call = self.llm_calls.finish(run_id)
+        generation_sec, (thread_id, chatbot) = (
+            (call[1], call[2]) if call is not None else (0.0, (None, None))
+        )
+        usage = TokenUsage(requests=1, generation_sec=generation_sec)
+        for gens in response.generations:
+            for generation in gens:
+                usage_metadata = getattr(
+                    getattr(generation, "message", None), "usage_metadata", None
+                )
+                if usage_metadata:
+                    usage.input_tokens += usage_metadata.get("input_tokens", 0)
+                    usage.output_tokens += usage_metadata.get("output_tokens", 0)
+        if not usage.total_tokens:
+            # some integrations only report usage in the provider's own format
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            usage.input_tokens = token_usage.get("prompt_tokens", 0)
+            usage.output_tokens = token_usage.get("completion_tokens", 0)
+        if not usage.total_tokens:
+            # without token counts, the time would only dilute the throughput
+            usage.generation_sec = 0.0
+        with self._lock:
+            self.usage.add(usage)
+        get_usage_ledger().record(usage, thread_id=thread_id, chatbot=chatbot)
+
     def update_status(self, message: str) -> None:
         """Updates status with the provided message"""
         if self._status_update_func:
@@ -1,6 +1,6 @@
-from dataclasses import dataclass, field
 from enum import Enum
-from typing import List
+from threading import Lock
+from typing import Any, Dict, List, Tuple
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, BaseMessage
 
 
@@ -44,21 +44,238 @@ def get_last_message_from(messages: List[ChatMessage], role: ChatRole) -> ChatMe
     return filtered_messages[-1]
 
 
-@dataclass
+def estimate_tokens(message: ChatMessage) -> int:
+    """Estimates the prompt tokens taken by a message, without calling a tokenizer"""
+    text = str(message.content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        text += str(message.tool_calls)
+    # roughly 4 characters per token for English text, plus the message framing
+    return len(text) // 4 + 4
+
+
+_MESSAGE_TYPES = {
+    ChatRole.HUMAN.value: HumanMessage,
+    ChatRole.AI.value: AIMessage,
+    ChatRole.SYSTEM.value: SystemMessage,
+}
+
+
+class _MessageRecord:
+    """
+    Compact entry of the chat history, turned into a LangChain message when first read.
+    The converted message is kept until it leaves the prompt window, so that every turn
+    does not build the whole conversation again.
+    Messages carrying more than a role and content (e.g. tool calls or ids) are kept as they are.
+    """
+
+    __slots__ = ("type", "content", "tokens", "plain", "message")
+
+    def __init__(self, message: ChatMessage):
+        self.type: str = message.type
+        self.content: Any = message.content
+        self.tokens = estimate_tokens(message)
+        self.plain = self._is_plain(message)
+        self.message: ChatMessage | None = None if self.plain else message
+
+    @staticmethod
+    def _is_plain(message: ChatMessage) -> bool:
+        return (
+            type(message) is _MESSAGE_TYPES.get(message.type)
+            and not message.id
+            and not message.name
+            and not message.additional_kwargs
+            and not message.response_metadata
+            and not getattr(message, "tool_calls", None)
+            and not getattr(message, "invalid_tool_calls", None)
+            and not getattr(message, "usage_metadata", None)
+        )
+
+    def to_message(self) -> ChatMessage:
+        message = self.message
+        if message is None:
+            message = _MESSAGE_TYPES[self.type](content=self.content)
+            self.message = message
+        return message
+
+    def release(self) -> None:
+        """Drops the converted message, keeping only the compact record"""
+        if self.plain:
+            self.message = None
+
+
 class ChatHistory:
-    """Records the conversation messages"""
+    """
+    Records the conversation messages.
+    Messages are indexed by sender, so the latest message from a sender is found in O(1).
+    With a token budget, the window sent to the LLM keeps all system messages
+    and drops the oldest other messages until the prompt fits the budget.
+    The window only moves forward, so each added message costs O(1) amortised work.
+    Messages left out of the window can be replaced by a summary, e.g. by a MemoryCompactor.
+    Usage:
+         chat_history = ChatHistory(max_tokens=4000)
+         chat_history.add_message(user_message("Hi"))
+         answer = llm.invoke(chat_history.get_window())
+    """
 
-    messages: List[ChatMessage] = field(default_factory=list)
+    def __init__(
+        self, messages: List[ChatMessage] | None = None, max_tokens: int | None = None
+    ):
+        self.max_tokens = max_tokens
+        self._records: List[_MessageRecord] = []
+        # positions of the messages of each sender, in order
+        self._indices: Dict[str, List[int]] = {}
+        self._system_tokens = 0
+        # the window starts at this message, and holds this many non-system tokens
+        self._window_start = 0
+        self._window_tokens = 0
+        # summary of the messages before _summary_end, sent ahead of the window
+        self._summary: ChatMessage | None = None
+        self._summary_end = 0
+        self._summary_tokens = 0
+        # changes on clear, so that summaries of a cleared conversation are discarded
+        self._generation = 0
+        self._lock = Lock()
+        for message in messages or []:
+            self.add_message(message)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __repr__(self) -> str:
+        return f"ChatHistory(messages={len(self)}, max_tokens={self.max_tokens})"
+
+    @property
+    def messages(self) -> List[ChatMessage]:
+        """All messages of the conversation, e.g. for display"""
+        with self._lock:
+            records = list(self._records)
+        return [record.to_message() for record in records]
+
+    def get_transcript(self, limit: int | None = None) -> List[Tuple[str, Any]]:
+        """Returns the sender type and content of the latest messages (all by default), e.g. for display"""
+        with self._lock:
+            records = self._records[-limit:] if limit else self._records
+            return [(record.type, record.content) for record in records]
 
     def get_messages_from(self, role: ChatRole) -> List[ChatMessage]:
-        return get_messages_from(self.messages, role)
+        with self._lock:
+            records = [self._records[i] for i in self._indices.get(role.value, [])]
+        return [record.to_message() for record in records]
 
     def get_last_message_from(self, role: ChatRole) -> ChatMessage:
-        return get_last_message_from(self.messages, role)
+        with self._lock:
+            indices = self._indices.get(role.value)
+            assert indices
+            record = self._records[indices[-1]]
+        return record.to_message()
 
     def add_message(self, message: ChatMessage) -> None:
         """Appends a message to the back of the chat history"""
-        self.messages.append(message)
+        record = _MessageRecord(message)
+        with self._lock:
+            self._indices.setdefault(record.type, []).append(len(self._records))
+            self._records.append(record)
+            if record.type == ChatRole.SYSTEM.value:
+                self._system_tokens += record.tokens
+            else:
+                self._window_tokens += record.tokens
+
+    def get_window(self) -> List[ChatMessage]:
+        """Returns the messages to send to the LLM, within the token budget"""
+        with self._lock:
+            self._update_window()
+            dropped_system_records = [
+                self._records[i]
+                for i in self._indices.get(ChatRole.SYSTEM.value, [])
+                if i < self._window_start
+            ]
+            summary = [self._summary] if self._summary is not None else []
+            records = self._records[self._window_start :]
+        return (
+            [record.to_message() for record in dropped_system_records]
+            + summary
+            + [record.to_message() for record in records]
+        )
+
+    def get_window_tokens(self) -> int:
+        """Returns the estimated prompt tokens of the window"""
+        with self._lock:
+            self._update_window()
+            return self._system_tokens + self._summary_tokens + self._window_tokens
+
+    def get_messages_to_summarize(
+        self,
+    ) -> Tuple[ChatMessage | None, List[ChatMessage], int, int]:
+        """
+        Returns the current summary, the messages left out of the window since,
+        and the end index and generation to hand back to set_summary.
+        """
+        with self._lock:
+            self._update_window()
+            records = [
+                record
+                for record in self._records[self._summary_end : self._window_start]
+                if record.type != ChatRole.SYSTEM.value
+            ]
+            summary, end, generation = (
+                self._summary,
+                self._window_start,
+                self._generation,
+            )
+        return summary, [record.to_message() for record in records], end, generation
+
+    def set_summary(self, summary: ChatMessage, end: int, generation: int) -> bool:
+        """
+        Replaces the messages before end by the summary, in the windows returned from now on.
+        Returns False if the summary is outdated, e.g. the history was cleared meanwhile.
+        """
+        with self._lock:
+            if generation != self._generation or end <= self._summary_end:
+                return False
+            self._summary = summary
+            self._summary_end = end
+            self._summary_tokens = estimate_tokens(summary)
+            return True
+
+    def _update_window(self) -> None:
+        if self.max_tokens is None:
+            return
+
+        # drop the oldest messages, always keeping the latest one
+        last = len(self._records) - 1
+        dropped = False
+        while (
+            self._window_start < last
+            and self._system_tokens + self._summary_tokens + self._window_tokens
+            > self.max_tokens
+        ):
+            self._drop_oldest()
+            dropped = True
+        # an answer or tool result is meaningless without the question before it
+        while (
+            dropped
+            and self._window_start < last
+            and self._records[self._window_start].type
+            in (ChatRole.AI.value, ChatRole.TOOL.value)
+        ):
+            self._drop_oldest()
+
+    def _drop_oldest(self) -> None:
+        record = self._records[self._window_start]
+        if record.type != ChatRole.SYSTEM.value:
+            self._window_tokens -= record.tokens
+            # system messages are still sent, the others are rarely read once out of the window
+            record.release()
+        self._window_start += 1
 
     def clear(self) -> None:
-        self.messages.clear()
+        with self._lock:
+            self._records.clear()
+            self._indices.clear()
+            self._system_tokens = 0
+            self._window_start = 0
+            self._window_tokens = 0
+            self._summary = None
+            self._summary_end = 0
+            self._summary_tokens = 0
+            self._generation += 1
@@ -1,10 +1,15 @@
+import asyncio
 import importlib
 import inspect
+import time
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator
 from langchain_core.runnables import RunnableConfig
 from chatbot.chat_context import ChatContext
+from chatbot.services.checkpointer import SQLiteSaver
 from chatbot.testing.test_suite import TestSuite
+from chatbot.utils.event_loop import iterate_sync
 
 
 class BaseChatBot(ABC):
@@ -12,6 +17,10 @@ class BaseChatBot(ABC):
     Chatbot base class serving as blueprint for all implementations.
     """
 
+    # whether answers depend only on the question, with no state kept between calls,
+    # so that one instance can answer independent questions concurrently, e.g. in evaluations
+    stateless: bool = False
+
     @classmethod
     def get_name(cls) -> str:
         """Returns the name of the directory holding the implementation, e.g. exercises.00_intro"""
@@ -29,12 +38,36 @@ class BaseChatBot(ABC):
     def get_config(cls, ctx: ChatContext, thread_id: str | None = None):
         if thread_id is None:
             thread_id = cls.get_name()
+        # lets services tell requests apart, e.g. to schedule them by priority
+        metadata: Dict[str, Any] = {
+            "chatbot": cls.get_name(),
+            "priority": ctx.priority.value,
+        }
+        if ctx.deadline_sec is not None:
+            # absolute, so that it bounds the whole answer rather than each request
+            metadata["deadline"] = time.time() + ctx.deadline_sec
         return RunnableConfig(
             configurable={"thread_id": thread_id},
+            metadata=metadata,
             callbacks=[ctx],
             recursion_limit=100,
         )
 
+    @classmethod
+    def get_thread_id(cls, ctx: ChatContext, thread_id: str) -> str:
+        """Returns the thread of the conversation given by the context, if any, else thread_id"""
+        if ctx.conversation_id is None:
+            return thread_id
+        return f"{cls.get_name()}:{ctx.conversation_id}"
+
+    def resumes_conversations(self) -> bool:
+        """
+        Whether the chatbot remembers a conversation resumed via ChatContext.conversation_id,
+        e.g. after a restart. Otherwise only the UI shows the transcript of the conversation.
+        """
+        # agents keep their conversations in the checkpointer, on disk if so configured
+        return isinstance(getattr(self, "_checkpointer", None), SQLiteSaver)
+
     def reset(self) -> None:
         """
         Reset chatbot to initial state.
@@ -60,3 +93,29 @@ class BaseChatBot(ABC):
         Can use ctx to emit status updates, which will be displayed in the UI.
         """
         raise NotImplementedError
+
+    def stream_answer(self, question: str, ctx: ChatContext) -> Iterator[str]:
+        """
+        Produce the assistant's reply as a stream of text chunks, as they are generated.
+        By default, astream_answer is iterated over on the shared event loop.
+        """
+        yield from iterate_sync(self.astream_answer(question, ctx))
+
+    async def astream_answer(
+        self, question: str, ctx: ChatContext
+    ) -> AsyncIterator[str]:
+        """
+        Asynchronous counterpart of stream_answer, which implementations streaming their answer override.
+        By default, the complete answer is yielded as a single chunk.
+        """
+        yield await self.aget_answer(question, ctx)
+
+    async def aget_answer(self, question: str, ctx: ChatContext) -> str:
+        """
+        Asynchronous counterpart of get_answer, so that one event loop can serve many conversations.
+        By default, the chunks of astream_answer are joined, if overridden,
+        otherwise get_answer is run on a worker thread.
+        """
+        if type(self).astream_answer is BaseChatBot.astream_answer:
+            return await asyncio.to_thread(self.get_answer, question, ctx)
+        return "".join([chunk async for chunk in self.astream_answer(question, ctx)])
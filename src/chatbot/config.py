@@ -22,6 +22,16 @@ class Config:
             self._embeddings_config: Dict[str, Any] = config["embeddings_config"]
             self._vectordb_config: Dict[str, Any] = config["vectordb_config"]
             self._observability_config: Dict[str, Any] = config["observability_config"]
+            self._http_config: Dict[str, Any] = config.get("http_config") or {}
+            self._llm_cache_config: Dict[str, Any] = config.get("llm_cache") or {}
+            self._llm_routing_config: Dict[str, Any] = config.get("llm_routing") or {}
+            self._llm_hedging_config: Dict[str, Any] = config.get("llm_hedging") or {}
+            self._evaluation_config: Dict[str, Any] = config.get("evaluation") or {}
+            self._chat_history_config: Dict[str, Any] = config.get("chat_history") or {}
+            self._checkpointer_config: Dict[str, Any] = config.get("checkpointer") or {}
+            self._status_updates_config: Dict[str, Any] = (
+                config.get("status_updates") or {}
+            )
             self._log_level: str = config["log_level"]
 
     def get_llm_type(self) -> ServiceType:
@@ -30,6 +40,15 @@ class Config:
     def get_llm_config(self) -> Dict[str, Any]:
         return self._llm_config.copy()
 
+    def get_llm_cache_config(self) -> Dict[str, Any]:
+        return self._llm_cache_config.copy()
+
+    def get_llm_routing_config(self) -> Dict[str, Any]:
+        return self._llm_routing_config.copy()
+
+    def get_llm_hedging_config(self) -> Dict[str, Any]:
+        return self._llm_hedging_config.copy()
+
     def get_embeddings_type(self) -> ServiceType:
         return ServiceType(self._embeddings_config["type"])
 
@@ -45,6 +64,21 @@ class Config:
     def get_observability_config(self) -> Dict[str, Any]:
         return self._observability_config.copy()
 
+    def get_http_config(self) -> Dict[str, Any]:
+        return self._http_config.copy()
+
+    def get_evaluation_config(self) -> Dict[str, Any]:
+        return self._evaluation_config.copy()
+
+    def get_chat_history_config(self) -> Dict[str, Any]:
+        return self._chat_history_config.copy()
+
+    def get_checkpointer_config(self) -> Dict[str, Any]:
+        return self._checkpointer_config.copy()
+
+    def get_status_updates_config(self) -> Dict[str, Any]:
+        return self._status_updates_config.copy()
+
     def get_log_level(self) -> str:
         return self._log_level
 
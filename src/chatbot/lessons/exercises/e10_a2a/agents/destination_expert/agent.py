@@ -23,5 +23,8 @@ class _PlaceholderAgent:
     def invoke(self, *args, **kwargs):
         return {"messages": [AIMessage(content="I can't help you, not implemented!")]}
 
+    async def ainvoke(self, *args, **kwargs):
+        return self.invoke(*args, **kwargs)
+
 
 agent = _PlaceholderAgent()
@@ -1,6 +1,7 @@
-from typing import override
+from typing import AsyncIterator, override
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
+from chatbot.utils.event_loop import run_sync
 from chatbot.chat_history import user_message, system_message
 from chatbot.services.llm import LLM
 
@@ -9,6 +10,9 @@ from chatbot.services.llm import LLM
 class ChatBot(BaseChatBot):
     """Uses an LLM with system prompt"""
 
+    # each answer depends only on the question, so test cases can run concurrently
+    stateless = True
+
     def __init__(self):
         self._llm = LLM()
         # create a static system prompt
@@ -22,12 +26,20 @@ class ChatBot(BaseChatBot):
         Produce the assistant's reply to the provided user question.
         Can use ctx to emit status updates, which will be displayed in the UI.
         """
+        # run the asynchronous implementation on the shared event loop
+        return run_sync(self.aget_answer(question, ctx))
+
+    @override
+    async def astream_answer(
+        self, question: str, ctx: ChatContext
+    ) -> AsyncIterator[str]:
+        """
+        Produce the assistant's reply as a stream of text chunks, as they are generated, asynchronously.
+        Can use ctx to emit status updates, which will be displayed in the UI.
+        """
         ctx.update_status("🧠 Thinking...")
         # assemble chat history from the system message and user question
         messages = [system_message(self._system_prompt), user_message(question)]
-        # call the LLM
-        response = self._llm.invoke(messages, config=self.get_config(ctx))
-        # extract the answer
-        answer = str(response.content)
-
-        return answer
+        # call the LLM, yielding the text of each chunk as soon as it arrives
+        async for chunk in self._llm.astream(messages, config=self.get_config(ctx)):
+            yield chunk.text
@@ -1,8 +1,11 @@
-from typing import override
+from typing import AsyncIterator, override
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
+from chatbot.utils.event_loop import run_sync
 from chatbot.chat_history import ChatHistory, assistant_message, user_message
+from chatbot.config import config
 from chatbot.services.llm import LLM
+from chatbot.services.memory_compactor import MemoryCompactor
 
 
 # Chat bot implementation
@@ -11,8 +14,17 @@ class ChatBot(BaseChatBot):
 
     def __init__(self):
         self._llm = LLM()
-        # create a chat history object to keep track of conversation messages
-        self._chat_history = ChatHistory()
+        # create a chat history object to keep track of conversation messages,
+        # sending only the most recent ones that fit the prompt token budget
+        chat_history_config = config.get_chat_history_config()
+        self._chat_history = ChatHistory(
+            max_tokens=chat_history_config.get("max_prompt_tokens")
+        )
+        # summarize the messages left out of the prompt, without delaying answers
+        summary_config = chat_history_config.get("summary") or {}
+        self._compactor = (
+            MemoryCompactor(self._llm) if summary_config.get("enabled", False) else None
+        )
 
     @override
     def reset(self) -> None:
@@ -25,17 +37,28 @@ class ChatBot(BaseChatBot):
         Produce the assistant's reply to the provided user question.
         Can use ctx to emit status updates, which will be displayed in the UI.
         """
+        # run the asynchronous implementation on the shared event loop
+        return run_sync(self.aget_answer(question, ctx))
+
+    @override
+    async def astream_answer(
+        self, question: str, ctx: ChatContext
+    ) -> AsyncIterator[str]:
+        """
+        Produce the assistant's reply as a stream of text chunks, as they are generated, asynchronously.
+        Can use ctx to emit status updates, which will be displayed in the UI.
+        """
         ctx.update_status("🧠 Thinking...")
         # record question in chat history
         self._chat_history.add_message(user_message(question))
-        # call the LLM with all historic messages
-        response = self._llm.invoke(
-            self._chat_history.messages, config=self.get_config(ctx)
-        )
-        # extract the answer
-        answer = str(response.content)
-        # record answer in chat history
-        # bonus: prune this to the last 5 question-answer pairs
+        # call the LLM with the recent historic messages, streaming the answer
+        answer = ""
+        async for chunk in self._llm.astream(
+            self._chat_history.get_window(), config=self.get_config(ctx)
+        ):
+            answer += chunk.text
+            yield chunk.text
+        # record the complete answer in chat history
         self._chat_history.add_message(assistant_message(answer))
-
-        return answer
+        if self._compactor:
+            self._compactor.compact_in_background(self._chat_history)
@@ -1,8 +1,9 @@
 import logging
 from pathlib import Path
-from typing import override
+from typing import AsyncIterator, List, override
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
+from chatbot.utils.event_loop import run_sync
 from chatbot.chat_history import (
     ChatHistory,
     assistant_message,
@@ -58,34 +59,49 @@ class ChatBot(BaseChatBot):
         """Reset chatbot to initial state"""
         self._chat_history.clear()
 
-    @override
-    def get_answer(self, question: str, ctx: ChatContext) -> str:
-        """
-        Produce the assistant's reply to the provided user question.
-        Can use ctx to emit status updates, which will be displayed in the UI.
-        """
-        ctx.update_status("🧠 Thinking...")
-        # search the vector store for the top 10 relevant chunks
-        relevant_chunks = self._vectordb.similarity_search(question, k=10)
+    @staticmethod
+    def _augment_question(question: str, relevant_chunks: List[Document]) -> str:
+        """Augments the user question with the retrieved context"""
         logger.info(
             f"Retrieved {len(relevant_chunks)} chunks relevant to the query:{''.join(f'\nChunk {doc.metadata["paragraph"]}: {doc.page_content[:30]}' for doc in relevant_chunks)}"
         )
-        # augment the user question with the retrieved context
-        augmented_question = f"""Answer the following question using ONLY the information in the numbered paragraphs below.
+        return f"""Answer the following question using ONLY the information in the numbered paragraphs below.
 You MUST cite which paragraph number(s) you used in your answer (e.g., "According to paragraph 3..."). If the answer is not in any paragraph, say 'I cannot answer based on the provided context.'
 
 {"\n\n".join(f"{doc.metadata['paragraph']}. {doc.page_content}" for doc in relevant_chunks)}
 
 Question: {question}"""
-        # call the LLM with the augmented question and all historic messages
-        response = self._llm.invoke(
-            self._chat_history.messages + [augmented_question],
+
+    @override
+    def get_answer(self, question: str, ctx: ChatContext) -> str:
+        """
+        Produce the assistant's reply to the provided user question.
+        Can use ctx to emit status updates, which will be displayed in the UI.
+        """
+        # run the asynchronous implementation on the shared event loop
+        return run_sync(self.aget_answer(question, ctx))
+
+    @override
+    async def astream_answer(
+        self, question: str, ctx: ChatContext
+    ) -> AsyncIterator[str]:
+        """
+        Produce the assistant's reply as a stream of text chunks, as they are generated, asynchronously.
+        Can use ctx to emit status updates, which will be displayed in the UI.
+        """
+        ctx.update_status("🧠 Thinking...")
+        # search the vector store for the top 10 relevant chunks
+        with ctx.measure("vector store search", "retrieval"):
+            relevant_chunks = await self._vectordb.asimilarity_search(question, k=10)
+        augmented_question = self._augment_question(question, relevant_chunks)
+        # call the LLM with the augmented question and all historic messages, streaming the answer
+        answer = ""
+        async for chunk in self._llm.astream(
+            self._chat_history.get_window() + [augmented_question],
             config=self.get_config(ctx),
-        )
-        # extract the answer
-        answer = str(response.content)
-        # record original question and answer in chat history
+        ):
+            answer += chunk.text
+            yield chunk.text
+        # record original question and complete answer in chat history
         self._chat_history.add_message(user_message(question))
         self._chat_history.add_message(assistant_message(answer))
-
-        return answer
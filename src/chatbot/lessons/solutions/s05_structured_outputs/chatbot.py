@@ -1,6 +1,7 @@
 from typing import override
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
+from chatbot.utils.event_loop import run_sync
 from chatbot.chat_history import ChatHistory, user_message, assistant_message
 from chatbot.services.llm import LLM
 from pydantic import BaseModel
@@ -35,12 +36,21 @@ class ChatBot(BaseChatBot):
         Produce the assistant's reply to the provided user question.
         Can use ctx to emit status updates, which will be displayed in the UI.
         """
+        # run the asynchronous implementation on the shared event loop
+        return run_sync(self.aget_answer(question, ctx))
+
+    @override
+    async def aget_answer(self, question: str, ctx: ChatContext) -> str:
+        """
+        Produce the assistant's reply to the provided user question, asynchronously.
+        Can use ctx to emit status updates, which will be displayed in the UI.
+        """
         ctx.update_status("🧠 Thinking...")
         # record question in chat history
         self._chat_history.add_message(user_message(question))
-        # call the LLM with all historic messages
-        response = self._llm_structured.invoke(
-            self._chat_history.messages, config=self.get_config(ctx)
+        # call the LLM with all historic messages, without blocking the event loop
+        response = await self._llm_structured.ainvoke(
+            self._chat_history.get_window(), config=self.get_config(ctx)
         )
         # the output should be an instance of Person
         if not isinstance(response, Person):
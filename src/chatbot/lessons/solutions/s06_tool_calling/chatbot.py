@@ -3,14 +3,16 @@ import requests
 from enum import Enum
 import datetime
 from zoneinfo import ZoneInfo
-from typing import override
+from typing import AsyncIterator, override
 from langchain_core.tools import tool
 from langchain.agents import create_agent
 from langchain.messages import HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph.state import CompiledStateGraph
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
+from chatbot.utils.event_loop import run_sync
+from chatbot.services.agent import astream_answer_text
+from chatbot.services.checkpointer import create_checkpointer
 from chatbot.services.llm import LLM
 
 
@@ -70,16 +72,19 @@ class ChatBot(BaseChatBot):
         tools = [convert_time, convert_currency]
         # predefined tool calling agent in LangGraph
         # it resolves tool calls in a loop until none are requested
-        # MemorySaver checkpointer automatically manages conversation history
+        # the checkpointer automatically manages conversation history
+        # like MemorySaver, but forgetting the least recently used conversations beyond its limits
+        self._checkpointer = create_checkpointer()
         self._agent: CompiledStateGraph = create_agent(
-            model=llm, tools=tools, checkpointer=MemorySaver()
+            model=llm, tools=tools, checkpointer=self._checkpointer
         )
         self._thread_id = str(uuid.uuid4())
 
     @override
     def reset(self) -> None:
         """Reset chatbot to initial state"""
-        # Generate new thread ID to start fresh conversation
+        # Free the abandoned conversation, and generate new thread ID to start fresh
+        self._checkpointer.delete_thread(self._thread_id)
         self._thread_id = str(uuid.uuid4())
 
     @override
@@ -88,19 +93,32 @@ class ChatBot(BaseChatBot):
         Produce the assistant's reply to the provided user question.
         Can use ctx to emit status updates, which will be displayed in the UI.
         """
+        # run the asynchronous implementation on the shared event loop
+        return run_sync(self.aget_answer(question, ctx))
+
+    @override
+    async def astream_answer(
+        self, question: str, ctx: ChatContext
+    ) -> AsyncIterator[str]:
+        """
+        Produce the assistant's reply as a stream of text chunks, as they are generated, asynchronously.
+        Can use ctx to emit status updates, which will be displayed in the UI.
+        """
         ctx.update_status("🧠 Thinking...")
-        # Call the agent with new message
+        # Call the agent with new message, streaming the LLM tokens as they are generated
         # Checkpointer automatically loads previous messages and saves new ones
         # also pass ctx so that the agent can publish status updates on tool calls to the UI
-        response = self._agent.invoke(
-            {"messages": [HumanMessage(content=question)]},
-            config={
-                **self.get_config(ctx),
-                "configurable": {"thread_id": self._thread_id},
-            },
-        )
-        # extract the answer
-        # multiple messages may have been generated, the last one is the final response
-        answer = str(response["messages"][-1].content)
-
-        return answer
+        # only the final answer of the model is forwarded, not tool calls nor their results
+        async for chunk in astream_answer_text(
+            self._agent.astream(
+                {"messages": [HumanMessage(content=question)]},
+                config={
+                    **self.get_config(ctx),
+                    "configurable": {
+                        "thread_id": self.get_thread_id(ctx, self._thread_id)
+                    },
+                },
+                stream_mode="messages",
+            )
+        ):
+            yield chunk
@@ -4,9 +4,10 @@ from langchain_core.messages import HumanMessage
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph
-from langgraph.checkpoint.memory import MemorySaver
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
+from chatbot.utils.event_loop import run_sync
+from chatbot.services.checkpointer import create_checkpointer
 from .author import author
 from .reviewer import reviewer
 from .state import GraphState
@@ -40,6 +41,8 @@ class ChatBot(BaseChatBot):
     """Uses an LLM in a custom graph"""
 
     def __init__(self):
+        # in-memory conversation state, forgetting the least recently used conversations
+        self._checkpointer = create_checkpointer()
         # model behavior based on a custom graph
         self._agent = self._build_agent()
         self._thread_id = str(uuid.uuid4())
@@ -59,12 +62,13 @@ class ChatBot(BaseChatBot):
             "UpdateIteration", _end_condition, {"continue": "Author", "finish": END}
         )
         # build graph with checkpointer for conversation memory
-        return graph_builder.compile(checkpointer=MemorySaver())
+        return graph_builder.compile(checkpointer=self._checkpointer)
 
     @override
     def reset(self) -> None:
         """Reset chatbot to initial state"""
-        # Generate new thread ID to start fresh conversation
+        # Free the abandoned conversation, and generate new thread ID to start fresh
+        self._checkpointer.delete_thread(self._thread_id)
         self._thread_id = str(uuid.uuid4())
 
     @override
@@ -73,6 +77,15 @@ class ChatBot(BaseChatBot):
         Produce the assistant's reply to the provided user question.
         Can use ctx to emit status updates, which will be displayed in the UI.
         """
+        # run the asynchronous implementation on the shared event loop
+        return run_sync(self.aget_answer(question, ctx))
+
+    @override
+    async def aget_answer(self, question: str, ctx: ChatContext) -> str:
+        """
+        Produce the assistant's reply to the provided user question, asynchronously.
+        Can use ctx to emit status updates, which will be displayed in the UI.
+        """
         ctx.update_status("🧠 Thinking...")
 
         # Create the initial state with new user message
@@ -80,12 +93,12 @@ class ChatBot(BaseChatBot):
         initial_state = GraphState(
             messages=[HumanMessage(content=question)], feedback="create the first draft"
         )
-        # Invoke the graph with thread_id for conversation memory
-        final_state = self._agent.invoke(
+        # Invoke the graph with thread_id for conversation memory, without blocking the event loop
+        final_state = await self._agent.ainvoke(
             initial_state,
             config={
                 **self.get_config(ctx),
-                "configurable": {"thread_id": self._thread_id},
+                "configurable": {"thread_id": self.get_thread_id(ctx, self._thread_id)},
             },
         )
         # Extract the answer from the text field of the final state
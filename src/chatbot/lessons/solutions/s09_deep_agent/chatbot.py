@@ -1,12 +1,14 @@
 import uuid
 from pathlib import Path
-from typing import override
+from typing import AsyncIterator, override
 from deepagents import create_deep_agent
 from deepagents.backends import LocalShellBackend
 from langchain_core.messages import HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
+from chatbot.utils.event_loop import run_sync
+from chatbot.services.agent import astream_answer_text
+from chatbot.services.checkpointer import create_checkpointer
 from chatbot.services.llm import LLM
 
 
@@ -26,20 +28,23 @@ class ChatBot(BaseChatBot):
 
         # Create the DeepAgent with loaded skills
         # LocalShellBackend provides filesystem access (rooted at root_path)
-        # MemorySaver provides in-memory conversation history management
+        # the checkpointer provides in-memory conversation history management
+        # like MemorySaver, but forgetting the least recently used conversations beyond its limits
+        self._checkpointer = create_checkpointer()
         self._agent = create_deep_agent(
             model=llm,
             skills=[skills_path],
             backend=LocalShellBackend(root_dir=root_path, virtual_mode=True),
             system_prompt="Always use a skill when one matches the user's request.",
-            checkpointer=MemorySaver(),
+            checkpointer=self._checkpointer,
         )
         self._thread_id = str(uuid.uuid4())
 
     @override
     def reset(self) -> None:
         """Reset chatbot to initial state"""
-        # Generate new thread ID to start fresh conversation
+        # Free the abandoned conversation, and generate new thread ID to start fresh
+        self._checkpointer.delete_thread(self._thread_id)
         self._thread_id = str(uuid.uuid4())
 
     @override
@@ -48,18 +53,32 @@ class ChatBot(BaseChatBot):
         Produce the assistant's reply to the provided user question.
         Can use ctx to emit status updates, which will be displayed in the UI.
         """
+        # run the asynchronous implementation on the shared event loop
+        return run_sync(self.aget_answer(question, ctx))
+
+    @override
+    async def astream_answer(
+        self, question: str, ctx: ChatContext
+    ) -> AsyncIterator[str]:
+        """
+        Produce the assistant's reply as a stream of text chunks, as they are generated, asynchronously.
+        Can use ctx to emit status updates, which will be displayed in the UI.
+        """
         ctx.update_status("🧠 Thinking...")
 
-        # Call DeepAgent with new message
+        # Call DeepAgent with new message, streaming the LLM tokens as they are generated
         # Checkpointer automatically manages conversation history
-        result = self._agent.invoke(
-            {"messages": [HumanMessage(content=question)]},
-            config={
-                **self.get_config(ctx),
-                "configurable": {"thread_id": self._thread_id},
-            },
-        )
-        # Extract final answer from the last message
-        answer = str(result["messages"][-1].content)
-
-        return answer
+        # only the final answer of the model is forwarded, not tool calls nor their results
+        async for chunk in astream_answer_text(
+            self._agent.astream(
+                {"messages": [HumanMessage(content=question)]},
+                config={
+                    **self.get_config(ctx),
+                    "configurable": {
+                        "thread_id": self.get_thread_id(ctx, self._thread_id)
+                    },
+                },
+                stream_mode="messages",
+            )
+        ):
+            yield chunk
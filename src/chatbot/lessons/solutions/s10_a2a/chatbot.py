@@ -3,13 +3,15 @@
 import uuid
 import yaml
 from pathlib import Path
-from typing import override
+from typing import AsyncIterator, override
 from langchain.agents import create_agent
 from langchain.messages import HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph.state import CompiledStateGraph
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
+from chatbot.utils.event_loop import run_sync
+from chatbot.services.agent import astream_answer_text
+from chatbot.services.checkpointer import create_checkpointer
 from chatbot.services.llm import LLM
 from chatbot.utils.a2a import create_tools_from_a2a_agent_skills
 
@@ -31,18 +33,21 @@ class ChatBot(BaseChatBot):
         # The LLM decides which to consult based on the user's question
         system_prompt = "You are an orchestrator with access to expert agents. Always delegate questions to the appropriate expert(s) and base your response solely on their answers."
 
+        # in-memory conversation state, forgetting the least recently used conversations
+        self._checkpointer = create_checkpointer()
         self._agent: CompiledStateGraph = create_agent(
             model=llm,
             tools=tools,
             system_prompt=system_prompt,
-            checkpointer=MemorySaver(),
+            checkpointer=self._checkpointer,
         )
         self._thread_id = str(uuid.uuid4())
 
     @override
     def reset(self) -> None:
         """Reset chatbot to initial state"""
-        # Generate new thread ID to start fresh conversation
+        # Free the abandoned conversation, and generate new thread ID to start fresh
+        self._checkpointer.delete_thread(self._thread_id)
         self._thread_id = str(uuid.uuid4())
 
     @override
@@ -51,19 +56,33 @@ class ChatBot(BaseChatBot):
         Produce the assistant's reply to the provided user question.
         Can use ctx to emit status updates, which will be displayed in the UI.
         """
+        # run the asynchronous implementation on the shared event loop
+        return run_sync(self.aget_answer(question, ctx))
+
+    @override
+    async def astream_answer(
+        self, question: str, ctx: ChatContext
+    ) -> AsyncIterator[str]:
+        """
+        Produce the assistant's reply as a stream of text chunks, as they are generated, asynchronously.
+        Can use ctx to emit status updates, which will be displayed in the UI.
+        """
         ctx.update_status("🧠 Thinking...")
 
-        # Call orchestrator agent
+        # Call orchestrator agent, streaming the LLM tokens as they are generated
         # The agent will decide which expert(s) to consult via A2A
         # Checkpointer automatically manages conversation history
-        result = self._agent.invoke(
-            {"messages": [HumanMessage(content=question)]},
-            config={
-                **self.get_config(ctx),
-                "configurable": {"thread_id": self._thread_id},
-            },
-        )
-
-        # Extract final answer
-        answer = str(result["messages"][-1].content)
-        return answer
+        # only the final answer of the model is forwarded, not tool calls nor their results
+        async for chunk in astream_answer_text(
+            self._agent.astream(
+                {"messages": [HumanMessage(content=question)]},
+                config={
+                    **self.get_config(ctx),
+                    "configurable": {
+                        "thread_id": self.get_thread_id(ctx, self._thread_id)
+                    },
+                },
+                stream_mode="messages",
+            )
+        ):
+            yield chunk
@@ -1,6 +1,7 @@
-"""Agent protocol for type checking."""
+"""Agent protocol for type checking, and extraction of the answers of LangGraph agents."""
 
-from typing import Any, Protocol
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Protocol, Tuple, cast
+from langchain_core.messages import AIMessageChunk
 
 
 class AgentProtocol(Protocol):
@@ -17,3 +18,43 @@ class AgentProtocol(Protocol):
         and simple placeholder agents.
         """
         ...
+
+    async def ainvoke(self, *args: Any, **kwargs: Any) -> Any:
+        """Invoke the agent asynchronously, e.g. on the event loop of the A2A server."""
+        ...
+
+
+async def astream_answer_text(stream: AsyncIterable[Any]) -> AsyncIterator[str]:
+    """
+    Yields the text of the final model turn of an agent streamed by astream() with stream_mode="messages",
+    i.e. the last message that get_answer returns, leaving out tool results and subagents.
+    A turn is forwarded once it is complete, as a turn that calls tools is not an answer,
+    even if the model wrote some text before the tool calls.
+    """
+    current_turn: str | None = None
+    texts: List[str] = []
+    has_tool_calls = False
+    async for item in stream:
+        chunk, metadata = cast(Tuple[Any, Dict[str, Any]], item)
+        # subgraphs, e.g. subagents, run in nested namespaces
+        namespace = str(metadata.get("langgraph_checkpoint_ns", ""))
+        if (
+            not isinstance(chunk, AIMessageChunk)
+            or metadata.get("langgraph_node") != "model"
+            or "|" in namespace
+        ):
+            continue
+        if chunk.id != current_turn:
+            # a new model turn, e.g. after a tool call
+            if not has_tool_calls:
+                for text in texts:
+                    yield text
+            current_turn = chunk.id
+            texts = []
+            has_tool_calls = False
+        has_tool_calls = has_tool_calls or bool(chunk.tool_call_chunks)
+        if chunk.text:
+            texts.append(chunk.text)
+    if not has_tool_calls:
+        for text in texts:
+            yield text
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import Any, Dict, List
+from langchain_core.embeddings import Embeddings as BaseEmbeddingsModel
+from chatbot.config import config, ServiceType
+from chatbot.utils.metrics import Histogram
+from .local_embeddings import LocalEmbeddings
+from .remote_embeddings import RemoteEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingQuery:
+    text: str
+    enqueue_time: float = field(default_factory=time.perf_counter)
+    result: Future = field(default_factory=Future)
+
+
+class EmbeddingsBatcher:
+    """
+    Collects single-text queries submitted from many threads and sends them
+    to the embeddings service as one batched request.
+    A batch is dispatched when it reaches max_batch_size, or max_wait_sec
+    after its first query arrived, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        embeddings: BaseEmbeddingsModel,
+        max_batch_size: int = 32,
+        max_wait_sec: float = 0.005,
+    ):
+        self._embeddings = embeddings
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait_sec = max(0.0, max_wait_sec)
+        self._queue: Queue[_PendingQuery] = Queue()
+        self._queue_wait = Histogram()
+        self._batch_size = Histogram()
+        self._worker: Thread | None = None
+        self._lock = Lock()
+
+    @property
+    def embeddings(self) -> BaseEmbeddingsModel:
+        return self._embeddings
+
+    def submit(self, text: str) -> Future:
+        """Enqueues a query, returning a future resolving to its embedding"""
+        self._ensure_worker()
+        query = _PendingQuery(text=text)
+        self._queue.put(query)
+        return query.result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns queue-wait (seconds) and batch-size metrics"""
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_wait_sec": self._queue_wait.summary(),
+            "batch_size": self._batch_size.summary(),
+        }
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None:
+                self._worker = Thread(
+                    target=self._run, name="embeddings-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self) -> List[_PendingQuery]:
+        # block until the first query arrives, then fill the batch until the window closes
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueue_time + self._max_wait_sec
+        while len(batch) < self._max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            dispatch_time = time.perf_counter()
+            for query in batch:
+                self._queue_wait.record(dispatch_time - query.enqueue_time)
+            self._batch_size.record(len(batch))
+            try:
+                vectors = self._embeddings.embed_documents([q.text for q in batch])
+            except Exception as e:
+                logger.debug(f"Batched embeddings request failed: {repr(e)}")
+                for query in batch:
+                    query.result.set_exception(e)
+                continue
+            if len(vectors) != len(batch):
+                # vectors cannot be matched to queries, and callers would wait forever
+                error = RuntimeError(
+                    f"Embeddings service returned {len(vectors)} vectors for {len(batch)} texts"
+                )
+                logger.warning(repr(error))
+                for query in batch:
+                    query.result.set_exception(error)
+                continue
+            for query, vector in zip(batch, vectors):
+                query.result.set_result(vector)
+
+
+_shared_batcher: EmbeddingsBatcher | None = None
+_shared_batcher_lock = Lock()
+
+
+def get_shared_batcher() -> EmbeddingsBatcher:
+    """Returns the process-wide batcher for the configured embeddings service"""
+    global _shared_batcher
+    with _shared_batcher_lock:
+        if _shared_batcher is None:
+            # fetch service configuration from the config file
+            service_config = config.get_embeddings_config()
+            batching_config = service_config.get("batching") or {}
+            embeddings = (
+                LocalEmbeddings()
+                if config.get_embeddings_type() == ServiceType.LOCAL
+                else RemoteEmbeddings()
+            )
+            _shared_batcher = EmbeddingsBatcher(
+                embeddings,
+                max_batch_size=batching_config.get("max_batch_size", 32),
+                max_wait_sec=batching_config.get("max_wait_ms", 5) / 1000,
+            )
+        return _shared_batcher
+
+
+def get_batching_stats() -> Dict[str, Any]:
+    """Returns the metrics of the shared batcher, or nothing if it was not used"""
+    with _shared_batcher_lock:
+        batcher = _shared_batcher
+    return batcher.get_stats() if batcher is not None else {}
+
+
+class BatchedEmbeddings(BaseEmbeddingsModel):
+    """Coalesces concurrent embed_query calls into batched embed_documents requests
+    Usage:
+         embeddings_service = BatchedEmbeddings()
+         text = "Hi"
+         embeddings = embeddings_service.embed_query(text)
+         stats = embeddings_service.get_stats()
+    """
+
+    def __init__(self, batcher: EmbeddingsBatcher | None = None):
+        # by default, all instances share one batcher, so queries coalesce across callers
+        self._batcher = batcher or get_shared_batcher()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # already a batch, send it as is
+        return self._batcher.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._batcher.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._batcher.submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self._batcher.submit(text))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns queue-wait and batch-size metrics of the shared batcher"""
+        return self._batcher.get_stats()
@@ -0,0 +1,653 @@
+"""
+LangGraph checkpointers: in memory with bounded memory use, or durable in SQLite.
+
+InMemorySaver keeps the checkpoints of every conversation (thread) forever,
+so a long-running server grows with every conversation and every chatbot reset.
+BoundedMemorySaver forgets whole threads, least recently used first, beyond a thread count
+or a total size, and frees a thread at once when a chatbot abandons it.
+SQLiteSaver keeps conversations across restarts, storing the messages
+appended at each step rather than a full copy of the conversation.
+Usage:
+     checkpointer = create_checkpointer()
+     agent = create_agent(model=llm, tools=tools, checkpointer=checkpointer)
+     ...
+     checkpointer.delete_thread(thread_id)
+"""
+
+import asyncio
+import logging
+import random
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock, RLock
+from typing import Any, AsyncIterator, Dict, Iterator, List, Sequence, Set, Tuple
+from weakref import WeakSet
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from chatbot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    Drop-in replacement for MemorySaver, evicting whole threads by LRU and by total size.
+    The thread being written to is never evicted, even if it exceeds the size on its own.
+    """
+
+    def __init__(self, max_threads: int = 1000, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__()
+        self._max_threads = max(1, max_threads)
+        self._max_bytes = max_bytes
+        self._lock = RLock()
+        # serialized size of each thread's checkpoints, least recently used first
+        self._threads: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        # keys of each thread's entries, so that a thread is deleted without a full scan
+        self._blob_keys: Dict[str, List[Tuple[str, str, str, Any]]] = {}
+        self._write_keys: Dict[str, Set[Tuple[str, str, str]]] = {}
+        self._stats = {"evicted_threads": 0, "deleted_threads": 0}
+        _savers.add(self)
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config.get("configurable", {})["thread_id"]
+        with self._lock:
+            result = super().get_tuple(config)
+            if thread_id in self._threads:
+                self._threads.move_to_end(thread_id)
+            else:
+                # looking up an unknown thread leaves an empty entry behind
+                self.storage.pop(thread_id, None)
+            return result
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config.get("configurable", {})
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable["checkpoint_ns"]
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            saved, saved_metadata, _ = self.storage[thread_id][checkpoint_ns][
+                checkpoint["id"]
+            ]
+            size = len(saved[1]) + len(saved_metadata[1])
+            blob_keys = self._blob_keys.setdefault(thread_id, [])
+            for channel, version in new_versions.items():
+                key = (thread_id, checkpoint_ns, channel, version)
+                blob_keys.append(key)
+                size += len(self.blobs[key][1])
+            self._record(thread_id, size)
+            return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config.get("configurable", {})
+        thread_id = configurable["thread_id"]
+        key = (
+            thread_id,
+            configurable.get("checkpoint_ns", ""),
+            configurable["checkpoint_id"],
+        )
+        with self._lock:
+            size_before = self._writes_size(key)
+            super().put_writes(config, writes, task_id, task_path)
+            self._write_keys.setdefault(thread_id, set()).add(key)
+            self._record(thread_id, self._writes_size(key) - size_before)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            if self._delete(thread_id):
+                self._stats["deleted_threads"] += 1
+
+    def _writes_size(self, key: Tuple[str, str, str]) -> int:
+        return sum(len(write[2][1]) for write in self.writes.get(key, {}).values())
+
+    def _record(self, thread_id: str, size: int) -> None:
+        """Accounts for data added to the thread, and evicts other threads beyond the limits"""
+        self._threads[thread_id] = self._threads.get(thread_id, 0) + size
+        self._threads.move_to_end(thread_id)
+        self._total_bytes += size
+        while len(self._threads) > 1 and (
+            len(self._threads) > self._max_threads
+            or self._total_bytes > self._max_bytes
+        ):
+            oldest = next(iter(self._threads))
+            self._delete(oldest)
+            self._stats["evicted_threads"] += 1
+            logger.debug(f"Evicted checkpoints of thread {oldest}")
+
+    def _delete(self, thread_id: str) -> bool:
+        self.storage.pop(thread_id, None)
+        for key in self._write_keys.pop(thread_id, set()):
+            self.writes.pop(key, None)
+        for blob_key in self._blob_keys.pop(thread_id, []):
+            self.blobs.pop(blob_key, None)
+        size = self._threads.pop(thread_id, None)
+        if size is None:
+            return False
+        self._total_bytes -= size
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the threads and bytes held, and the threads evicted and deleted so far"""
+        with self._lock:
+            return {
+                "threads": len(self._threads),
+                "bytes": self._total_bytes,
+                **self._stats,
+            }
+
+
+class _ListVersion:
+    """A list value of a channel, as stored in a given version"""
+
+    __slots__ = ("version", "items", "chain")
+
+    def __init__(self, version: str, items: List[Any], chain: int):
+        self.version = version
+        self.items = items
+        # deltas to read before reaching a full copy
+        self.chain = chain
+
+
+class SQLiteSaver(BaseCheckpointSaver[str]):
+    """
+    Durable checkpointer, storing conversations (threads) in a SQLite file.
+    List channels, e.g. the messages of an agent, are delta-encoded: a new version stores
+    the items appended since the previous version, if the list was only appended to,
+    and a full copy otherwise or once max_delta_chain deltas were chained.
+    Values are rebuilt from the deltas when a checkpoint is read, and the latest list
+    of each channel is kept in memory, so that appends are detected without reading.
+    Beyond max_threads, the least recently updated threads are deleted when a new one starts.
+    WAL mode lets several sessions and processes share the file.
+    Usage:
+         checkpointer = SQLiteSaver(Path("checkpoints.sqlite"))
+         agent = create_agent(model=llm, tools=tools, checkpointer=checkpointer)
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_delta_chain: int = 20,
+        max_cached_lists: int = 256,
+        max_threads: int | None = None,
+    ):
+        super().__init__()
+        self._max_delta_chain = max_delta_chain
+        self._max_threads = max(1, max_threads) if max_threads is not None else None
+        self._max_cached_lists = max_cached_lists
+        self._lock = Lock()
+        # latest list stored per thread, namespace and channel, most recently used last
+        self._lists: OrderedDict[Tuple[str, str, str], _ListVersion] = OrderedDict()
+        self._stats = {
+            "checkpoints": 0,
+            "full_values": 0,
+            "deltas": 0,
+            "bytes": 0,
+            "evicted_threads": 0,
+        }
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL mode lets readers and a writer work concurrently, across processes
+        # commits are not synced to disk one by one, which only matters on power loss
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            """CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB NOT NULL,
+                base_version TEXT,
+                chain INTEGER NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                type TEXT NOT NULL,
+                value BLOB NOT NULL,
+                task_path TEXT NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );"""
+        )
+        self._connection.commit()
+
+    def _cache_list(self, key: Tuple[str, str, str], value: _ListVersion) -> None:
+        cached = self._lists.get(key)
+        if cached is not None and cached.version > value.version:
+            return
+        self._lists[key] = value
+        self._lists.move_to_end(key)
+        while len(self._lists) > self._max_cached_lists:
+            self._lists.popitem(last=False)
+
+    def _encode(
+        self, key: Tuple[str, str, str], version: str, value: Any
+    ) -> Tuple[str, bytes, str | None, int]:
+        """Returns the serialized value or delta, its base version and its chain length"""
+        if not isinstance(value, list):
+            return (*self.serde.dumps_typed(value), None, 0)
+        base = self._lists.get(key)
+        if (
+            base is not None
+            and base.chain < self._max_delta_chain
+            and len(value) >= len(base.items)
+            and all(a is b or a == b for a, b in zip(base.items, value))
+        ):
+            # the list was only appended to: store the new items
+            self._cache_list(key, _ListVersion(version, list(value), base.chain + 1))
+            delta = value[len(base.items) :]
+            return (*self.serde.dumps_typed(delta), base.version, base.chain + 1)
+        self._cache_list(key, _ListVersion(version, list(value), 0))
+        return (*self.serde.dumps_typed(value), None, 0)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config.get("configurable", {})
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable["checkpoint_ns"]
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        with self._lock:
+            blob_rows = []
+            for channel, version in new_versions.items():
+                if channel in values:
+                    type_, value, base_version, chain = self._encode(
+                        (thread_id, checkpoint_ns, channel),
+                        str(version),
+                        values[channel],
+                    )
+                else:
+                    type_, value, base_version, chain = "empty", b"", None, 0
+                blob_rows.append(
+                    (
+                        thread_id,
+                        checkpoint_ns,
+                        channel,
+                        str(version),
+                        type_,
+                        value,
+                        base_version,
+                        chain,
+                    )
+                )
+                self._stats["deltas" if base_version else "full_values"] += 1
+                self._stats["bytes"] += len(value)
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                blob_rows,
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    configurable.get("checkpoint_id"),
+                    *self.serde.dumps_typed(c),
+                    *self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+                ),
+            )
+            # a checkpoint without parent starts a thread, or a namespace within it
+            if configurable.get("checkpoint_id") is None:
+                self._evict()
+            self._connection.commit()
+            self._stats["checkpoints"] += 1
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config.get("configurable", {})
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = configurable["checkpoint_id"]
+        rows = [
+            (
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+                task_path,
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        # special writes (errors, interrupts...) replace earlier ones, regular writes are kept
+        verb = (
+            "INSERT OR REPLACE"
+            if all(channel in WRITES_IDX_MAP for channel, _ in writes)
+            else "INSERT OR IGNORE"
+        )
+        with self._lock:
+            self._connection.executemany(
+                f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._connection.commit()
+
+    def _load_value(
+        self, thread_id: str, checkpoint_ns: str, channel: str, version: str
+    ) -> Tuple[bool, Any]:
+        """Returns whether the channel has a value in the version, and the value"""
+        key = (thread_id, checkpoint_ns, channel)
+        cached = self._lists.get(key)
+        if cached is not None and cached.version == version:
+            return True, list(cached.items)
+        # walk back from the version to the nearest full copy
+        parts: List[Tuple[str, bytes]] = []
+        next_version: str | None = version
+        chain = 0
+        while next_version is not None:
+            row = self._connection.execute(
+                """SELECT type, value, base_version, chain FROM blobs
+                WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?""",
+                (thread_id, checkpoint_ns, channel, next_version),
+            ).fetchone()
+            if row is None:
+                return False, None
+            if not parts:
+                chain = row[3]
+            parts.append((row[0], row[1]))
+            next_version = row[2]
+        if parts[-1][0] == "empty":
+            return False, None
+        value = self.serde.loads_typed(parts[-1])
+        if len(parts) == 1 and not isinstance(value, list):
+            return True, value
+        for delta in reversed(parts[:-1]):
+            value.extend(self.serde.loads_typed(delta))
+        self._cache_list(key, _ListVersion(version, list(value), chain))
+        return True, value
+
+    def _get_pending_writes(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> List[Tuple[str, str, Any]]:
+        rows = self._connection.execute(
+            """SELECT task_id, idx, channel, type, value, task_path FROM writes
+            WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?""",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        rows.sort(key=lambda row: writes_sort_key(row[5], row[0], row[1]))
+        return [
+            (task_id, channel, self.serde.loads_typed((type_, value)))
+            for task_id, _, channel, type_, value, _ in rows
+        ]
+
+    def _create_tuple(
+        self, thread_id: str, checkpoint_ns: str, row: Tuple[Any, ...]
+    ) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, value, metadata_type, metadata = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, value))
+        channel_values: Dict[str, Any] = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            found, channel_value = self._load_value(
+                thread_id, checkpoint_ns, channel, str(version)
+            )
+            if found:
+                channel_values[channel] = channel_value
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            pending_writes=self._get_pending_writes(
+                thread_id, checkpoint_ns, checkpoint_id
+            ),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        configurable = config.get("configurable", {})
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        query = """SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint,
+            metadata_type, metadata FROM checkpoints
+            WHERE thread_id = ? AND checkpoint_ns = ?"""
+        params: Tuple[Any, ...] = (thread_id, checkpoint_ns)
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._connection.execute(query, params).fetchone()
+            if row is None:
+                return None
+            return self._create_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = """SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+            type, checkpoint, metadata_type, metadata FROM checkpoints WHERE 1 = 1"""
+        params: Tuple[Any, ...] = ()
+        if config is not None:
+            configurable = config.get("configurable", {})
+            query += " AND thread_id = ?"
+            params += (configurable["thread_id"],)
+            if (checkpoint_ns := configurable.get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                params += (checkpoint_ns,)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params += (checkpoint_id,)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params += (before_id,)
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                yield self._create_tuple(thread_id, checkpoint_ns, tuple(row))
+
+    def _delete(self, thread_id: str) -> None:
+        for table in ("checkpoints", "blobs", "writes"):
+            self._connection.execute(
+                f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,)
+            )
+        for key in [key for key in self._lists if key[0] == thread_id]:
+            del self._lists[key]
+
+    def _evict(self) -> None:
+        """Deletes the least recently updated threads beyond max_threads"""
+        if self._max_threads is None:
+            return
+        # checkpoint ids increase over time
+        rows = self._connection.execute(
+            """SELECT thread_id FROM checkpoints GROUP BY thread_id
+            ORDER BY MAX(checkpoint_id) DESC LIMIT -1 OFFSET ?""",
+            (self._max_threads,),
+        ).fetchall()
+        for (thread_id,) in rows:
+            self._delete(thread_id)
+            self._stats["evicted_threads"] += 1
+            logger.debug(f"Evicted checkpoints of thread {thread_id}")
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._delete(thread_id)
+            self._connection.commit()
+
+    # SQLite calls block, so they run on worker threads rather than on the event loop
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: Dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        # same versions as InMemorySaver: an increasing counter, made unique per write
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the checkpoints, full values and deltas written, and their size, this session"""
+        with self._lock:
+            return self._stats.copy()
+
+
+_savers: WeakSet[BoundedMemorySaver] = WeakSet()
+# one SQLite checkpointer, and connection, per file, shared by all chatbots of the process
+_sqlite_savers: Dict[Path, SQLiteSaver] = {}
+_sqlite_savers_lock = Lock()
+
+
+def create_checkpointer() -> BoundedMemorySaver | SQLiteSaver:
+    """
+    Creates the checkpointer described by the checkpointer config section.
+    SQLite checkpointers are shared by path: threads of different chatbots have distinct ids.
+    """
+    checkpointer_config = config.get_checkpointer_config()
+    if checkpointer_config.get("type", "memory") == "sqlite":
+        path = Path(
+            checkpointer_config.get("path")
+            or "~/.cache/python-genai-intro/checkpoints.sqlite"
+        ).expanduser()
+        with _sqlite_savers_lock:
+            if path not in _sqlite_savers:
+                _sqlite_savers[path] = SQLiteSaver(
+                    path=path,
+                    max_delta_chain=checkpointer_config.get("max_delta_chain", 20),
+                    max_threads=checkpointer_config.get("max_threads", 1000),
+                )
+            return _sqlite_savers[path]
+    return BoundedMemorySaver(
+        max_threads=checkpointer_config.get("max_threads", 1000),
+        max_bytes=int(checkpointer_config.get("max_megabytes", 256) * 1024 * 1024),
+    )
+
+
+def get_checkpointer_stats() -> Dict[str, int]:
+    """Returns the totals of all checkpointers alive in the process"""
+    totals: Dict[str, int] = {}
+    for saver in list(_savers):
+        for key, value in saver.get_stats().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
@@ -1,11 +1,19 @@
 from typing import Type
 from langchain_core.embeddings import Embeddings as BaseEmbeddingsModel
+from .batched_embeddings import BatchedEmbeddings
 from .local_embeddings import LocalEmbeddings
 from .remote_embeddings import RemoteEmbeddings
 from chatbot.config import config, ServiceType
 
-Embeddings: Type[BaseEmbeddingsModel] = (
+ServiceEmbeddings: Type[BaseEmbeddingsModel] = (
     LocalEmbeddings
     if config.get_embeddings_type() == ServiceType.LOCAL
     else RemoteEmbeddings
 )
+
+# coalesce concurrent queries into batched requests, if enabled in the config file
+Embeddings: Type[BaseEmbeddingsModel] = (
+    BatchedEmbeddings
+    if config.get_embeddings_config().get("batching")
+    else ServiceEmbeddings
+)
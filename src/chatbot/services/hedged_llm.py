@@ -0,0 +1,386 @@
+import asyncio
+import logging
+import time
+from threading import Lock
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+    TypeVar,
+    cast,
+)
+from uuid import uuid4
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+from pydantic import PrivateAttr
+from chatbot.config import config
+from chatbot.services.llm_cache import astream_with_cache, stream_with_cache
+from chatbot.services.llm_scheduler import (
+    awith_run_metadata,
+    get_run_metadata,
+    with_run_metadata,
+)
+from chatbot.utils.event_loop import run_sync
+from chatbot.utils.metrics import Histogram
+from .routing_llm import RoutingLLM, create_llm
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _get_deadline(metadata: Mapping[str, Any] | None) -> float | None:
+    """Returns the deadline of the run (seconds since the epoch), if the caller set one"""
+    deadline = (metadata or {}).get("deadline")
+    return float(deadline) if deadline is not None else None
+
+
+def _remaining_sec(deadline: float | None) -> float | None:
+    return None if deadline is None else max(0.0, deadline - time.time())
+
+
+def _attempt_run_manager(
+    metadata: Mapping[str, Any] | None,
+) -> AsyncCallbackManagerForLLMRun:
+    """
+    Run manager for a single attempt: it carries the run metadata, e.g. for scheduling,
+    but no callbacks, since the wrapping run already reports the winning response
+    """
+    return AsyncCallbackManagerForLLMRun(
+        run_id=uuid4(),
+        handlers=[],
+        inheritable_handlers=[],
+        metadata=dict(metadata or {}),
+    )
+
+
+def _consume_result(task: asyncio.Future) -> None:
+    # losing attempts may fail after the race is decided, which is expected
+    if not task.cancelled():
+        task.exception()
+
+
+async def _first_chunk(
+    stream: AsyncGenerator[ChatGenerationChunk, None],
+) -> Tuple[AsyncGenerator[ChatGenerationChunk, None], ChatGenerationChunk | None]:
+    return stream, await anext(stream, None)
+
+
+class HedgedLLM(BaseChatModel):
+    """
+    Sends a duplicate of a request that takes longer than usual, and uses the first answer.
+    A request is hedged once it exceeds the p95 of recent latencies (time to first chunk
+    when streaming); the duplicate goes to the alternate model if configured, otherwise
+    to the same one, and the losing request is cancelled.
+    Callers can bound a whole run by a deadline (seconds since the epoch) in the run metadata:
+    requests still unanswered by then fail with TimeoutError.
+    Hedging can be turned off, e.g. when only deadlines are configured.
+    Usage:
+         llm_service = HedgedLLM()
+         messages = [user_message(content="Hi")]
+         answer = llm_service.invoke(messages, config={"metadata": {"deadline": time.time() + 30}})
+    """
+
+    _primary: BaseChatModel = PrivateAttr()
+    _alternate: BaseChatModel | None = PrivateAttr(default=None)
+    _hedge: bool = PrivateAttr(default=True)
+    _latency_sec: Dict[str, Histogram] = PrivateAttr(default_factory=dict)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _stats_lock: Lock = PrivateAttr(default_factory=Lock)
+    _hedge_percentile: float = PrivateAttr(default=95)
+    _min_samples: int = PrivateAttr(default=20)
+    _initial_delay_sec: float = PrivateAttr(default=10.0)
+    _min_delay_sec: float = PrivateAttr(default=0.5)
+    _max_delay_sec: float = PrivateAttr(default=30.0)
+
+    def __init__(
+        self,
+        llm: BaseChatModel | None = None,
+        alternate: BaseChatModel | None = None,
+        hedge: bool | None = None,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        # fetch hedging configuration from the config file
+        hedging_config = config.get_llm_hedging_config()
+        if llm is None:
+            if config.get_llm_routing_config().get("enabled", False):
+                llm = RoutingLLM()
+            else:
+                llm = create_llm(config.get_llm_config())
+        if alternate is None and hedging_config.get("alternate"):
+            alternate = create_llm(hedging_config["alternate"])
+        self._primary = llm
+        self._alternate = alternate
+        # hedge if enabled in the config file, unless told otherwise
+        self._hedge = hedging_config.get("enabled", False) if hedge is None else hedge
+        self._hedge_percentile = hedging_config.get("percentile", 95)
+        self._min_samples = hedging_config.get("min_samples", 20)
+        self._initial_delay_sec = hedging_config.get("initial_delay_sec", 10.0)
+        self._min_delay_sec = hedging_config.get("min_delay_sec", 0.5)
+        self._max_delay_sec = hedging_config.get("max_delay_sec", 30.0)
+        # full responses and first chunks take very different times, so they are tracked apart
+        self._latency_sec = {"generate": Histogram(), "stream": Histogram()}
+        self._stats = {
+            "requests": 0,
+            "hedged": 0,
+            "hedges_won": 0,
+            "deadline_exceeded": 0,
+        }
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        params = {"llm": self._primary._identifying_params}
+        if self._alternate is not None:
+            params["alternate"] = self._alternate._identifying_params
+        return params
+
+    def bind_tools(
+        self, tools: Sequence[Any], **kwargs: Any
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        # both models speak the OpenAI protocol, so tools are formatted once for either of them
+        formatted = self._primary.bind_tools(tools, **kwargs)
+        return self.bind(**getattr(formatted, "kwargs", {}))
+
+    def stream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> Iterator[AIMessageChunk]:
+        # stream() does not consult the response cache, nor pass the run manager,
+        # and its metadata, on to _stream()
+        return with_run_metadata(
+            stream_with_cache(self, super().stream, input, config, stop, **kwargs),
+            ensure_config(config).get("metadata"),
+        )
+
+    def astream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[AIMessageChunk]:
+        return awith_run_metadata(
+            astream_with_cache(self, super().astream, input, config, stop, **kwargs),
+            ensure_config(config).get("metadata"),
+        )
+
+    def get_hedge_delay(self, kind: str = "generate") -> float:
+        """Returns how long a request may take before it is hedged, in seconds"""
+        latency_sec = self._latency_sec[kind]
+        if latency_sec.count < self._min_samples:
+            return self._initial_delay_sec
+        delay = latency_sec.percentile(self._hedge_percentile)
+        return min(max(delay, self._min_delay_sec), self._max_delay_sec)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns request counters, current hedge delays and latencies (seconds)"""
+        with self._stats_lock:
+            stats: Dict[str, Any] = self._stats.copy()
+        for kind, latency_sec in self._latency_sec.items():
+            stats[kind] = {
+                "hedge_delay_sec": self.get_hedge_delay(kind),
+                "latency_sec": latency_sec.summary(),
+            }
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _deadline_exceeded(self) -> TimeoutError:
+        self._count("deadline_exceeded")
+        return TimeoutError("LLM request did not complete before its deadline")
+
+    async def _race(
+        self,
+        start: Callable[[BaseChatModel], Awaitable[T]],
+        kind: str,
+        deadline: float | None,
+    ) -> T:
+        """Runs the request, hedging it once it is slow, and returns the first successful result"""
+        self._count("requests")
+        hedge_delay = self.get_hedge_delay(kind)
+        primary = asyncio.ensure_future(start(self._primary))
+        primary.add_done_callback(_consume_result)
+        attempts = {primary: time.perf_counter()}
+        error: BaseException | None = None
+        try:
+            while True:
+                pending = [attempt for attempt in attempts if not attempt.done()]
+                if not pending:
+                    assert error is not None
+                    raise error
+                can_hedge = self._hedge and len(attempts) == 1
+                timeout = _remaining_sec(deadline)
+                if can_hedge:
+                    timeout = (
+                        hedge_delay if timeout is None else min(timeout, hedge_delay)
+                    )
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for attempt in done:
+                    if attempt.exception() is None:
+                        self._latency_sec[kind].record(
+                            time.perf_counter() - attempts[attempt]
+                        )
+                        if attempt is not primary:
+                            self._count("hedges_won")
+                        return attempt.result()
+                    error = attempt.exception()
+                    if len(attempts) > 1:
+                        logger.warning(f"Hedged LLM request failed: {repr(error)}")
+                if done:
+                    continue
+                if _remaining_sec(deadline) == 0:
+                    raise self._deadline_exceeded()
+                if can_hedge:
+                    self._count("hedged")
+                    logger.debug(
+                        f"LLM request is slower than {hedge_delay:.1f}s, hedging"
+                    )
+                    hedge = asyncio.ensure_future(
+                        start(self._alternate or self._primary)
+                    )
+                    hedge.add_done_callback(_consume_result)
+                    attempts[hedge] = time.perf_counter()
+        finally:
+            losers = [attempt for attempt in attempts if not attempt.done()]
+            for attempt in losers:
+                attempt.cancel()
+            if losers:
+                # let the losers close their connections before returning
+                await asyncio.wait(losers)
+
+    async def _hedged_generate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None,
+        metadata: Mapping[str, Any] | None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await self._race(
+            lambda llm: llm._agenerate(
+                messages, stop, _attempt_run_manager(metadata), **kwargs
+            ),
+            kind="generate",
+            deadline=_get_deadline(metadata),
+        )
+
+    async def _hedged_stream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None,
+        metadata: Mapping[str, Any] | None,
+        **kwargs: Any,
+    ) -> AsyncGenerator[ChatGenerationChunk, None]:
+        deadline = _get_deadline(metadata)
+        streams: List[AsyncGenerator[ChatGenerationChunk, None]] = []
+
+        def start(llm: BaseChatModel):
+            # _astream() is implemented by async generators, which can be closed
+            stream = cast(
+                AsyncGenerator[ChatGenerationChunk, None],
+                llm._astream(messages, stop, _attempt_run_manager(metadata), **kwargs),
+            )
+            streams.append(stream)
+            return _first_chunk(stream)
+
+        # the stream that delivers its first chunk first wins
+        winner, chunk = await self._race(start, kind="stream", deadline=deadline)
+        for stream in streams:
+            if stream is not winner:
+                await stream.aclose()
+        try:
+            while chunk is not None:
+                yield chunk
+                try:
+                    chunk = await asyncio.wait_for(
+                        anext(winner, None), _remaining_sec(deadline)
+                    )
+                except TimeoutError:
+                    raise self._deadline_exceeded() from None
+        finally:
+            await winner.aclose()
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # the race runs on the shared event loop, so that the loser can be cancelled
+        return run_sync(
+            self._hedged_generate(
+                messages, stop, get_run_metadata(run_manager), **kwargs
+            )
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await self._hedged_generate(
+            messages, stop, get_run_metadata(run_manager), **kwargs
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        stream = self._hedged_stream(
+            messages, stop, get_run_metadata(run_manager), **kwargs
+        )
+
+        async def next_chunk() -> ChatGenerationChunk | None:
+            return await anext(stream, None)
+
+        # the stream is driven chunk by chunk on the shared event loop
+        try:
+            while (chunk := run_sync(next_chunk())) is not None:
+                yield chunk
+        finally:
+            run_sync(stream.aclose())
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async for chunk in self._hedged_stream(
+            messages, stop, get_run_metadata(run_manager), **kwargs
+        ):
+            yield chunk
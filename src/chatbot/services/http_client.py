@@ -0,0 +1,214 @@
+"""
+Process-wide HTTP connection pool, shared by all service wrappers.
+
+Every LLM, embeddings, A2A and warm-up request goes through the same pool,
+so TCP/TLS connections are kept alive and reused instead of being set up per request.
+Usage:
+     response = get_http_client().get("http://127.0.0.1:11434/api/tags")
+     stats = get_http_stats()
+"""
+
+import asyncio
+import logging
+import weakref
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+from threading import Lock
+from typing import Any, Dict
+import httpx
+from chatbot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HostStats:
+    """Connection metrics for a single host"""
+
+    requests: int = 0
+    in_flight: int = 0
+    errors: int = 0
+    connections_opened: int = 0
+    tls_handshakes: int = 0
+
+
+class _HttpStats:
+    """Thread-safe per-host connection metrics"""
+
+    def __init__(self):
+        self._hosts: Dict[str, HostStats] = defaultdict(HostStats)
+        self._lock = Lock()
+
+    def on_request_start(self, host: str) -> None:
+        with self._lock:
+            self._hosts[host].requests += 1
+            self._hosts[host].in_flight += 1
+
+    def on_request_end(self, host: str, failed: bool) -> None:
+        with self._lock:
+            self._hosts[host].in_flight -= 1
+            if failed:
+                self._hosts[host].errors += 1
+
+    def on_trace_event(self, host: str, event_name: str) -> None:
+        with self._lock:
+            if event_name == "connection.connect_tcp.complete":
+                self._hosts[host].connections_opened += 1
+            elif event_name == "connection.start_tls.complete":
+                self._hosts[host].tls_handshakes += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {host: asdict(stats) for host, stats in self._hosts.items()}
+
+
+def _host_of(request: httpx.Request) -> str:
+    return f"{request.url.host}:{request.url.port or request.url.scheme}"
+
+
+def _get_limits(http_config: Dict[str, Any]) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=http_config.get("max_connections", 100),
+        max_keepalive_connections=http_config.get("max_keepalive_connections", 20),
+        keepalive_expiry=http_config.get("keepalive_expiry_sec", 60),
+    )
+
+
+class _PooledTransport(httpx.BaseTransport):
+    """Sync transport over the shared connection pool, recording per-host metrics"""
+
+    def __init__(self, http_config: Dict[str, Any], stats: _HttpStats):
+        self._transport = httpx.HTTPTransport(
+            limits=_get_limits(http_config), proxy=http_config.get("proxy")
+        )
+        self._stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = _host_of(request)
+        request.extensions["trace"] = lambda event_name, info: (
+            self._stats.on_trace_event(host, event_name)
+        )
+        self._stats.on_request_start(host)
+        failed = True
+        try:
+            response = self._transport.handle_request(request)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self._stats.on_request_end(host, failed)
+
+    def close(self) -> None:
+        # the pool is shared by many clients, so it lives until shutdown
+        pass
+
+    def shutdown(self) -> None:
+        self._transport.close()
+
+
+class _PooledAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport over the shared connection pool, recording per-host metrics.
+    Async connections are bound to the event loop that opened them,
+    so one pool is kept per running event loop.
+    """
+
+    def __init__(self, http_config: Dict[str, Any], stats: _HttpStats):
+        self._http_config = http_config
+        self._stats = stats
+        self._transports: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport
+        ] = weakref.WeakKeyDictionary()
+        self._lock = Lock()
+
+    def _get_transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(
+                    limits=_get_limits(self._http_config),
+                    proxy=self._http_config.get("proxy"),
+                )
+                self._transports[loop] = transport
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = _host_of(request)
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            self._stats.on_trace_event(host, event_name)
+
+        request.extensions["trace"] = trace
+        self._stats.on_request_start(host)
+        failed = True
+        try:
+            response = await self._get_transport().handle_async_request(request)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self._stats.on_request_end(host, failed)
+
+    async def aclose(self) -> None:
+        # the pool is shared by many clients, so it lives until shutdown
+        pass
+
+
+_stats = _HttpStats()
+_transport: _PooledTransport | None = None
+_async_transport: _PooledAsyncTransport | None = None
+_client: httpx.Client | None = None
+_async_client: httpx.AsyncClient | None = None
+_lock = Lock()
+
+
+def get_http_transport() -> _PooledTransport:
+    """Returns the shared sync transport, for clients that build their own httpx.Client"""
+    global _transport
+    with _lock:
+        if _transport is None:
+            _transport = _PooledTransport(config.get_http_config(), _stats)
+        return _transport
+
+
+def get_async_http_transport() -> _PooledAsyncTransport:
+    """Returns the shared async transport, for clients that build their own httpx.AsyncClient"""
+    global _async_transport
+    with _lock:
+        if _async_transport is None:
+            _async_transport = _PooledAsyncTransport(config.get_http_config(), _stats)
+        return _async_transport
+
+
+def get_http_client() -> httpx.Client:
+    """Returns the process-wide sync HTTP client"""
+    global _client
+    transport = get_http_transport()
+    with _lock:
+        if _client is None:
+            timeout = config.get_http_config().get("timeout_sec", 600)
+            _client = httpx.Client(transport=transport, timeout=timeout)
+        return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Returns the process-wide async HTTP client"""
+    global _async_client
+    transport = get_async_http_transport()
+    with _lock:
+        if _async_client is None:
+            timeout = config.get_http_config().get("timeout_sec", 600)
+            _async_client = httpx.AsyncClient(transport=transport, timeout=timeout)
+        return _async_client
+
+
+def get_http_stats() -> Dict[str, Dict[str, int]]:
+    """Returns connection metrics per host, e.g. requests vs. connections opened"""
+    return _stats.snapshot()
+
+
+def close_http_clients() -> None:
+    """Closes the pooled sync connections, e.g. on shutdown"""
+    with _lock:
+        if _transport is not None:
+            _transport.shutdown()
+        logger.debug(f"HTTP connection stats: {_stats.snapshot()}")
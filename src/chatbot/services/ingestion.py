@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import random
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Condition, Lock
+from typing import Any, Deque, Dict, List, Tuple
+import httpx
+from langchain_core.embeddings import Embeddings as BaseEmbeddingsModel
+from chatbot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+def _estimate_tokens(text: str) -> int:
+    # roughly 4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def _get_status_code(error: Exception) -> int | None:
+    # openai.APIStatusError, ollama.ResponseError and httpx.HTTPStatusError all carry a status code
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def _get_retry_after(error: Exception) -> float | None:
+    """Returns the server-requested delay in seconds, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in [("retry-after-ms", 0.001), ("retry-after", 1.0)]:
+        value = headers.get(header)
+        if value is not None:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+    return None
+
+
+def _is_transient(error: Exception) -> bool:
+    status_code = _get_status_code(error)
+    if status_code is not None:
+        return status_code >= 500 or status_code == 408
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class _RateBudget:
+    """Sliding one-minute window budget, e.g. for requests or tokens per minute"""
+
+    def __init__(self, per_minute: int | None):
+        self._per_minute = per_minute
+        self._spent: Deque[Tuple[float, int]] = deque()
+        self._spent_total = 0
+        self._lock = Lock()
+
+    def acquire(self, amount: int) -> None:
+        """Blocks until the amount fits in the budget of the last minute"""
+        if not self._per_minute:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._spent and self._spent[0][0] <= now - 60:
+                    self._spent_total -= self._spent.popleft()[1]
+                # an oversized request is let through once the window is empty
+                if not self._spent or self._spent_total + amount <= self._per_minute:
+                    self._spent.append((now, amount))
+                    self._spent_total += amount
+                    return
+                wait_sec = self._spent[0][0] + 60 - now
+            time.sleep(max(wait_sec, 0.01))
+
+
+class _AdaptiveConcurrency:
+    """
+    Limits the number of requests in flight, adapting the limit to the service's response:
+    additive increase after a streak of successes, multiplicative decrease when throttled.
+    """
+
+    def __init__(self, initial: int, maximum: int):
+        self._maximum = max(1, maximum)
+        self._limit = min(max(1, initial), self._maximum)
+        self._in_flight = 0
+        self._successes = 0
+        self._condition = Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def acquire(self) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < self._limit)
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def on_success(self) -> None:
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self._limit and self._limit < self._maximum:
+                self._limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def on_throttled(self) -> None:
+        with self._condition:
+            self._limit = max(1, self._limit // 2)
+            self._successes = 0
+
+
+class _Checkpoint:
+    """Append-only record of the embeddings computed so far, keyed by text hash"""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = Lock()
+        self.vectors: Dict[str, List[float]] = {}
+        if path.is_file():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.vectors[record["key"]] = record["vector"]
+                    except (json.JSONDecodeError, KeyError):
+                        # a partially written last line, from an interrupted run
+                        continue
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def save(self, texts: List[str], vectors: List[List[float]]) -> None:
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._path, "a", encoding="utf-8") as f:
+                for text, vector in zip(texts, vectors):
+                    key = self.key(text)
+                    self.vectors[key] = vector
+                    f.write(json.dumps({"key": key, "vector": vector}) + "\n")
+
+    def remove(self) -> None:
+        self._path.unlink(missing_ok=True)
+
+
+class IngestionController(BaseEmbeddingsModel):
+    """
+    Embeddings wrapper that ingests large document sets at the highest throughput
+    the service allows. Texts are sent in batches, within the configured
+    requests-per-minute and tokens-per-minute budgets, with the number of
+    concurrent requests adapting to throttling (429 and retry-after) responses.
+    Progress is checkpointed to disk, so a failed ingestion resumes where it stopped.
+    Queries are passed straight through to the wrapped service.
+    Usage:
+         embeddings_service = IngestionController(Embeddings())
+         embeddings = embeddings_service.embed_documents(texts)
+    """
+
+    def __init__(self, embeddings: BaseEmbeddingsModel, **kwargs: Any):
+        # fetch service configuration from the config file, allowing overrides
+        service_config = config.get_embeddings_config()
+        ingestion_config = {**(service_config.get("ingestion") or {}), **kwargs}
+        self._embeddings = embeddings
+        self._model = str(service_config.get("model", ""))
+        self._batch_size = max(1, ingestion_config.get("batch_size", 16))
+        self._requests_per_minute = ingestion_config.get("requests_per_minute")
+        self._tokens_per_minute = ingestion_config.get("tokens_per_minute")
+        self._initial_concurrency = ingestion_config.get("initial_concurrency", 2)
+        self._max_concurrency = ingestion_config.get("max_concurrency", 8)
+        self._max_retries = ingestion_config.get("max_retries", 8)
+        self._checkpoint_dir = Path(
+            ingestion_config.get("checkpoint_dir")
+            or Path(tempfile.gettempdir()) / "chatbot_ingestion"
+        )
+        self._stats: Dict[str, Any] = {}
+        self._stats_lock = Lock()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self._embeddings.aembed_query(text)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns metrics of the last ingestion"""
+        with self._stats_lock:
+            return self._stats.copy()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] = self._stats.get(name, 0) + amount
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start_time = time.perf_counter()
+        # one checkpoint per model and document set
+        job_key = hashlib.sha256(
+            "\n".join([self._model, *map(_Checkpoint.key, texts)]).encode("utf-8")
+        ).hexdigest()[:16]
+        checkpoint = _Checkpoint(self._checkpoint_dir / f"{job_key}.jsonl")
+
+        # skip the texts embedded by a previous, interrupted run
+        pending = list(
+            dict.fromkeys(
+                t for t in texts if _Checkpoint.key(t) not in checkpoint.vectors
+            )
+        )
+        with self._stats_lock:
+            self._stats = {
+                "texts": len(texts),
+                "resumed": len(texts) - len(pending),
+                "requests": 0,
+                "throttled": 0,
+                "retries": 0,
+                "tokens": 0,
+            }
+        if pending and len(pending) < len(texts):
+            logger.info(
+                f"Resuming ingestion: {len(texts) - len(pending)} / {len(texts)} texts restored from checkpoint"
+            )
+
+        batches = [
+            pending[i : i + self._batch_size]
+            for i in range(0, len(pending), self._batch_size)
+        ]
+        concurrency = _AdaptiveConcurrency(
+            self._initial_concurrency, self._max_concurrency
+        )
+        request_budget = _RateBudget(self._requests_per_minute)
+        token_budget = _RateBudget(self._tokens_per_minute)
+        cooldown = {"until": 0.0}
+        cooldown_lock = Lock()
+
+        def embed_batch(batch: List[str]) -> None:
+            tokens = sum(_estimate_tokens(text) for text in batch)
+            for attempt in range(self._max_retries + 1):
+                # honour the service's request to slow down, shared by all workers
+                with cooldown_lock:
+                    wait_sec = cooldown["until"] - time.monotonic()
+                if wait_sec > 0:
+                    time.sleep(wait_sec)
+                request_budget.acquire(1)
+                token_budget.acquire(tokens)
+                concurrency.acquire()
+                try:
+                    self._count("requests")
+                    vectors = self._embeddings.embed_documents(batch)
+                except Exception as e:
+                    throttled = _get_status_code(e) == 429
+                    if attempt == self._max_retries or not (
+                        throttled or _is_transient(e)
+                    ):
+                        raise
+                    # exponential backoff with jitter, unless the service says otherwise
+                    delay = _get_retry_after(e)
+                    if delay is None:
+                        delay = min(60.0, 2**attempt) * random.uniform(0.5, 1.0)
+                    if throttled:
+                        self._count("throttled")
+                        concurrency.on_throttled()
+                        with cooldown_lock:
+                            cooldown["until"] = max(
+                                cooldown["until"], time.monotonic() + delay
+                            )
+                    else:
+                        time.sleep(delay)
+                    self._count("retries")
+                    logger.debug(
+                        f"Embeddings request failed ({repr(e)}), retrying in {delay:.1f}s with concurrency {concurrency.limit}"
+                    )
+                    continue
+                finally:
+                    concurrency.release()
+                concurrency.on_success()
+                self._count("tokens", tokens)
+                checkpoint.save(batch, vectors)
+                return
+
+        pool = ThreadPoolExecutor(max_workers=max(1, self._max_concurrency))
+        try:
+            for future in [pool.submit(embed_batch, batch) for batch in batches]:
+                future.result()
+        except Exception:
+            pool.shutdown(cancel_futures=True)
+            logger.error(
+                f"Ingestion failed after embedding {len(checkpoint.vectors)} / {len(texts)} texts, the next run will resume from {checkpoint.path}"
+            )
+            raise
+        finally:
+            pool.shutdown()
+
+        vectors = [checkpoint.vectors[_Checkpoint.key(text)] for text in texts]
+        checkpoint.remove()
+        elapsed_sec = time.perf_counter() - start_time
+        with self._stats_lock:
+            self._stats["elapsed_sec"] = elapsed_sec
+            self._stats["final_concurrency"] = concurrency.limit
+            logger.info(f"Ingestion done in {elapsed_sec:.1f}s: {self._stats}")
+        return vectors
@@ -1,9 +1,30 @@
+import atexit
 from typing import Type
+from langchain_core.globals import set_llm_cache
 from langchain_core.language_models import BaseChatModel
+from .llm_cache import create_llm_cache
 from .local_llm import LocalLLM
 from .remote_llm import RemoteLLM
+from .routing_llm import RoutingLLM
+from .hedged_llm import HedgedLLM
 from chatbot.config import config, ServiceType
 
 LLM: Type[BaseChatModel] = (
     LocalLLM if config.get_llm_type() == ServiceType.LOCAL else RemoteLLM
 )
+
+# spread requests across several models, if enabled in the config file
+if config.get_llm_routing_config().get("enabled", False):
+    LLM = RoutingLLM
+
+# duplicate slow requests, and bound them by the caller's deadline, if enabled in the config file
+_llm_hedging_config = config.get_llm_hedging_config()
+if _llm_hedging_config.get("enabled", False) or _llm_hedging_config.get("deadline_sec"):
+    LLM = HedgedLLM
+
+# reuse responses to repeated requests, if enabled in the config file
+_llm_cache_config = config.get_llm_cache_config()
+if _llm_cache_config.get("enabled", False):
+    llm_cache = create_llm_cache(_llm_cache_config)
+    set_llm_cache(llm_cache)
+    atexit.register(llm_cache.log_stats)
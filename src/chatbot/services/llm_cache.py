@@ -0,0 +1,286 @@
+import ast
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import warnings
+from pathlib import Path
+from threading import Lock
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Tuple
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.globals import get_llm_cache
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessageChunk, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration
+from langchain_core.runnables import RunnableConfig
+from langchain_core._api import LangChainBetaWarning
+from chatbot.config import config
+
+logger = logging.getLogger(__name__)
+
+# requests being generated are tracked up to this count, failed ones are never completed
+MAX_PENDING = 1000
+
+
+def _is_deterministic(llm_string: str) -> bool:
+    """True if the model is called with temperature 0, either at construction or per call"""
+    temperature = None
+    try:
+        # the model's constructor arguments as JSON, followed by the call parameters
+        model_repr, end = json.JSONDecoder().raw_decode(llm_string)
+        temperature = model_repr.get("kwargs", {}).get("temperature")
+        call_params = dict(ast.literal_eval(llm_string[end:].removeprefix("---")))
+        temperature = call_params.get("temperature", temperature)
+    except (ValueError, SyntaxError, AttributeError, TypeError):
+        pass
+    return temperature == 0
+
+
+def get_cacheable_defaults() -> Dict[str, Any]:
+    """
+    Returns the model settings that make requests cacheable, if the cache is enabled:
+    only temperature 0 requests are cached, unless forced, and the lessons set no temperature.
+    """
+    cache_config = config.get_llm_cache_config()
+    if not cache_config.get("enabled", False) or cache_config.get("force", False):
+        return {}
+    return {"temperature": 0}
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Disk-backed cache of LLM responses for byte-identical requests.
+    Entries are keyed by model, parameters, messages and tool schemas,
+    evicted least-recently-used beyond max_entries and expired after ttl_sec.
+    Requests with non-deterministic settings (temperature other than 0)
+    are not cached, unless force is set.
+    Usage:
+         set_llm_cache(SQLiteLLMCache(Path("llm_cache.sqlite")))
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = 10000,
+        ttl_sec: float | None = None,
+        force: bool = False,
+    ):
+        self._max_entries = max_entries
+        self._ttl_sec = ttl_sec
+        self._force = force
+        self._lock = Lock()
+        # requests being generated, to measure how much time a later hit saves
+        self._pending: Dict[str, float] = {}
+        self._stats = {"hits": 0, "misses": 0, "skipped": 0, "time_saved_sec": 0.0}
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL mode lets the UI, console and evaluator processes share the cache file
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                generation_sec REAL NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _is_cacheable(self, llm_string: str) -> bool:
+        return self._force or _is_deterministic(llm_string)
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        if not self._is_cacheable(llm_string):
+            with self._lock:
+                self._stats["skipped"] += 1
+            return None
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, generation_sec, created_at FROM llm_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and self._ttl_sec and row[2] < now - self._ttl_sec:
+                self._connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._connection.commit()
+                row = None
+            if row is None:
+                self._stats["misses"] += 1
+                self._pending[key] = time.perf_counter()
+                while len(self._pending) > MAX_PENDING:
+                    del self._pending[next(iter(self._pending))]
+                return None
+            self._connection.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._connection.commit()
+            self._stats["hits"] += 1
+            self._stats["time_saved_sec"] += row[1]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            return loads(row[0], allowed_objects="core")
+
+    def contains(self, prompt: str, llm_string: str) -> bool:
+        """True if a response is cached, without counting a lookup"""
+        if not self._is_cacheable(llm_string):
+            return False
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None and not (
+            self._ttl_sec and row[0] < time.time() - self._ttl_sec
+        )
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if not self._is_cacheable(llm_string):
+            return
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        value = dumps(list(return_val))
+        with self._lock:
+            start_time = self._pending.pop(key, None)
+            generation_sec = time.perf_counter() - start_time if start_time else 0.0
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                (key, value, generation_sec, now, now),
+            )
+            # evict the least recently used entries beyond capacity
+            self._connection.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self._max_entries,),
+            )
+            self._connection.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM llm_cache")
+            self._connection.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns hit rate and time saved, since the start of this session"""
+        with self._lock:
+            stats: Dict[str, Any] = self._stats.copy()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def log_stats(self) -> None:
+        stats = self.get_stats()
+        if stats["hits"] + stats["misses"] + stats["skipped"] == 0:
+            return
+        logger.info(
+            f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate'] * 100:.0f}% hit rate), "
+            f"{stats['skipped']} non-deterministic requests skipped, {stats['time_saved_sec']:.1f}s saved"
+        )
+
+
+def create_llm_cache(cache_config: Dict[str, Any]) -> SQLiteLLMCache:
+    """Creates the response cache described by the llm_cache config section"""
+    return SQLiteLLMCache(
+        path=Path(
+            cache_config.get("path") or "~/.cache/python-genai-intro/llm_cache.sqlite"
+        ).expanduser(),
+        max_entries=cache_config.get("max_entries", 10000),
+        ttl_sec=cache_config.get("ttl_sec"),
+        force=cache_config.get("force", False),
+    )
+
+
+def _get_cache(
+    llm: BaseChatModel, input: LanguageModelInput, stop: List[str] | None, **kwargs
+) -> Tuple[SQLiteLLMCache, str, str] | None:
+    """Returns the cache used by the model, and the request's key as generate() computes it"""
+    llm_cache = llm.cache if isinstance(llm.cache, BaseCache) else get_llm_cache()
+    if llm.cache is False or not isinstance(llm_cache, SQLiteLLMCache):
+        return None
+    messages = [
+        message.model_copy(update={"id": None}) if message.id is not None else message
+        for message in llm._convert_input(input).to_messages()
+    ]
+    return llm_cache, dumps(messages), llm._get_llm_string(stop=stop, **kwargs)
+
+
+def stream_with_cache(
+    llm: BaseChatModel,
+    stream: Callable[..., Iterator[AIMessageChunk]],
+    input: LanguageModelInput,
+    config: RunnableConfig | None = None,
+    stop: List[str] | None = None,
+    **kwargs: Any,
+) -> Iterator[AIMessageChunk]:
+    """
+    Streams a response through the LLM cache, which BaseChatModel.stream() does not consult.
+    A cached response is replayed in a single chunk, through invoke() so that callbacks still
+    see the call, and a streamed response is cached once it is complete.
+    Usage:
+         def stream(self, input, config=None, *, stop=None, **kwargs):
+             return stream_with_cache(self, super().stream, input, config, stop, **kwargs)
+    """
+    cache = _get_cache(llm, input, stop, **kwargs)
+    if cache is not None and cache[0].contains(*cache[1:]):
+        message = llm.invoke(input, config, stop=stop, **kwargs)
+        yield AIMessageChunk(**message.model_dump(exclude={"type"}))
+        return
+    if cache is not None:
+        # counts the miss and starts timing the generation
+        cache[0].lookup(*cache[1:])
+    response: AIMessageChunk | None = None
+    for chunk in stream(input, config, stop=stop, **kwargs):
+        response = chunk if response is None else response + chunk
+        yield chunk
+    if cache is not None and response is not None:
+        llm_cache, prompt, llm_string = cache
+        message = message_chunk_to_message(response)
+        llm_cache.update(prompt, llm_string, [ChatGeneration(message=message)])
+
+
+async def astream_with_cache(
+    llm: BaseChatModel,
+    stream: Callable[..., AsyncIterator[AIMessageChunk]],
+    input: LanguageModelInput,
+    config: RunnableConfig | None = None,
+    stop: List[str] | None = None,
+    **kwargs: Any,
+) -> AsyncIterator[AIMessageChunk]:
+    """Async version of stream_with_cache()"""
+    cache = _get_cache(llm, input, stop, **kwargs)
+    if cache is not None and await asyncio.to_thread(cache[0].contains, *cache[1:]):
+        message = await llm.ainvoke(input, config, stop=stop, **kwargs)
+        yield AIMessageChunk(**message.model_dump(exclude={"type"}))
+        return
+    if cache is not None:
+        await asyncio.to_thread(cache[0].lookup, *cache[1:])
+    chunks = stream(input, config, stop=stop, **kwargs)
+    response: AIMessageChunk | None = None
+    try:
+        async for chunk in chunks:
+            response = chunk if response is None else response + chunk
+            yield chunk
+    finally:
+        # async generators are not closed with the caller's stream
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    if cache is not None and response is not None:
+        llm_cache, prompt, llm_string = cache
+        message = message_chunk_to_message(response)
+        await asyncio.to_thread(
+            llm_cache.update, prompt, llm_string, [ChatGeneration(message=message)]
+        )
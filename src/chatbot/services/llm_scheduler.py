@@ -0,0 +1,337 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import StrEnum
+from threading import Event, Lock
+from typing import (
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterator,
+    Mapping,
+    Tuple,
+    TypeVar,
+)
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.runnables import ensure_config
+from chatbot.config import config
+from chatbot.utils.metrics import Histogram
+
+
+class Priority(StrEnum):
+    """Scheduling class of an LLM request"""
+
+    # a user is waiting for the answer
+    INTERACTIVE = "interactive"
+    # background work, e.g. evaluation runs
+    BATCH = "batch"
+
+
+# set while a request holds a slot, so that nested calls, e.g. _generate delegating to _stream,
+# do not queue for a second one
+_holding_slot: ContextVar[bool] = ContextVar("holding_slot", default=False)
+
+# metadata of the stream being consumed, set only while its next chunk is produced
+_stream_metadata: ContextVar[Mapping[str, Any] | None] = ContextVar(
+    "stream_metadata", default=None
+)
+
+T = TypeVar("T")
+
+
+class _Ticket:
+    """A queued request, woken up either by a thread event or an asyncio future"""
+
+    def __init__(
+        self,
+        priority: Priority,
+        session: str,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ):
+        self.priority = priority
+        self.session = session
+        self.enqueue_time = time.perf_counter()
+        self.granted = False
+        self._loop = loop
+        self._event = Event() if loop is None else None
+        self._future: asyncio.Future | None = (
+            loop.create_future() if loop is not None else None
+        )
+
+    def grant(self) -> None:
+        self.granted = True
+        if self._event is not None:
+            self._event.set()
+        elif self._loop is not None and self._future is not None:
+            future = self._future
+            self._loop.call_soon_threadsafe(
+                lambda: future.done() or future.set_result(None)
+            )
+
+    def wait(self) -> None:
+        assert self._event is not None
+        self._event.wait()
+
+    async def await_grant(self) -> None:
+        assert self._future is not None
+        await self._future
+
+
+class LLMScheduler:
+    """
+    Caps the number of LLM requests in flight, queueing the excess.
+    Queued requests are served by priority class, interactive before batch,
+    and round-robin across sessions within a class, so that one busy session
+    cannot starve the others.
+    Usage:
+         scheduler = LLMScheduler(max_in_flight=2)
+         with scheduler.slot(Priority.BATCH, session="evaluation"):
+             response = call_llm()
+         stats = scheduler.get_stats()
+    """
+
+    def __init__(self, max_in_flight: int = 2):
+        self._max_in_flight = max(1, max_in_flight)
+        self._in_flight = 0
+        # per priority class: session -> queued tickets, in round-robin order
+        self._queues: Dict[Priority, OrderedDict[str, Deque[_Ticket]]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._wait_sec = {priority: Histogram() for priority in Priority}
+        self._lock = Lock()
+
+    def _try_acquire(self, ticket: _Ticket) -> bool:
+        """Takes a free slot, or queues the ticket. Must be called under the lock."""
+        if self._in_flight < self._max_in_flight and not any(self._queues.values()):
+            self._in_flight += 1
+            ticket.granted = True
+            self._wait_sec[ticket.priority].record(0.0)
+            return True
+        self._queues[ticket.priority].setdefault(ticket.session, deque()).append(ticket)
+        return False
+
+    def _dequeue(self, ticket: _Ticket) -> None:
+        """Removes an abandoned ticket from its queue. Must be called under the lock."""
+        sessions = self._queues[ticket.priority]
+        tickets = sessions.get(ticket.session)
+        if tickets is not None and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del sessions[ticket.session]
+
+    def _release(self) -> None:
+        """Hands the freed slot to the next queued ticket. Must be called under the lock."""
+        for priority in Priority:
+            sessions = self._queues[priority]
+            while sessions:
+                session, tickets = next(iter(sessions.items()))
+                ticket = tickets.popleft()
+                if tickets:
+                    # the session goes to the back of the line
+                    sessions.move_to_end(session)
+                else:
+                    del sessions[session]
+                self._wait_sec[priority].record(
+                    time.perf_counter() - ticket.enqueue_time
+                )
+                ticket.grant()
+                return
+        self._in_flight -= 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._release()
+
+    @contextmanager
+    def slot(self, priority: Priority, session: str) -> Iterator[None]:
+        """Blocks until the request may be sent, holding a slot until exit"""
+        ticket = _Ticket(priority, session)
+        with self._lock:
+            acquired = self._try_acquire(ticket)
+        if not acquired:
+            ticket.wait()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, priority: Priority, session: str) -> AsyncIterator[None]:
+        """Waits without blocking the event loop until the request may be sent"""
+        ticket = _Ticket(priority, session, asyncio.get_running_loop())
+        with self._lock:
+            acquired = self._try_acquire(ticket)
+        if not acquired:
+            try:
+                await ticket.await_grant()
+            except asyncio.CancelledError:
+                with self._lock:
+                    if ticket.granted:
+                        # the slot was handed over just before cancellation
+                        self._release()
+                    else:
+                        self._dequeue(ticket)
+                raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns slots in use, queue depth and queue-wait time (seconds) per priority class"""
+        with self._lock:
+            in_flight = self._in_flight
+            queue_depth = {
+                priority.value: sum(map(len, self._queues[priority].values()))
+                for priority in Priority
+            }
+        return {
+            "in_flight": in_flight,
+            "max_in_flight": self._max_in_flight,
+            "queue_depth": queue_depth,
+            "wait_sec": {
+                priority.value: self._wait_sec[priority].summary()
+                for priority in Priority
+            },
+        }
+
+
+def get_request_class(metadata: Mapping[str, Any] | None) -> Tuple[Priority, str]:
+    """Returns the priority and session of a request, from its run metadata"""
+    metadata = metadata or {}
+    try:
+        priority = Priority(metadata.get("priority", Priority.INTERACTIVE))
+    except ValueError:
+        priority = Priority.INTERACTIVE
+    # graph runs carry their thread_id, plain model calls only the chatbot name
+    session = str(metadata.get("thread_id") or metadata.get("chatbot") or "default")
+    return priority, session
+
+
+def get_run_metadata(
+    run_manager: CallbackManagerForLLMRun | AsyncCallbackManagerForLLMRun | None,
+) -> Mapping[str, Any] | None:
+    """
+    Returns the metadata of an LLM run. The streaming APIs do not pass the run manager on,
+    so it is read from the stream being consumed, or else from the graph node making the call.
+    """
+    if run_manager is not None:
+        return run_manager.metadata
+    metadata = _stream_metadata.get()
+    if metadata is None:
+        metadata = ensure_config().get("metadata")
+    return metadata
+
+
+def with_run_metadata(
+    stream: Iterator[T], metadata: Mapping[str, Any] | None
+) -> Iterator[T]:
+    """
+    Exposes the metadata of a stream() call to get_run_metadata, while each chunk is produced.
+    Unlike an argument, it is neither sent to the LLM service nor part of the cache key.
+    """
+    try:
+        while True:
+            token = _stream_metadata.set(metadata)
+            try:
+                chunk = next(stream)
+            except StopIteration:
+                return
+            finally:
+                _stream_metadata.reset(token)
+            yield chunk
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+
+async def awith_run_metadata(
+    stream: AsyncIterator[T], metadata: Mapping[str, Any] | None
+) -> AsyncIterator[T]:
+    """Exposes the metadata of an astream() call to get_run_metadata, while each chunk is produced"""
+    try:
+        while True:
+            token = _stream_metadata.set(metadata)
+            try:
+                chunk = await anext(stream)
+            except StopAsyncIteration:
+                return
+            finally:
+                _stream_metadata.reset(token)
+            yield chunk
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+_scheduler: LLMScheduler | None = None
+_scheduler_lock = Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler | None:
+    """Returns the process-wide scheduler of the local LLM service, if enabled in the config file"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            # fetch service configuration from the config file
+            scheduling_config = config.get_llm_config().get("scheduling")
+            if not scheduling_config:
+                return None
+            _scheduler = LLMScheduler(
+                max_in_flight=scheduling_config.get("max_in_flight", 2)
+            )
+        return _scheduler
+
+
+@contextmanager
+def scheduled(
+    metadata: Mapping[str, Any] | None, guard_nested: bool = True
+) -> Iterator[None]:
+    """
+    Holds a scheduler slot for the duration of a sync LLM request.
+    Generators must pass guard_nested=False, since context changes would leak across yields.
+    """
+    scheduler = get_llm_scheduler()
+    if scheduler is None or _holding_slot.get():
+        yield
+        return
+    with scheduler.slot(*get_request_class(metadata)):
+        if not guard_nested:
+            yield
+            return
+        token = _holding_slot.set(True)
+        try:
+            yield
+        finally:
+            _holding_slot.reset(token)
+
+
+@asynccontextmanager
+async def ascheduled(
+    metadata: Mapping[str, Any] | None, guard_nested: bool = True
+) -> AsyncIterator[None]:
+    """
+    Holds a scheduler slot for the duration of an async LLM request.
+    Generators must pass guard_nested=False, since context changes would leak across yields.
+    """
+    scheduler = get_llm_scheduler()
+    if scheduler is None or _holding_slot.get():
+        yield
+        return
+    async with scheduler.aslot(*get_request_class(metadata)):
+        if not guard_nested:
+            yield
+            return
+        token = _holding_slot.set(True)
+        try:
+            yield
+        finally:
+            _holding_slot.reset(token)
@@ -1,5 +1,9 @@
 from langchain_ollama import OllamaEmbeddings
 from chatbot.config import config
+from chatbot.services.ollama_balancer import (
+    get_balanced_transports,
+    get_ollama_endpoints,
+)
 
 
 class LocalEmbeddings(OllamaEmbeddings):
@@ -13,10 +17,16 @@ class LocalEmbeddings(OllamaEmbeddings):
     def __init__(self, **kwargs):
         # fetch service configuration from the config file
         service_config = config.get_embeddings_config()
+        # requests are routed to the least busy server by the balancing transports
+        transport, async_transport = get_balanced_transports(service_config)
 
         # establish connection to service
         super().__init__(
             model=service_config["model"],
-            base_url="http://127.0.0.1:11434",
+            base_url=get_ollama_endpoints(service_config)[0],
+            # keep the model loaded between requests, see model_residency
+            keep_alive=(service_config.get("residency") or {}).get("keep_alive_sec"),
+            sync_client_kwargs={"transport": transport},
+            async_client_kwargs={"transport": async_transport},
             **kwargs,
         )
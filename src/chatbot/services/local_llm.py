@@ -1,24 +1,129 @@
+from typing import Any, AsyncIterator, Dict, Iterator, List
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig, ensure_config
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr
 from chatbot.config import config
+from chatbot.services.llm_cache import (
+    astream_with_cache,
+    get_cacheable_defaults,
+    stream_with_cache,
+)
+from chatbot.services.llm_scheduler import (
+    ascheduled,
+    awith_run_metadata,
+    get_run_metadata,
+    scheduled,
+    with_run_metadata,
+)
+from chatbot.services.ollama_balancer import (
+    get_balanced_http_clients,
+    get_ollama_endpoints,
+)
 
 
 class LocalLLM(ChatOpenAI):
     """Represents a locally-hosted LLM service orchestrated by Ollama
+    Requests are queued by priority when the service is busy, if scheduling is configured,
+    and spread across the Ollama servers, if several endpoints are configured.
     Usage:
          llm_service = LocalLLM()
          messages = [user_message(content="Hi")]
          answer = llm_service.invoke(messages)
     """
 
-    def __init__(self, **kwargs):
-        # fetch service configuration from the config file
-        service_config = config.get_llm_config()
+    def __init__(self, service_config: Dict[str, Any] | None = None, **kwargs):
+        # fetch service configuration from the config file, unless given
+        service_config = service_config or config.get_llm_config()
+        # deterministic by default while the response cache is enabled, so that it is used
+        kwargs = {**get_cacheable_defaults(), **kwargs}
+        # requests are routed to the least busy server by the balancing clients
+        http_client, http_async_client = get_balanced_http_clients(service_config)
 
         # establish connection to service
         super().__init__(
             model=service_config["model"],
-            base_url="http://127.0.0.1:11434/v1",
+            base_url=f"{get_ollama_endpoints(service_config)[0]}/v1",
             api_key=SecretStr("dummy"),
+            http_client=http_client,
+            http_async_client=http_async_client,
+            # report token usage also when streaming, for usage accounting
+            stream_usage=True,
             **kwargs,
         )
+
+    def stream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> Iterator[AIMessageChunk]:
+        # stream() does not consult the response cache, nor pass the run manager,
+        # and its metadata, on to _stream()
+        return with_run_metadata(
+            stream_with_cache(self, super().stream, input, config, stop, **kwargs),
+            ensure_config(config).get("metadata"),
+        )
+
+    def astream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[AIMessageChunk]:
+        return awith_run_metadata(
+            astream_with_cache(self, super().astream, input, config, stop, **kwargs),
+            ensure_config(config).get("metadata"),
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with scheduled(get_run_metadata(run_manager)):
+            return super()._generate(messages, stop, run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        async with ascheduled(get_run_metadata(run_manager)):
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # the slot is held until the last chunk has been received
+        with scheduled(get_run_metadata(run_manager), guard_nested=False):
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        async with ascheduled(get_run_metadata(run_manager), guard_nested=False):
+            async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+                yield chunk
@@ -1,3 +1,4 @@
+from contextvars import ContextVar
 from typing import Any
 
 from langchain_core.documents import Document
@@ -5,13 +6,18 @@ from langchain_core.vectorstores import InMemoryVectorStore
 from typing_extensions import override
 
 from .embeddings import Embeddings
+from .ingestion import IngestionController
+
+# Reentrant call guard of async searches, per task as concurrent searches share the event loop
+_aretrieving: ContextVar[bool] = ContextVar("aretrieving", default=False)
 
 
 class LocalVectorDB(InMemoryVectorStore):
     """In-memory vector store for semantic search (cosine similarity via numpy)."""
 
     def __init__(self, **kwargs: Any):
-        super().__init__(embedding=Embeddings(), **kwargs)
+        # documents are ingested under rate limits and with checkpointing, queries go straight through
+        super().__init__(embedding=IngestionController(Embeddings()), **kwargs)
         # Reentrant call guard
         self._retrieving = False
 
@@ -28,3 +34,19 @@ class LocalVectorDB(InMemoryVectorStore):
             return self.as_retriever(search_kwargs={"k": k, **kwargs}).invoke(query)
         finally:
             self._retrieving = False
+
+    @override
+    async def asimilarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        # Reentrant call guard
+        if _aretrieving.get():
+            return await super().asimilarity_search(query, k=k, **kwargs)
+        token = _aretrieving.set(True)
+        try:
+            # Emits telemetry spans under LangchainInstrumentor
+            return await self.as_retriever(search_kwargs={"k": k, **kwargs}).ainvoke(
+                query
+            )
+        finally:
+            _aretrieving.reset(token)
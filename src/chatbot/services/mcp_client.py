@@ -1,9 +1,9 @@
-import asyncio
 from langchain_core.tools import StructuredTool
 
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain_core.tools import BaseTool
 from typing import Dict, Any, List
+from chatbot.utils.event_loop import run_sync
 
 
 class MCPClient:
@@ -24,11 +24,13 @@ class MCPClient:
         self._client = MultiServerMCPClient(config)
 
     def get_tools(self) -> List[BaseTool]:
-        tools = asyncio.run(self._client.get_tools())
-        # StructuredTool can only be called async, so define a wrapper
+        tools = run_sync(self._client.get_tools())
+        # StructuredTool can only be called async, so define a sync wrapper
+        # running on the shared event loop, next to the native coroutine
         return [
             StructuredTool.from_function(
-                func=lambda tool=tool, **kwargs: asyncio.run(tool.arun(kwargs)),
+                func=lambda tool=tool, **kwargs: run_sync(tool.arun(kwargs)),
+                coroutine=lambda tool=tool, **kwargs: tool.arun(kwargs),
                 name=tool.name,
                 description=tool.description,
                 args_schema=getattr(tool, "args_schema", None),
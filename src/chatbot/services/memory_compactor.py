@@ -0,0 +1,146 @@
+"""
+Rolling summaries of long conversations, written off the request path.
+
+Once a conversation outgrows the prompt token budget of its ChatHistory,
+the messages left out of the window are summarized by an LLM on the background event loop,
+together with the previous summary. The new summary is swapped into the history at once,
+and the next answer uses the latest summary available, without waiting for one in progress.
+Usage:
+     compactor = MemoryCompactor()
+     answer = llm.invoke(chat_history.get_window())
+     chat_history.add_message(assistant_message(answer.content))
+     compactor.compact_in_background(chat_history)
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Dict, List
+from langchain_core.language_models import BaseChatModel
+from chatbot.chat_history import (
+    ChatHistory,
+    ChatMessage,
+    ChatRole,
+    system_message,
+    user_message,
+)
+from chatbot.config import config
+from chatbot.utils.event_loop import get_event_loop
+from chatbot.utils.metrics import Histogram
+from .llm import LLM
+from .llm_scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+
+_SPEAKERS = {
+    ChatRole.HUMAN.value: "User",
+    ChatRole.AI.value: "Assistant",
+    ChatRole.TOOL.value: "Tool",
+}
+
+
+def _format_transcript(messages: List[ChatMessage]) -> str:
+    return "\n".join(
+        f"{_SPEAKERS.get(message.type, message.type)}: {message.content}"
+        for message in messages
+    )
+
+
+class MemoryCompactor:
+    """
+    Summarizes the messages that chat histories leave out of their window, in the background.
+    At most one summary is in progress per chat history.
+    """
+
+    def __init__(self, llm: BaseChatModel | None = None):
+        # fetch summary configuration from the config file
+        summary_config = config.get_chat_history_config().get("summary") or {}
+        self._min_messages = summary_config.get("min_messages", 4)
+        self._max_words = summary_config.get("max_words", 200)
+        self._llm = llm or LLM()
+        # summaries in progress, per chat history
+        self._pending: Dict[int, Future] = {}
+        self._lock = Lock()
+        self._latency_sec = Histogram()
+        self._stats = {"compactions": 0, "discarded": 0, "failures": 0}
+
+    def compact_in_background(self, chat_history: ChatHistory) -> None:
+        """Starts summarizing the messages left out of the window, if enough have piled up"""
+        with self._lock:
+            if id(chat_history) in self._pending:
+                return
+            _, messages, _, _ = chat_history.get_messages_to_summarize()
+            if len(messages) < self._min_messages:
+                return
+            future = asyncio.run_coroutine_threadsafe(
+                self.compact(chat_history), get_event_loop()
+            )
+            self._pending[id(chat_history)] = future
+        future.add_done_callback(lambda _: self._done(chat_history))
+
+    def _done(self, chat_history: ChatHistory) -> None:
+        with self._lock:
+            self._pending.pop(id(chat_history), None)
+
+    def wait(self, chat_history: ChatHistory, timeout: float | None = None) -> None:
+        """Blocks until the summary in progress for the chat history, if any, is done"""
+        with self._lock:
+            future = self._pending.get(id(chat_history))
+        if future is not None:
+            future.exception(timeout=timeout)
+
+    async def compact(self, chat_history: ChatHistory) -> bool:
+        """Summarizes the messages left out of the window, and swaps the summary in"""
+        summary, messages, end, generation = chat_history.get_messages_to_summarize()
+        if not messages:
+            return False
+        start_time = time.perf_counter()
+        try:
+            new_summary = await self._summarize(summary, messages)
+        except Exception as e:
+            with self._lock:
+                self._stats["failures"] += 1
+            logger.warning(f"Conversation summary failed: {repr(e)}")
+            return False
+        self._latency_sec.record(time.perf_counter() - start_time)
+        installed = chat_history.set_summary(new_summary, end, generation)
+        with self._lock:
+            self._stats["compactions" if installed else "discarded"] += 1
+        return installed
+
+    async def _summarize(
+        self, summary: ChatMessage | None, messages: List[ChatMessage]
+    ) -> ChatMessage:
+        instructions = system_message(
+            "You maintain the memory of a conversation between a user and an assistant. "
+            "Update the summary with the new messages, keeping facts, names, numbers, "
+            "decisions and open questions that later answers may refer to. "
+            f"Answer with the updated summary only, in at most {self._max_words} words."
+        )
+        previous = (
+            str(summary.content).removeprefix(SUMMARY_PREFIX).strip()
+            if summary is not None
+            else "(none)"
+        )
+        request = user_message(
+            f"Current summary:\n{previous}\n\n"
+            f"New messages:\n{_format_transcript(messages)}"
+        )
+        # summaries are not awaited by anyone, so they yield to interactive requests
+        response = await self._llm.ainvoke(
+            [instructions, request],
+            config={
+                "run_name": "memory_compaction",
+                "metadata": {"priority": Priority.BATCH.value},
+            },
+        )
+        return system_message(f"{SUMMARY_PREFIX}\n{response.content}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the summaries installed, discarded as outdated and failed, and their latency"""
+        with self._lock:
+            return {**self._stats, "latency_sec": self._latency_sec.summary()}
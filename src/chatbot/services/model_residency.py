@@ -0,0 +1,194 @@
+"""
+Residency of the local models in the Ollama server's memory.
+
+Ollama unloads a model once it has been idle for its keep-alive duration,
+so the next request pays a multi-second cold load. Models are preloaded
+on startup, renewed by a periodic heartbeat and unloaded on shutdown,
+on every server the service is balanced across.
+Cold loads are logged, and reported as spans when telemetry is active.
+Usage:
+     models = get_local_models()
+     for model in models:
+         load_model(model, reason="preload")
+     heartbeat = ModelHeartbeat(models, interval_sec=120)
+     heartbeat.start()
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, TypeVar
+from opentelemetry import trace
+from chatbot.config import config, ServiceType
+from chatbot.services.http_client import get_http_client
+from chatbot.services.ollama_balancer import DEFAULT_OLLAMA_URL, get_ollama_endpoints
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+T = TypeVar("T")
+
+# Ollama reports a few milliseconds of load time when the model is already resident
+_COLD_LOAD_THRESHOLD_SEC = 0.5
+
+_cold_loads: Dict[str, int] = {}
+_cold_loads_lock = Lock()
+
+
+@dataclass
+class LocalModel:
+    """A model hosted by the local Ollama server"""
+
+    name: str
+    is_embeddings: bool
+    # how long the model stays loaded after a request: -1 for ever, None for the server default
+    keep_alive_sec: int | None = None
+    # interval of the keep-warm heartbeat, None to disable it
+    heartbeat_sec: float | None = None
+    # whether to release the model's memory when the chat services stop
+    unload_on_stop: bool = False
+    # base URLs of the servers hosting the model
+    endpoints: List[str] = field(default_factory=lambda: [DEFAULT_OLLAMA_URL])
+
+
+def get_local_models() -> List[LocalModel]:
+    """Returns the models of the configured services that are hosted locally"""
+    models = []
+    for service_config, is_embeddings in [
+        (config.get_llm_config(), False),
+        (config.get_embeddings_config(), True),
+    ]:
+        if service_config["type"] == ServiceType.LOCAL:
+            residency_config = service_config.get("residency") or {}
+            models.append(
+                LocalModel(
+                    name=service_config["model"],
+                    is_embeddings=is_embeddings,
+                    keep_alive_sec=residency_config.get("keep_alive_sec"),
+                    heartbeat_sec=residency_config.get("heartbeat_sec"),
+                    unload_on_stop=residency_config.get("unload_on_stop", False),
+                    endpoints=get_ollama_endpoints(service_config),
+                )
+            )
+    return models
+
+
+def _request_model(
+    model: LocalModel, endpoint: str, keep_alive_sec: int | None
+) -> Dict[str, Any]:
+    """Sends the cheapest request that loads the model on the server, with the given keep-alive"""
+    payload: Dict[str, Any] = {"model": model.name}
+    if keep_alive_sec is not None:
+        payload["keep_alive"] = keep_alive_sec
+    if model.is_embeddings:
+        # embedding models cannot generate, so embed a minimal input instead
+        url = f"{endpoint}/api/embed"
+        payload["input"] = "Hi"
+    else:
+        # a generate request without prompt only loads the model
+        url = f"{endpoint}/api/generate"
+    response = get_http_client().post(url=url, json=payload, timeout=360)
+    response.raise_for_status()
+    return response.json()
+
+
+def _report_cold_load(
+    model: LocalModel, endpoint: str, load_duration_sec: float, reason: str
+) -> None:
+    with _cold_loads_lock:
+        _cold_loads[model.name] = _cold_loads.get(model.name, 0) + 1
+    logger.info(
+        f"Model `{model.name}` was cold-loaded on {endpoint}"
+        f" in {load_duration_sec:.1f}s ({reason})"
+    )
+    end_time = time.time_ns()
+    span = tracer.start_span(
+        "ollama.model_cold_load",
+        start_time=end_time - int(load_duration_sec * 1e9),
+        attributes={
+            "model": model.name,
+            "endpoint": endpoint,
+            "load_duration_sec": load_duration_sec,
+            "reason": reason,
+        },
+    )
+    span.end(end_time=end_time)
+
+
+def _on_each_endpoint(model: LocalModel, request: Callable[[str], T]) -> List[T]:
+    """
+    Sends the request to every server of the model, returning the successful results.
+    A failing server is logged and skipped, unless all of them fail.
+    """
+    results = []
+    for i, endpoint in enumerate(model.endpoints):
+        try:
+            results.append(request(endpoint))
+        except Exception as e:
+            if not results and i == len(model.endpoints) - 1:
+                raise
+            logger.warning(
+                f"Request for `{model.name}` to {endpoint} failed: {repr(e)}"
+            )
+    return results
+
+
+def load_model(model: LocalModel, reason: str) -> float:
+    """Loads the model, or renews its keep-alive, returning the longest load time in seconds"""
+
+    def load(endpoint: str) -> float:
+        result = _request_model(model, endpoint, model.keep_alive_sec)
+        # durations are reported in nanoseconds
+        load_duration_sec = result.get("load_duration", 0) / 1e9
+        if load_duration_sec >= _COLD_LOAD_THRESHOLD_SEC:
+            _report_cold_load(model, endpoint, load_duration_sec, reason)
+        return load_duration_sec
+
+    return max(_on_each_endpoint(model, load))
+
+
+def unload_model(model: LocalModel) -> None:
+    """Asks the servers to release the model's memory right away"""
+    _on_each_endpoint(
+        model, lambda endpoint: _request_model(model, endpoint, keep_alive_sec=0)
+    )
+
+
+def get_cold_loads() -> Dict[str, int]:
+    """Returns the number of cold loads detected per model"""
+    with _cold_loads_lock:
+        return _cold_loads.copy()
+
+
+class ModelHeartbeat:
+    """
+    Periodically renews the keep-alive of the models, so they stay loaded between chats.
+    A cold load detected by the heartbeat means the server had evicted the model.
+    """
+
+    def __init__(self, models: List[LocalModel], interval_sec: float):
+        self._models = models
+        self._interval_sec = interval_sec
+        self._stop_event = Event()
+        self._thread: Thread | None = None
+
+    def start(self) -> None:
+        self._thread = Thread(target=self._run, name="model-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval_sec):
+            for model in self._models:
+                try:
+                    load_model(model, reason="evicted by the server")
+                except Exception as e:
+                    logger.warning(
+                        f"Keep-warm request for `{model.name}` failed: {repr(e)}"
+                    )
@@ -0,0 +1,341 @@
+"""
+Client-side load balancing across several Ollama servers.
+
+Each request goes to the healthy server with the fewest requests in flight,
+counting a streamed response as in flight until it has been read.
+A server is ejected after consecutive failures (connection errors or 5xx),
+and re-admitted once its periodic health check succeeds again.
+Requests that cannot connect are retried on the next server.
+Usage:
+     endpoints = get_ollama_endpoints(config.get_llm_config())
+     client, async_client = get_balanced_http_clients(config.get_llm_config())
+     stats = get_balancer_stats()
+"""
+
+import logging
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+)
+import httpx
+from chatbot.config import config
+from chatbot.services.http_client import (
+    get_async_http_client,
+    get_async_http_transport,
+    get_http_client,
+    get_http_transport,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OLLAMA_URL = "http://127.0.0.1:11434"
+
+
+def get_ollama_endpoints(service_config: Dict[str, Any]) -> List[str]:
+    """Returns the base URLs of the Ollama servers of a local service configuration"""
+    endpoints = service_config.get("endpoints") or [DEFAULT_OLLAMA_URL]
+    return [endpoint.rstrip("/") for endpoint in endpoints]
+
+
+@dataclass
+class Endpoint:
+    """An Ollama server, and the requests it is serving"""
+
+    url: str
+    in_flight: int = 0
+    requests: int = 0
+    errors: int = 0
+    consecutive_failures: int = 0
+    healthy: bool = True
+
+
+class OllamaBalancer:
+    """Picks the least busy healthy server for each request, and tracks server health"""
+
+    def __init__(
+        self,
+        urls: List[str],
+        max_failures: int = 3,
+        health_check_sec: float = 10.0,
+    ):
+        self._endpoints = [Endpoint(url) for url in urls]
+        self._max_failures = max(1, max_failures)
+        self._health_check_sec = health_check_sec
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._thread: Thread | None = None
+
+    def acquire(self, exclude: Set[str] | None = None) -> Endpoint | None:
+        """Returns the server for the next request, counting it as in flight"""
+        exclude = exclude or set()
+        with self._lock:
+            candidates = [e for e in self._endpoints if e.url not in exclude]
+            # if every server was ejected, try them anyway rather than failing outright
+            healthy = [e for e in candidates if e.healthy] or candidates
+            if not healthy:
+                return None
+            endpoint = min(healthy, key=lambda e: (e.in_flight, e.requests))
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, failed: bool) -> None:
+        with self._lock:
+            endpoint.in_flight -= 1
+            if not failed:
+                endpoint.consecutive_failures = 0
+                return
+            endpoint.errors += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.healthy and endpoint.consecutive_failures >= self._max_failures:
+                endpoint.healthy = False
+                logger.warning(
+                    f"Ollama server {endpoint.url} ejected after"
+                    f" {endpoint.consecutive_failures} consecutive failures"
+                )
+
+    def check_health(self) -> None:
+        """Probes every server, ejecting unreachable ones and re-admitting recovered ones"""
+        for endpoint in self._endpoints:
+            try:
+                response = get_http_client().get(
+                    f"{endpoint.url}/api/version", timeout=2
+                )
+                healthy = response.status_code == 200
+            except httpx.HTTPError:
+                healthy = False
+            with self._lock:
+                if healthy and not endpoint.healthy:
+                    logger.info(f"Ollama server {endpoint.url} is healthy again")
+                elif not healthy and endpoint.healthy:
+                    logger.warning(f"Ollama server {endpoint.url} failed health check")
+                endpoint.healthy = healthy
+                if healthy:
+                    endpoint.consecutive_failures = 0
+
+    def start(self) -> None:
+        if self._thread is None and self._health_check_sec > 0:
+            self._thread = Thread(
+                target=self._run, name="ollama-health-check", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._health_check_sec):
+            self.check_health()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns requests in flight, totals, errors and health per server"""
+        with self._lock:
+            return {
+                e.url: {
+                    "in_flight": e.in_flight,
+                    "requests": e.requests,
+                    "errors": e.errors,
+                    "healthy": e.healthy,
+                }
+                for e in self._endpoints
+            }
+
+
+def _route(request: httpx.Request, endpoint: Endpoint) -> None:
+    """Points the request at the server, keeping its path and query"""
+    url = httpx.URL(endpoint.url)
+    request.url = request.url.copy_with(scheme=url.scheme, host=url.host, port=url.port)
+    request.headers["Host"] = url.netloc.decode("ascii")
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that releases its server once closed"""
+
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    """Async response body that releases its server once closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class _BalancedTransport(httpx.BaseTransport):
+    """Sync transport spreading requests across servers, over the shared connection pool"""
+
+    def __init__(self, balancer: OllamaBalancer, transport: httpx.BaseTransport):
+        self._balancer = balancer
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tried: Set[str] = set()
+        while True:
+            endpoint = self._balancer.acquire(exclude=tried)
+            if endpoint is None:
+                raise httpx.ConnectError(
+                    f"No Ollama server reachable, tried {sorted(tried)}",
+                    request=request,
+                )
+            _route(request, endpoint)
+            try:
+                response = self._transport.handle_request(request)
+            except BaseException as e:
+                self._balancer.release(endpoint, failed=isinstance(e, Exception))
+                tried.add(endpoint.url)
+                # the request was not sent, so another server can take it
+                if isinstance(e, httpx.ConnectError):
+                    continue
+                raise
+            failed = response.status_code >= 500
+            assert isinstance(response.stream, httpx.SyncByteStream)
+            response.stream = _ReleasingStream(
+                response.stream, lambda: self._balancer.release(endpoint, failed)
+            )
+            return response
+
+
+class _AsyncBalancedTransport(httpx.AsyncBaseTransport):
+    """Async transport spreading requests across servers, over the shared connection pool"""
+
+    def __init__(self, balancer: OllamaBalancer, transport: httpx.AsyncBaseTransport):
+        self._balancer = balancer
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tried: Set[str] = set()
+        while True:
+            endpoint = self._balancer.acquire(exclude=tried)
+            if endpoint is None:
+                raise httpx.ConnectError(
+                    f"No Ollama server reachable, tried {sorted(tried)}",
+                    request=request,
+                )
+            _route(request, endpoint)
+            try:
+                response = await self._transport.handle_async_request(request)
+            except BaseException as e:
+                self._balancer.release(endpoint, failed=isinstance(e, Exception))
+                tried.add(endpoint.url)
+                # the request was not sent, so another server can take it
+                if isinstance(e, httpx.ConnectError):
+                    continue
+                raise
+            failed = response.status_code >= 500
+            assert isinstance(response.stream, httpx.AsyncByteStream)
+            response.stream = _AsyncReleasingStream(
+                response.stream, lambda: self._balancer.release(endpoint, failed)
+            )
+            return response
+
+    async def aclose(self) -> None:
+        # the pool is shared by many clients, so it lives until shutdown
+        pass
+
+
+_balancers: Dict[Tuple[str, ...], OllamaBalancer] = {}
+_balancers_lock = Lock()
+
+
+def get_ollama_balancer(service_config: Dict[str, Any]) -> OllamaBalancer:
+    """Returns the balancer of the service's servers, shared by all services using them"""
+    endpoints = tuple(get_ollama_endpoints(service_config))
+    with _balancers_lock:
+        balancer = _balancers.get(endpoints)
+        if balancer is None:
+            balancing_config = service_config.get("load_balancing") or {}
+            balancer = OllamaBalancer(
+                list(endpoints),
+                max_failures=balancing_config.get("max_failures", 3),
+                health_check_sec=balancing_config.get("health_check_sec", 10),
+            )
+            balancer.start()
+            _balancers[endpoints] = balancer
+        return balancer
+
+
+def get_balanced_transports(
+    service_config: Dict[str, Any],
+) -> Tuple[httpx.BaseTransport, httpx.AsyncBaseTransport]:
+    """
+    Returns sync and async transports for the service's servers.
+    A single server needs no balancing, so the shared transports are returned as they are.
+    """
+    if len(get_ollama_endpoints(service_config)) == 1:
+        return get_http_transport(), get_async_http_transport()
+    balancer = get_ollama_balancer(service_config)
+    return (
+        _BalancedTransport(balancer, get_http_transport()),
+        _AsyncBalancedTransport(balancer, get_async_http_transport()),
+    )
+
+
+def get_balanced_http_clients(
+    service_config: Dict[str, Any],
+) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """Returns sync and async HTTP clients for the service's servers"""
+    if len(get_ollama_endpoints(service_config)) == 1:
+        return get_http_client(), get_async_http_client()
+    transport, async_transport = get_balanced_transports(service_config)
+    timeout = config.get_http_config().get("timeout_sec", 600)
+    return (
+        httpx.Client(transport=transport, timeout=timeout),
+        httpx.AsyncClient(transport=async_transport, timeout=timeout),
+    )
+
+
+def get_balancer_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns the load and health of every balanced server"""
+    with _balancers_lock:
+        balancers = list(_balancers.values())
+    stats: Dict[str, Dict[str, Any]] = {}
+    for balancer in balancers:
+        stats.update(balancer.get_stats())
+    return stats
+
+
+def stop_ollama_balancers() -> None:
+    """Stops the health checks, e.g. on shutdown"""
+    with _balancers_lock:
+        balancers = list(_balancers.values())
+    for balancer in balancers:
+        balancer.stop()
@@ -3,6 +3,7 @@ from langchain_openai.embeddings import AzureOpenAIEmbeddings
 from pydantic import SecretStr
 from chatbot.config import config
 from chatbot.services.authenticator import Authenticator
+from chatbot.services.http_client import get_http_client, get_async_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,8 @@ class RemoteEmbeddings(AzureOpenAIEmbeddings):
             azure_deployment=service_config["model"],
             azure_endpoint=service_config["endpoint"],
             default_headers=service_config["extra_headers"],
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
             azure_ad_token_provider=Authenticator(
                 service_config["authentication"]
             ).get_api_key,
@@ -1,8 +1,18 @@
 import logging
+from typing import Any, AsyncIterator, Dict, Iterator, List
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import AzureChatOpenAI
 from pydantic import SecretStr
 from chatbot.config import config
+from chatbot.services.llm_cache import (
+    astream_with_cache,
+    get_cacheable_defaults,
+    stream_with_cache,
+)
 from chatbot.services.authenticator import Authenticator
+from chatbot.services.http_client import get_http_client, get_async_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -15,9 +25,11 @@ class RemoteLLM(AzureChatOpenAI):
          answer = llm_service.invoke(messages)
     """
 
-    def __init__(self, **kwargs):
-        # fetch service configuration from the config file
-        service_config = config.get_llm_config()
+    def __init__(self, service_config: Dict[str, Any] | None = None, **kwargs):
+        # fetch service configuration from the config file, unless given
+        service_config = service_config or config.get_llm_config()
+        # deterministic by default while the response cache is enabled, so that it is used
+        kwargs = {**get_cacheable_defaults(), **kwargs}
 
         # establish connection to service
         super().__init__(
@@ -27,9 +39,34 @@ class RemoteLLM(AzureChatOpenAI):
             azure_deployment=service_config["model"],
             azure_endpoint=service_config["endpoint"],
             default_headers=service_config["extra_headers"],
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+            # report token usage also when streaming, for usage accounting
+            stream_usage=True,
             include_response_headers=True,
             azure_ad_token_provider=Authenticator(
                 service_config["authentication"]
             ).get_api_key,
             **kwargs,
         )
+
+    def stream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> Iterator[AIMessageChunk]:
+        # stream() does not consult the response cache
+        return stream_with_cache(self, super().stream, input, config, stop, **kwargs)
+
+    def astream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[AIMessageChunk]:
+        return astream_with_cache(self, super().astream, input, config, stop, **kwargs)
@@ -0,0 +1,266 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, AsyncIterator, Dict, Iterator, List, Mapping, Sequence
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableConfig, ensure_config
+from pydantic import PrivateAttr
+from chatbot.config import config, ServiceType
+from chatbot.utils.metrics import Histogram
+from .llm_cache import astream_with_cache, stream_with_cache
+from .llm_scheduler import awith_run_metadata, get_run_metadata, with_run_metadata
+from .local_llm import LocalLLM
+from .remote_llm import RemoteLLM
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Route:
+    """
+    A model that requests can be routed to, and the requests it is suited for.
+
+    Attributes:
+        name: Identifies the route, e.g. in hints and metrics
+        llm: The model serving the route
+        max_prompt_chars: Longest prompt the route accepts, None for unlimited
+        tools: Whether the route accepts requests with tools bound
+    """
+
+    name: str
+    llm: BaseChatModel
+    max_prompt_chars: int | None = None
+    tools: bool = True
+    latency_sec: Histogram = field(default_factory=Histogram)
+    failures: int = 0
+    _lock: Lock = field(default_factory=Lock)
+
+    def record_failure(self, error: Exception, is_last: bool) -> None:
+        with self._lock:
+            self.failures += 1
+        if not is_last:
+            logger.warning(
+                f"LLM route '{self.name}' failed ({repr(error)}), falling back"
+            )
+
+    def accepts(self, prompt_chars: int, has_tools: bool) -> bool:
+        if self.max_prompt_chars is not None and prompt_chars > self.max_prompt_chars:
+            return False
+        return self.tools or not has_tools
+
+
+def create_llm(service_config: Dict[str, Any]) -> BaseChatModel:
+    """Creates the model of a service configuration, e.g. local_llm or remote_llm"""
+    if ServiceType(service_config["type"]) == ServiceType.LOCAL:
+        return LocalLLM(service_config=service_config)
+    return RemoteLLM(service_config=service_config)
+
+
+class RoutingLLM(BaseChatModel):
+    """
+    Sends each request to the first configured model suited for it,
+    e.g. short questions to a small local model and agentic requests to a large remote one.
+    A request is classified by its prompt length and whether tools are bound,
+    unless the caller names a route in the run metadata (llm_route).
+    If a model fails, the request falls back to the next routes suited for it, in order.
+    Usage:
+         llm_service = RoutingLLM()
+         messages = [user_message(content="Hi")]
+         answer = llm_service.invoke(messages)
+         hard_answer = llm_service.invoke(messages, config={"metadata": {"llm_route": "large"}})
+    """
+
+    _routes: List[Route] = PrivateAttr(default_factory=list)
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        # fetch routing configuration from the config file
+        routing_config = config.get_llm_routing_config()
+        self._routes = [
+            Route(
+                name=route_config["name"],
+                llm=create_llm(route_config["llm"]),
+                max_prompt_chars=route_config.get("max_prompt_chars"),
+                tools=route_config.get("tools", True),
+            )
+            for route_config in routing_config.get("routes", [])
+        ]
+        if not self._routes:
+            raise ValueError("LLM routing requires at least one route")
+
+    @property
+    def _llm_type(self) -> str:
+        return "routing"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "routes": [
+                {"name": route.name, **route.llm._identifying_params}
+                for route in self._routes
+            ]
+        }
+
+    def bind_tools(
+        self, tools: Sequence[Any], **kwargs: Any
+    ) -> Runnable[LanguageModelInput, AIMessage]:
+        # all routes speak the OpenAI protocol, so tools are formatted once for any of them
+        formatted = self._routes[0].llm.bind_tools(tools, **kwargs)
+        return self.bind(**getattr(formatted, "kwargs", {}))
+
+    def stream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> Iterator[AIMessageChunk]:
+        # stream() does not consult the response cache, nor pass the run manager,
+        # and its metadata, on to _stream()
+        return with_run_metadata(
+            stream_with_cache(self, super().stream, input, config, stop, **kwargs),
+            ensure_config(config).get("metadata"),
+        )
+
+    def astream(
+        self,
+        input: LanguageModelInput,
+        config: RunnableConfig | None = None,
+        *,
+        stop: List[str] | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[AIMessageChunk]:
+        return awith_run_metadata(
+            astream_with_cache(self, super().astream, input, config, stop, **kwargs),
+            ensure_config(config).get("metadata"),
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns latency (seconds) and failures per route"""
+        return {
+            route.name: {
+                "latency_sec": route.latency_sec.summary(),
+                "failures": route.failures,
+            }
+            for route in self._routes
+        }
+
+    def _select_routes(
+        self,
+        messages: List[BaseMessage],
+        metadata: Mapping[str, Any] | None,
+        kwargs: Dict[str, Any],
+    ) -> List[Route]:
+        """
+        Returns the routes to try in order: the chosen one first,
+        then the fallbacks, among the other routes suited for the request
+        """
+        prompt_chars = sum(len(str(message.content)) for message in messages)
+        has_tools = bool(kwargs.get("tools"))
+        suited = [r for r in self._routes if r.accepts(prompt_chars, has_tools)]
+        hint = (metadata or {}).get("llm_route")
+        hinted = [route for route in self._routes if route.name == hint]
+        chosen = (hinted or suited or self._routes[-1:])[0]
+        return [chosen] + [route for route in suited if route is not chosen]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        routes = self._select_routes(messages, get_run_metadata(run_manager), kwargs)
+        for i, route in enumerate(routes):
+            start_time = time.perf_counter()
+            try:
+                result = route.llm._generate(messages, stop, run_manager, **kwargs)
+            except Exception as e:
+                route.record_failure(e, is_last=i == len(routes) - 1)
+                if i == len(routes) - 1:
+                    raise
+                continue
+            route.latency_sec.record(time.perf_counter() - start_time)
+            return result
+        raise RuntimeError("No LLM route available")
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        routes = self._select_routes(messages, get_run_metadata(run_manager), kwargs)
+        for i, route in enumerate(routes):
+            start_time = time.perf_counter()
+            try:
+                result = await route.llm._agenerate(
+                    messages, stop, run_manager, **kwargs
+                )
+            except Exception as e:
+                route.record_failure(e, is_last=i == len(routes) - 1)
+                if i == len(routes) - 1:
+                    raise
+                continue
+            route.latency_sec.record(time.perf_counter() - start_time)
+            return result
+        raise RuntimeError("No LLM route available")
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        routes = self._select_routes(messages, get_run_metadata(run_manager), kwargs)
+        for i, route in enumerate(routes):
+            start_time = time.perf_counter()
+            streamed = False
+            try:
+                for chunk in route.llm._stream(messages, stop, run_manager, **kwargs):
+                    streamed = True
+                    yield chunk
+            except Exception as e:
+                # once chunks reached the caller, another model cannot take over
+                route.record_failure(e, is_last=streamed or i == len(routes) - 1)
+                if streamed or i == len(routes) - 1:
+                    raise
+                continue
+            route.latency_sec.record(time.perf_counter() - start_time)
+            return
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        routes = self._select_routes(messages, get_run_metadata(run_manager), kwargs)
+        for i, route in enumerate(routes):
+            start_time = time.perf_counter()
+            streamed = False
+            try:
+                async for chunk in route.llm._astream(
+                    messages, stop, run_manager, **kwargs
+                ):
+                    streamed = True
+                    yield chunk
+            except Exception as e:
+                # once chunks reached the caller, another model cannot take over
+                route.record_failure(e, is_last=streamed or i == len(routes) - 1)
+                if streamed or i == len(routes) - 1:
+                    raise
+                continue
+            route.latency_sec.record(time.perf_counter() - start_time)
+            return
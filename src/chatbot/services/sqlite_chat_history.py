@@ -0,0 +1,175 @@
+"""
+Chat history of the UI conversations, stored in SQLite so that they survive restarts.
+
+The in-memory ChatHistory is lost when the UI restarts, and holds every message
+of a conversation, however long it grows. SQLiteChatHistory appends messages to a file
+and loads only the latest ones when a conversation is resumed, reading older ones on demand.
+Usage:
+     chat_history = create_chat_history(conversation_id)
+     chat_history.add_message(user_message("Hi"))
+     latest_page = chat_history.get_transcript(limit=50)
+"""
+
+import json
+import logging
+import sqlite3
+import time
+import warnings
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Tuple
+from langchain_core.load import dumps, loads
+from langchain_core._api import LangChainBetaWarning
+from chatbot.chat_history import ChatHistory, ChatMessage
+from chatbot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteChatHistory(ChatHistory):
+    """
+    Chat history stored in a SQLite file, so that conversations survive restarts.
+    Messages are only ever appended to the file. Resuming a conversation only loads its latest
+    messages: older ones stay on disk and are read page by page, e.g. when the user scrolls back.
+    len() and the transcript pages cover the whole conversation on disk, whereas messages,
+    get_window() and the lookups by sender only cover the messages loaded in memory:
+    the latest ones when resumed, and those added since.
+    Usage:
+         chat_history = SQLiteChatHistory(Path("chat_history.sqlite"), conversation_id="123")
+         chat_history.add_message(user_message("Hi"))
+         latest_page = chat_history.get_transcript(limit=50)
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        conversation_id: str,
+        max_tokens: int | None = None,
+        preload: int = 50,
+    ):
+        super().__init__(max_tokens=max_tokens)
+        self.conversation_id = conversation_id
+        self._db_lock = Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL mode lets readers page through a conversation while it is being appended to
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS chat_messages (
+                conversation_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                content TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (conversation_id, seq)
+            )"""
+        )
+        self._connection.commit()
+
+        # resume the conversation: only the latest messages are needed to continue it
+        rows = self._connection.execute(
+            """SELECT seq, message FROM chat_messages WHERE conversation_id = ?
+            ORDER BY seq DESC LIMIT ?""",
+            (conversation_id, preload),
+        ).fetchall()
+        self._count, self._next_seq = self._connection.execute(
+            """SELECT COUNT(*), COALESCE(MAX(seq) + 1, 0) FROM chat_messages
+            WHERE conversation_id = ?""",
+            (conversation_id,),
+        ).fetchone()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", LangChainBetaWarning)
+            for _, message in reversed(rows):
+                super().add_message(loads(message, allowed_objects="core"))
+        if self._count:
+            logger.info(
+                f"Resumed conversation {conversation_id} with {self._count} messages"
+            )
+
+    def __len__(self) -> int:
+        """Returns the number of messages of the conversation, including those not loaded"""
+        return self._count
+
+    def add_message(self, message: ChatMessage) -> None:
+        """Appends a message to the back of the chat history, and to the file"""
+        content = json.dumps(message.content)
+        with self._db_lock:
+            self._connection.execute(
+                "INSERT INTO chat_messages VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.conversation_id,
+                    self._next_seq,
+                    message.type,
+                    content,
+                    dumps(message),
+                    time.time(),
+                ),
+            )
+            self._connection.commit()
+            self._next_seq += 1
+            self._count += 1
+        super().add_message(message)
+
+    def get_transcript(self, limit: int | None = None) -> List[Tuple[str, Any]]:
+        """Returns the sender type and content of the latest messages, read from the file"""
+        return self.get_page(limit=limit)[0]
+
+    def get_page(
+        self, limit: int | None = None, before: int | None = None
+    ) -> Tuple[List[Tuple[str, Any]], int | None]:
+        """
+        Returns the sender type and content of the latest messages before a position,
+        and the position to pass for the page before, or None at the start of the conversation.
+        """
+        with self._db_lock:
+            rows = self._connection.execute(
+                """SELECT seq, type, content FROM chat_messages
+                WHERE conversation_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?""",
+                (
+                    self.conversation_id,
+                    self._next_seq if before is None else before,
+                    -1 if limit is None else limit,
+                ),
+            ).fetchall()
+            has_more = bool(rows) and (
+                self._connection.execute(
+                    "SELECT 1 FROM chat_messages WHERE conversation_id = ? AND seq < ?",
+                    (self.conversation_id, rows[-1][0]),
+                ).fetchone()
+                is not None
+            )
+        page = [
+            (message_type, json.loads(content))
+            for _, message_type, content in reversed(rows)
+        ]
+        return page, rows[-1][0] if has_more else None
+
+    def clear(self) -> None:
+        with self._db_lock:
+            self._connection.execute(
+                "DELETE FROM chat_messages WHERE conversation_id = ?",
+                (self.conversation_id,),
+            )
+            self._connection.commit()
+            self._count = 0
+        super().clear()
+
+
+def create_chat_history(conversation_id: str) -> ChatHistory:
+    """
+    Creates the chat history of a UI conversation, stored on disk
+    if enabled in the store part of the chat_history config section.
+    """
+    store_config: Dict[str, Any] = config.get_chat_history_config().get("store") or {}
+    if not store_config.get("enabled", False):
+        return ChatHistory()
+    return SQLiteChatHistory(
+        path=Path(
+            store_config.get("path")
+            or "~/.cache/python-genai-intro/chat_history.sqlite"
+        ).expanduser(),
+        conversation_id=conversation_id,
+        preload=store_config.get("page_size", 50),
+    )
@@ -1,39 +1,65 @@
 import logging
-import requests
-from chatbot.config import config, ServiceType
+import os
+from chatbot.services.http_client import close_http_clients
+from chatbot.services.model_residency import (
+    ModelHeartbeat,
+    get_local_models,
+    load_model,
+    unload_model,
+)
+from chatbot.services.ollama_balancer import get_balancer_stats, stop_ollama_balancers
 from chatbot.utils.processes import run_on_this_process
 
 logger = logging.getLogger(__name__)
 
+_heartbeat: ModelHeartbeat | None = None
+
 
 def stop_chat_services():
-    # stop any processes we spawned
-    pass
+    global _heartbeat
+    # stop keeping the models warm
+    if _heartbeat is not None:
+        _heartbeat.stop()
+        _heartbeat = None
+    # release the memory of the local models, if configured
+    for model in get_local_models():
+        if model.unload_on_stop:
+            try:
+                unload_model(model)
+            except Exception as e:
+                logger.warning(f"Failed to unload model `{model.name}`: {repr(e)}")
+    # stop probing the health of balanced servers
+    stop_ollama_balancers()
+    logger.debug(f"Ollama server load: {get_balancer_stats()}")
+    # release pooled connections
+    close_http_clients()
 
 
 def start_chat_services():
+    global _heartbeat
     # preload local services to avoid latency on first prompt
-    service_configs = [config.get_llm_config(), config.get_embeddings_config()]
-    service_endpoint_paths = ["api/generate", "api/embeddings"]
-    service_endpoint_host = "127.0.0.1"
-    service_endpoint_port = 11434
-    service_test_payloads = [
-        {"messages": [{"role": "user", "content": "Hi"}], "stream": False},
-        {"input": "Hi"},
-    ]
-    for service_config, service_endpoint_path, service_test_payload in zip(
-        service_configs, service_endpoint_paths, service_test_payloads
-    ):
-        if service_config["type"] == ServiceType.LOCAL:
-            # download the model, if not present
-            model = service_config["model"]
-            cmd = ["ollama", "pull", model]
-            exit_code = run_on_this_process(cmd=cmd)
-            if exit_code != 0:
-                logger.error(f"Failed to fetch model `{model}`: exit code {exit_code}")
-            else:
-                # send a dummy test query
-                url = f"http://{service_endpoint_host}:{service_endpoint_port}/{service_endpoint_path}"
-                payload = {"model": model, **service_test_payload}
-                response = requests.post(url=url, json=payload, timeout=360)
-                response.raise_for_status()
+    models = get_local_models()
+    for model in models:
+        # download the model on every server, if not present
+        exit_codes = [
+            run_on_this_process(
+                cmd=["ollama", "pull", model.name],
+                env={**os.environ, "OLLAMA_HOST": endpoint},
+            )
+            for endpoint in model.endpoints
+        ]
+        if any(exit_code != 0 for exit_code in exit_codes):
+            logger.error(
+                f"Failed to fetch model `{model.name}`: exit codes {exit_codes}"
+            )
+        if any(exit_code == 0 for exit_code in exit_codes):
+            # load the model into memory, with the configured keep-alive
+            load_model(model, reason="preload")
+    # keep the models loaded between chats
+    heartbeat_models = [model for model in models if model.heartbeat_sec]
+    if heartbeat_models:
+        _heartbeat = ModelHeartbeat(
+            heartbeat_models,
+            interval_sec=min(model.heartbeat_sec or 0 for model in heartbeat_models),
+        )
+        _heartbeat.start()
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark of ChatHistory lookups and memory, against a plain list of messages.
+
+The UI looks up the latest user message on every answer, and chatbots send
+the history to the LLM on every turn, so these costs grow with the conversation.
+Usage:
+     uv run python -m chatbot.testing.chat_history_benchmark --messages 10000
+"""
+
+import argparse
+import timeit
+import tracemalloc
+from typing import Callable, List, Tuple
+from rich.console import Console
+from rich.table import Table
+from chatbot.chat_history import (
+    ChatHistory,
+    ChatMessage,
+    ChatRole,
+    assistant_message,
+    get_last_message_from,
+    system_message,
+    user_message,
+)
+
+
+def _create_messages(count: int) -> List[ChatMessage]:
+    messages = [system_message("You are a helpful assistant.")]
+    for i in range(count // 2):
+        messages.append(user_message(f"Question {i}: what happened in year {i}?"))
+        messages.append(assistant_message(f"Answer {i}: nothing much in year {i}."))
+    return messages
+
+
+def _measure_memory(build: Callable[[], object]) -> Tuple[object, int]:
+    """Returns what build returns, and the bytes it allocated and still holds"""
+    tracemalloc.start()
+    try:
+        built = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return built, size
+
+
+def _time_per_call(func: Callable[[], object], repeat: int) -> float:
+    """Returns the best time of a call, in microseconds"""
+    return min(timeit.repeat(func, number=repeat, repeat=5)) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=(__doc__ or "").strip().split("\n")[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--max-tokens", type=int, default=4000)
+    args = parser.parse_args()
+
+    messages, list_bytes = _measure_memory(lambda: _create_messages(args.messages))
+    history, history_bytes = _measure_memory(
+        lambda: ChatHistory(_create_messages(args.messages), max_tokens=args.max_tokens)
+    )
+    assert isinstance(messages, list) and isinstance(history, ChatHistory)
+
+    table = Table(title=f"ChatHistory with {len(history)} messages")
+    table.add_column("Operation")
+    table.add_column("List of messages", justify="right")
+    table.add_column("ChatHistory", justify="right")
+    table.add_row(
+        "last user message (µs)",
+        f"{_time_per_call(lambda: get_last_message_from(messages, ChatRole.HUMAN), args.repeat):.1f}",
+        f"{_time_per_call(lambda: history.get_last_message_from(ChatRole.HUMAN), args.repeat):.1f}",
+    )
+    table.add_row(
+        f"prompt window of {args.max_tokens} tokens (µs)",
+        "",
+        f"{_time_per_call(history.get_window, args.repeat):.1f}",
+    )
+    table.add_row(
+        "transcript for display (µs)",
+        f"{_time_per_call(lambda: [(m.type, m.content) for m in messages], args.repeat):.1f}",
+        f"{_time_per_call(history.get_transcript, args.repeat):.1f}",
+    )
+    table.add_row(
+        "all messages (µs)",
+        f"{_time_per_call(lambda: list(messages), args.repeat):.1f}",
+        f"{_time_per_call(lambda: history.messages, args.repeat):.1f}",
+    )
+    table.add_row(
+        "memory (KiB)", f"{list_bytes / 1024:.0f}", f"{history_bytes / 1024:.0f}"
+    )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    main()
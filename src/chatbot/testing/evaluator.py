@@ -1,20 +1,123 @@
+import asyncio
+import io
+import multiprocessing
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from rich.markdown import Markdown
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+from chatbot.config import config
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
+from chatbot.services.llm_scheduler import Priority
+from chatbot.utils.event_loop import run_sync
+from chatbot.utils.logging import configure_logging
+from chatbot.utils.metrics import percentile
+from chatbot.utils.usage import TokenUsage, get_usage_ledger, usage_since
+from chatbot.utils.waterfall import format_latency_breakdown
 from chatbot.testing.test_suite import TestSuite, TestCase, PassingCriteria
 
 
+class _BufferedConsole:
+    """Collects the output of a test case running alongside others, to print it as one block"""
+
+    def __init__(self):
+        self._renderables: List[Any] = []
+
+    def print(self, *objects: Any) -> None:
+        self._renderables.extend(objects)
+
+    def flush_to(self, rich_console: Console) -> None:
+        for renderable in self._renderables:
+            rich_console.print(renderable)
+        self._renderables = []
+
+
+def _summarize_latency(results: List[Dict[str, Any]]) -> Dict[str, float | None]:
+    """
+    Returns the percentiles of the execution time and of the time to first token,
+    and the output tokens per second of LLM generation, over the results.
+    """
+    times = [result["execution_time"] for result in results]
+    first_token_times = [
+        result["first_token_time"]
+        for result in results
+        if result["first_token_time"] is not None
+    ]
+    usage = TokenUsage()
+    for result in results:
+        usage.add(result["usage"])
+    return {
+        **{f"p{p}": percentile(times, p) for p in (50, 90, 95, 99)},
+        "max": max(times, default=0.0),
+        # only streamed answers have a first token
+        "first_token_p50": percentile(first_token_times, 50)
+        if first_token_times
+        else None,
+        "first_token_p95": percentile(first_token_times, 95)
+        if first_token_times
+        else None,
+        "tokens_per_sec": usage.tokens_per_sec if usage.generation_sec else None,
+    }
+
+
+def _format_latency(summary: Dict[str, float | None]) -> str:
+    line = (
+        f"p50 {summary['p50']:.2f}s, p90 {summary['p90']:.2f}s, p95 {summary['p95']:.2f}s,"
+        f" p99 {summary['p99']:.2f}s, max {summary['max']:.2f}s"
+    )
+    if summary["first_token_p50"] is not None:
+        line += f" | TTFT p50 {summary['first_token_p50']:.2f}s, p95 {summary['first_token_p95']:.2f}s"
+    if summary["tokens_per_sec"] is not None:
+        line += f" | {summary['tokens_per_sec']:.1f} tokens/s"
+    return line
+
+
+# chatbot of a worker process, loaded once per process
+_worker_chatbot: BaseChatBot | None = None
+
+
+def _init_worker(chatbot_name: str) -> None:
+    global _worker_chatbot
+    # imported here, as the user interface package builds on this one
+    from user_interface.select_chatbot import load_chatbot
+
+    configure_logging()
+    _worker_chatbot = load_chatbot(chatbot_name)
+
+
 class ChatbotEvaluator:
     """Framework for evaluating chatbot performance."""
 
-    def __init__(self, chatbot: BaseChatBot):
+    def __init__(
+        self,
+        chatbot: BaseChatBot,
+        max_concurrency: int | None = None,
+        processes: int | None = None,
+    ):
         self.chatbot = chatbot
         self.results: List[Dict[str, Any]] = []
+        # fetch evaluation configuration from the config file, unless given
+        evaluation_config = config.get_evaluation_config()
+        if max_concurrency is None:
+            max_concurrency = int(evaluation_config.get("max_concurrency") or 1)
+        if processes is None:
+            processes = int(evaluation_config.get("processes") or 1)
+        self.max_concurrency = max(1, max_concurrency)
+        self.processes = max(1, processes)
+
+    def _can_run_concurrently(self, test_suite: TestSuite) -> bool:
+        """
+        Test cases are independent if each starts from a fresh chatbot state,
+        and can share one chatbot instance if it keeps no state between answers.
+        """
+        return (
+            self.max_concurrency > 1
+            and self.chatbot.stateless
+            and all(test_case.reset_chatbot for test_case in test_suite.test_cases)
+        )
 
     def run_test_suite(self, test_suite: TestSuite, rich_console: Console) -> bool:
         """Run all test cases from a TestSuite and return results."""
@@ -24,6 +127,70 @@ class ChatbotEvaluator:
             return False
 
         self.results = []
+        # the usage of the run per conversation, recorded in this process by the test contexts
+        usage_before = get_usage_ledger().by_thread()
+        if self._can_run_concurrently(test_suite):
+            run_sync(self._run_concurrently(test_suite, rich_console))
+        elif self.processes > 1:
+            self._run_in_processes(test_suite, rich_console)
+        else:
+            self._run_sequentially(test_suite, rich_console)
+
+        # Show per-test summary
+        for test_case in test_suite.test_cases:
+            test_results = [
+                result for result in self.results if result["test_id"] == test_case.id
+            ]
+            successes = sum(1 for result in test_results if result["success"])
+            rich_console.print(
+                f"⭐ Test [yellow]{test_case.id}[/yellow]: {successes} / {test_suite.repetitions} runs passed ({successes / test_suite.repetitions * 100:.0f}%)"
+            )
+            rich_console.print(
+                f"     Percentiles: {_format_latency(_summarize_latency(test_results))}"
+            )
+
+        # Show global summary
+        success = self._check_passing_criteria(
+            test_suite.passing_criteria, rich_console
+        )
+        total = len(self.results)
+        successful = sum(1 for r in self.results if r["success"])
+        avg_time = sum(r["execution_time"] for r in self.results) / total
+        rich_console.print(
+            f"🎯 Testing summary: {successful} / {total} passed ({successful / total * 100:.1f}%) | Avg time: {avg_time:.2f}s"
+        )
+        rich_console.print(
+            f"⏱️  Latency: {_format_latency(_summarize_latency(self.results))}"
+        )
+        usage = TokenUsage()
+        for result in self.results:
+            usage.add(result["usage"])
+        if usage.requests:
+            rich_console.print(
+                f"🔢 Token usage: {usage} | Avg tokens per test: {usage.total_tokens / total:.0f}"
+            )
+        # worker processes keep their own ledger, so the totals are only known for in-process runs
+        thread_usages = usage_since(usage_before, get_usage_ledger().by_thread())
+        # the conversations that used the most tokens
+        for thread_id, thread_usage in sorted(
+            thread_usages.items(), key=lambda item: -item[1].total_tokens
+        )[:5]:
+            rich_console.print(f"     Conversation {thread_id}: {thread_usage}")
+        chatbot_usage = get_usage_ledger().by_chatbot().get(self.chatbot.get_name())
+        if chatbot_usage is not None:
+            rich_console.print(
+                f"     Total of {self.chatbot.get_name()} in this process: {chatbot_usage}"
+            )
+
+        # Reset chatbot state after all tests complete
+        rich_console.print("[dim]Chatbot state reset[/dim]")
+        self.chatbot.reset()
+
+        return success
+
+    def _run_sequentially(self, test_suite: TestSuite, rich_console: Console) -> None:
+        """Run the test cases one after another, resetting the chatbot as required."""
+
         for repetition in range(test_suite.repetitions):
             for test_idx, test_case in enumerate(test_suite.test_cases):
                 # Reset chatbot state: before each test suite starts or if test requires it
@@ -43,33 +210,141 @@ class ChatbotEvaluator:
                 result["repetition"] = repetition + 1
                 self.results.append(result)
 
-        # Show per-test summary
-        for test_case in test_suite.test_cases:
-            successes = sum(
-                1
-                for result in self.results
-                if result["test_id"] == test_case.id and result["success"]
-            )
-            rich_console.print(
-                f"⭐ Test [yellow]{test_case.id}[/yellow]: {successes} / {test_suite.repetitions} runs passed ({successes / test_suite.repetitions * 100:.0f}%)"
-            )
+    async def _run_concurrently(
+        self, test_suite: TestSuite, rich_console: Console
+    ) -> None:
+        """Run all test cases and repetitions at once, at most max_concurrency at a time."""
 
-        # Show global summary
-        success = self._check_passing_criteria(
-            test_suite.passing_criteria, rich_console
-        )
-        total = len(self.results)
-        successful = sum(1 for r in self.results if r["success"])
-        avg_time = sum(r["execution_time"] for r in self.results) / total
+        # the chatbot keeps no state, so a single reset covers all test cases
+        rich_console.print("[dim]Chatbot state reset[/dim]")
+        self.chatbot.reset()
+        runs = [
+            (repetition, test_case)
+            for repetition in range(test_suite.repetitions)
+            for test_case in test_suite.test_cases
+        ]
         rich_console.print(
-            f"🎯 Testing summary: {successful} / {total} passed ({successful / total * 100:.1f}%) | Avg time: {avg_time:.2f}s"
+            f"⏩ Running {len(runs)} test cases concurrently (up to {self.max_concurrency} at a time) ..."
         )
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
-        # Reset chatbot state after all tests complete
+        async def run_case(repetition: int, test_case: TestCase) -> Dict[str, Any]:
+            # output is printed once the case completes, so that cases do not interleave
+            output = _BufferedConsole()
+            async with semaphore:
+                result = await self._arun_test_case(test_case, output)
+            output.flush_to(rich_console)
+            result["repetition"] = repetition + 1
+            return result
+
+        self.results = list(await asyncio.gather(*(run_case(*run) for run in runs)))
+
+    @staticmethod
+    def _split_into_chains(test_suite: TestSuite) -> List[Tuple[int, List[TestCase]]]:
+        """
+        Splits each repetition of the suite into chains of test cases that must run in order
+        on one chatbot instance: a case that resets the chatbot, and the cases continuing it.
+        """
+        chains: List[Tuple[int, List[TestCase]]] = []
+        for repetition in range(test_suite.repetitions):
+            for test_idx, test_case in enumerate(test_suite.test_cases):
+                # every repetition starts from a fresh state, as when run sequentially
+                if test_idx == 0 or test_case.reset_chatbot:
+                    chains.append((repetition, []))
+                chains[-1][1].append(test_case)
+        return chains
+
+    @staticmethod
+    def _run_chain_in_worker(
+        test_cases: List[TestCase], width: int
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Runs test cases in order on the chatbot of the worker process, from a fresh state.
+        Returns their results, and their output rendered for a terminal.
+        """
+        if _worker_chatbot is None:
+            raise RuntimeError("Error loading chatbot")
+        output = io.StringIO()
+        rich_console = Console(file=output, width=width, force_terminal=True)
+        evaluator = ChatbotEvaluator(_worker_chatbot, max_concurrency=1, processes=1)
         rich_console.print("[dim]Chatbot state reset[/dim]")
-        self.chatbot.reset()
+        _worker_chatbot.reset()
+        results = [
+            evaluator._run_test_case(test_case, rich_console)
+            for test_case in test_cases
+        ]
+        return results, output.getvalue()
 
-        return success
+    def _run_in_processes(self, test_suite: TestSuite, rich_console: Console) -> None:
+        """Run chains of test cases on worker processes, each with its own chatbot."""
+
+        chains = self._split_into_chains(test_suite)
+        processes = min(self.processes, len(chains))
+        rich_console.print(
+            f"⏩ Running {len(chains)} chains of test cases on {processes} worker processes ..."
+        )
+        results: Dict[int, List[Dict[str, Any]]] = {}
+        # spawned rather than forked, as the background threads of this process
+        # (event loop, connection pools...) would not survive a fork
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.chatbot.get_name(),),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self._run_chain_in_worker, test_cases, rich_console.width
+                ): chain_idx
+                for chain_idx, (_, test_cases) in enumerate(chains)
+            }
+            # output is printed once a chain completes, so that chains do not interleave
+            for future in as_completed(futures):
+                chain_idx = futures[future]
+                repetition, test_cases = chains[chain_idx]
+                try:
+                    chain_results, output = future.result()
+                    rich_console.print(Text.from_ansi(output), end="")
+                except Exception as e:
+                    rich_console.print(
+                        f"[bold_red]Worker failed on {[test_case.id for test_case in test_cases]}: {repr(e)}[/bold_red]"
+                    )
+                    chain_results = [
+                        self._failed_result(test_case, repr(e))
+                        for test_case in test_cases
+                    ]
+                for result in chain_results:
+                    result["repetition"] = repetition + 1
+                results[chain_idx] = chain_results
+
+        # same order as a sequential run
+        self.results = [
+            result for chain_idx in sorted(results) for result in results[chain_idx]
+        ]
+
+    @staticmethod
+    def _failed_result(test_case: TestCase, error: str) -> Dict[str, Any]:
+        return {
+            "test_id": test_case.id,
+            "question": test_case.question,
+            "answer": None,
+            "success": False,
+            "error": error,
+            "execution_time": 0.0,
+            "first_token_time": None,
+            "usage": TokenUsage(),
+            "waterfall": [],
+            "tool_calls": {},
+            "llm_calls": {},
+            "metrics": {},
+        }
+
+    def _create_context(self, rich_console: Console | _BufferedConsole) -> ChatContext:
+        # evaluation runs yield to interactive chats on a shared LLM service
+        return ChatContext(
+            status_update_func=lambda msg: rich_console.print(Text(msg)),
+            priority=Priority.BATCH,
+        )
 
     def _run_test_case(
         self, test_case: TestCase, rich_console: Console
@@ -79,23 +354,79 @@ class ChatbotEvaluator:
         # Run case, tracking execution time
         rich_console.print(f"[[yellow]{test_case.id}[/yellow]] {test_case.question}")
         start_time = time.time()
+        first_token_time = None
+        ctx = self._create_context(rich_console)
         try:
-            answer = self.chatbot.get_answer(
-                test_case.question,
-                ctx=ChatContext(
-                    status_update_func=lambda msg: rich_console.print(Text(msg))
-                ),
-            )
+            # streamed, to time the first token as users see it
+            answer = ""
+            for chunk in self.chatbot.stream_answer(test_case.question, ctx=ctx):
+                if first_token_time is None and chunk:
+                    first_token_time = time.time() - start_time
+                answer += chunk
             error = None
-            rich_console.print(Panel(Markdown(answer)))
-            success = True
         except Exception as e:
             error = str(e)
             answer = None
+        execution_time = time.time() - start_time
+        return self._score_test_case(
+            test_case,
+            answer,
+            error,
+            execution_time,
+            first_token_time,
+            ctx,
+            rich_console,
+        )
+
+    async def _arun_test_case(
+        self, test_case: TestCase, rich_console: Console | _BufferedConsole
+    ) -> Dict[str, Any]:
+        """Run a single test case on the event loop and collect metrics."""
+
+        # Run case, tracking execution time
+        rich_console.print(f"[[yellow]{test_case.id}[/yellow]] {test_case.question}")
+        start_time = time.time()
+        first_token_time = None
+        ctx = self._create_context(rich_console)
+        try:
+            # streamed, to time the first token as users see it
+            answer = ""
+            async for chunk in self.chatbot.astream_answer(test_case.question, ctx=ctx):
+                if first_token_time is None and chunk:
+                    first_token_time = time.time() - start_time
+                answer += chunk
+            error = None
+        except Exception as e:
+            error = str(e)
+            answer = None
+        execution_time = time.time() - start_time
+        return self._score_test_case(
+            test_case,
+            answer,
+            error,
+            execution_time,
+            first_token_time,
+            ctx,
+            rich_console,
+        )
+
+    def _score_test_case(
+        self,
+        test_case: TestCase,
+        answer: str | None,
+        error: str | None,
+        execution_time: float,
+        first_token_time: float | None,
+        ctx: ChatContext,
+        rich_console: Console | _BufferedConsole,
+    ) -> Dict[str, Any]:
+        """Validate the answer of a test case and collect metrics."""
+
+        success = error is None
+        if success:
+            rich_console.print(Panel(Markdown(answer or "")))
+        else:
             rich_console.print(f"[bold_red]{error}[/bold_red]")
-            success = False
-        end_time = time.time()
-        execution_time = end_time - start_time
 
         # Validate answer and collect metrics
         metrics = {}
@@ -125,6 +456,9 @@ class ChatbotEvaluator:
             rich_console.print(f"  ✔️  Success ({execution_time:.2f}s)")
         else:
             rich_console.print(f"  ❌ Failed: {error}")
+        waterfall = ctx.get_waterfall()
+        if waterfall:
+            rich_console.print(f"     Latency: {format_latency_breakdown(waterfall)}")
 
         return {
             "test_id": test_case.id,
@@ -133,6 +467,11 @@ class ChatbotEvaluator:
             "success": success,
             "error": error,
             "execution_time": execution_time,
+            "first_token_time": first_token_time,
+            "usage": ctx.usage,
+            "waterfall": waterfall,
+            "tool_calls": ctx.tool_calls.get_stats(),
+            "llm_calls": ctx.llm_calls.get_stats(),
             "metrics": metrics,
         }
 
@@ -169,6 +508,45 @@ class ChatbotEvaluator:
                 )
                 all_passed = False
 
+        # Check tail latency and throughput
+        latency = _summarize_latency(self.results)
+        p95_time = latency["p95"]
+        if (
+            criteria.max_p95_time is not None
+            and p95_time is not None
+            and p95_time > criteria.max_p95_time
+        ):
+            rich_console.print(
+                f"❌ 95th percentile time {p95_time:.2f}s exceeds maximum {criteria.max_p95_time:.2f}s"
+            )
+            all_passed = False
+
+        if criteria.max_p95_first_token_time is not None:
+            first_token_p95 = latency["first_token_p95"]
+            if first_token_p95 is None:
+                rich_console.print(
+                    "❌ No time to first token measured: no answer produced any text"
+                )
+                all_passed = False
+            elif first_token_p95 > criteria.max_p95_first_token_time:
+                rich_console.print(
+                    f"❌ 95th percentile time to first token {first_token_p95:.2f}s exceeds maximum {criteria.max_p95_first_token_time:.2f}s"
+                )
+                all_passed = False
+
+        if criteria.min_tokens_per_sec is not None:
+            tokens_per_sec = latency["tokens_per_sec"]
+            if tokens_per_sec is None:
+                rich_console.print(
+                    "❌ No tokens per second measured: the LLM reported no token usage"
+                )
+                all_passed = False
+            elif tokens_per_sec < criteria.min_tokens_per_sec:
+                rich_console.print(
+                    f"❌ Throughput {tokens_per_sec:.1f} tokens/s below required {criteria.min_tokens_per_sec:.1f} tokens/s"
+                )
+                all_passed = False
+
         if all_passed:
             rich_console.print("✔️  All criteria passed")
 
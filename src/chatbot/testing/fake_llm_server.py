@@ -0,0 +1,453 @@
+"""
+Local stand-in for OpenAI-compatible and Ollama language services.
+
+Serves deterministic embeddings and chat completions without any model,
+and can inject throttling (429 with retry-after) and latency, so that
+client-side behavior such as rate limiting, retries and hedging can be
+exercised without a real backend. Chat completions stream token by token
+at a configurable pace, and can follow a script, including tool calls,
+so that the overhead of the chatbots themselves can be benchmarked.
+Usage:
+     settings = FakeServerSettings(latency_sec=0.2, token_latency_sec=0.02)
+     server = FakeLLMServer(settings, port=8765)
+     server.start()
+     ... point the service endpoint at server.url ...
+     server.stop()
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Tuple
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from chatbot.utils.logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScriptedResponse:
+    """
+    Answer of the fake server to the questions matching a pattern.
+
+    Attributes:
+        pattern: Regular expression searched in the last user message (case-insensitive)
+        content: Text of the answer; once the tools were called, the answer to their results
+        tool_calls: Tools to call before answering, as {"name": ..., "arguments": {...}}
+    """
+
+    pattern: str
+    content: str = ""
+    tool_calls: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class FakeServerSettings:
+    """
+    Behavior of the fake server.
+
+    Attributes:
+        embedding_dimensions: Length of the returned embedding vectors
+        requests_per_minute: Requests allowed per sliding minute, None for unlimited
+        tokens_per_minute: Input tokens allowed per sliding minute, None for unlimited
+        throttle_probability: Fraction of requests rejected with 429 regardless of load (0.0-1.0)
+        retry_after_sec: Delay advertised in the retry-after header of 429 responses
+        latency_sec: Delay before answering each request, i.e. the time to first token
+        slow_probability: Fraction of requests that stall for slow_latency_sec instead (0.0-1.0)
+        slow_latency_sec: Delay of the stalled requests, e.g. to simulate an overloaded deployment
+        token_latency_sec: Delay between generated tokens
+        script: Answers to the matching questions, others are echoed back
+    """
+
+    embedding_dimensions: int = 16
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None
+    throttle_probability: float = 0.0
+    retry_after_sec: float = 1.0
+    latency_sec: float = 0.0
+    slow_probability: float = 0.0
+    slow_latency_sec: float = 10.0
+    token_latency_sec: float = 0.0
+    script: List[ScriptedResponse] = field(default_factory=list)
+
+
+def _count_tokens(text: str) -> int:
+    # roughly 4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def _fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Deterministic unit vector derived from the text hash"""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    values = [digest[i % len(digest)] / 255 - 0.5 for i in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def _text_of(content: Any) -> str:
+    """Text of a message content, either a string or a list of parts"""
+    if isinstance(content, list):
+        return "".join(
+            part.get("text", "") for part in content if isinstance(part, dict)
+        )
+    return str(content or "")
+
+
+def _split_tokens(text: str) -> List[str]:
+    """Splits the text into word-sized tokens, keeping the whitespace"""
+    return re.findall(r"\s*\S+\s*", text) or [text]
+
+
+def _fake_answer(
+    messages: List[Dict[str, Any]], script: List[ScriptedResponse]
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Returns the text and tool calls answering the conversation: the matching scripted
+    response, or else an echo of the last user message, or of the tool results
+    """
+    last_user = max(
+        (i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1
+    )
+    question = _text_of(messages[last_user].get("content")) if last_user >= 0 else ""
+    tool_results = [
+        _text_of(m.get("content"))
+        for m in messages[last_user + 1 :]
+        if m.get("role") == "tool"
+    ]
+    response = next(
+        (r for r in script if re.search(r.pattern, question, re.IGNORECASE)), None
+    )
+    if response is not None:
+        if response.tool_calls and not tool_results:
+            tool_calls = [
+                {
+                    "id": f"call_{random.getrandbits(64):x}",
+                    "type": "function",
+                    "function": {
+                        "name": call["name"],
+                        "arguments": json.dumps(call.get("arguments", {})),
+                    },
+                }
+                for call in response.tool_calls
+            ]
+            return "", tool_calls
+        if response.content:
+            return response.content, []
+    if tool_results:
+        return f"Tools returned: {'; '.join(tool_results)}", []
+    return f"You said: {question}", []
+
+
+def _parse_inputs(body: Dict[str, Any]) -> List[str]:
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        return [inputs]
+    # token arrays are embedded via their string representation
+    return [item if isinstance(item, str) else str(item) for item in inputs]
+
+
+class FakeLLMServer:
+    """Fake language services, served over HTTP with uvicorn"""
+
+    def __init__(
+        self,
+        settings: FakeServerSettings | None = None,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+    ):
+        self.settings = settings or FakeServerSettings()
+        self._host = host
+        self._port = port
+        self._spent: Deque[Tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "throttled": 0, "slow": 0, "tokens": 0}
+        self._server: uvicorn.Server | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self._host}:{self._port}"
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return self._stats.copy()
+
+    def _admit(self, tokens: int) -> bool:
+        """Records the request against the per-minute budgets, returning False if throttled"""
+        settings = self.settings
+        with self._lock:
+            self._stats["requests"] += 1
+            now = time.monotonic()
+            while self._spent and self._spent[0][0] <= now - 60:
+                self._spent.popleft()
+            throttled = random.random() < settings.throttle_probability
+            if (
+                settings.requests_per_minute is not None
+                and len(self._spent) + 1 > settings.requests_per_minute
+            ):
+                throttled = True
+            if (
+                settings.tokens_per_minute is not None
+                and sum(spent for _, spent in self._spent) + tokens
+                > settings.tokens_per_minute
+            ):
+                throttled = True
+            if throttled:
+                self._stats["throttled"] += 1
+                return False
+            self._spent.append((now, tokens))
+            return True
+
+    def _throttled_response(self) -> JSONResponse:
+        retry_after = self.settings.retry_after_sec
+        return JSONResponse(
+            {
+                "error": {
+                    "message": f"Rate limit exceeded, retry after {retry_after} seconds",
+                    "type": "rate_limit_exceeded",
+                    "code": "429",
+                }
+            },
+            status_code=429,
+            headers={
+                "retry-after": str(math.ceil(retry_after)),
+                "retry-after-ms": str(int(retry_after * 1000)),
+            },
+        )
+
+    async def _delay(self) -> None:
+        """Waits for the injected latency of one request"""
+        settings = self.settings
+        delay_sec = settings.latency_sec
+        if random.random() < settings.slow_probability:
+            delay_sec = settings.slow_latency_sec
+            with self._lock:
+                self._stats["slow"] += 1
+        if delay_sec > 0:
+            await asyncio.sleep(delay_sec)
+
+    async def _openai_embeddings(self, request: Request) -> JSONResponse:
+        """OpenAI and Azure OpenAI embeddings endpoint"""
+        body = await request.json()
+        inputs = _parse_inputs(body)
+        tokens = sum(_count_tokens(text) for text in inputs)
+        if not self._admit(tokens):
+            return self._throttled_response()
+        await self._delay()
+        dimensions = body.get("dimensions") or self.settings.embedding_dimensions
+        return JSONResponse(
+            {
+                "object": "list",
+                "data": [
+                    {
+                        "object": "embedding",
+                        "index": i,
+                        "embedding": _fake_embedding(text, dimensions),
+                    }
+                    for i, text in enumerate(inputs)
+                ],
+                "model": body.get("model", "fake"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+    async def _ollama_embed(self, request: Request) -> JSONResponse:
+        """Ollama native embeddings endpoint"""
+        body = await request.json()
+        inputs = _parse_inputs(body)
+        tokens = sum(_count_tokens(text) for text in inputs)
+        if not self._admit(tokens):
+            return self._throttled_response()
+        await self._delay()
+        dimensions = self.settings.embedding_dimensions
+        return JSONResponse(
+            {
+                "model": body.get("model", "fake"),
+                "embeddings": [_fake_embedding(text, dimensions) for text in inputs],
+                "prompt_eval_count": tokens,
+            }
+        )
+
+    async def _openai_chat_completions(self, request: Request) -> Response:
+        """OpenAI and Azure OpenAI chat completions endpoint"""
+        body = await request.json()
+        messages = body.get("messages", [])
+        input_tokens = sum(_count_tokens(_text_of(m.get("content"))) for m in messages)
+        if not self._admit(input_tokens):
+            return self._throttled_response()
+        await self._delay()
+        answer, tool_calls = _fake_answer(messages, self.settings.script)
+        # tool calls are generated as one token each
+        tokens = _split_tokens(answer) if answer else []
+        output_tokens = len(tokens) + len(tool_calls)
+        with self._lock:
+            self._stats["tokens"] += output_tokens
+        usage = {
+            "prompt_tokens": input_tokens,
+            "completion_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        completion = {
+            "id": f"chatcmpl-{random.getrandbits(64):x}",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+        }
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        token_latency_sec = self.settings.token_latency_sec
+        if not body.get("stream"):
+            # the first token comes after the request latency, the others at the token pace
+            if token_latency_sec > 0 and output_tokens > 1:
+                await asyncio.sleep(token_latency_sec * (output_tokens - 1))
+            message: Dict[str, Any] = {"role": "assistant", "content": answer or None}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return JSONResponse(
+                {
+                    **completion,
+                    "object": "chat.completion",
+                    "choices": [
+                        {"index": 0, "message": message, "finish_reason": finish_reason}
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        async def events() -> AsyncIterator[str]:
+            chunk = {**completion, "object": "chat.completion.chunk"}
+            deltas: List[Dict[str, Any]] = [{"content": token} for token in tokens]
+            deltas += [
+                {"tool_calls": [{"index": i, **tool_call}]}
+                for i, tool_call in enumerate(tool_calls)
+            ]
+            # the first chunk also carries the role
+            deltas = [
+                {"role": "assistant", **(deltas[0] if deltas else {})},
+                *deltas[1:],
+            ]
+            for i, delta in enumerate(deltas):
+                if i > 0 and token_latency_sec > 0:
+                    await asyncio.sleep(token_latency_sec)
+                choice = {"index": 0, "delta": delta, "finish_reason": None}
+                yield f"data: {json.dumps({**chunk, 'choices': [choice]})}\n\n"
+            choice = {"index": 0, "delta": {}, "finish_reason": finish_reason}
+            yield f"data: {json.dumps({**chunk, 'choices': [choice]})}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**chunk, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def _ollama_version(self, request: Request) -> JSONResponse:
+        """Ollama version endpoint, used as health check"""
+        return JSONResponse({"version": "fake"})
+
+    def build_app(self) -> Starlette:
+        return Starlette(
+            routes=[
+                Route(
+                    "/v1/chat/completions",
+                    self._openai_chat_completions,
+                    methods=["POST"],
+                ),
+                Route(
+                    "/openai/deployments/{deployment}/chat/completions",
+                    self._openai_chat_completions,
+                    methods=["POST"],
+                ),
+                Route("/v1/embeddings", self._openai_embeddings, methods=["POST"]),
+                Route(
+                    "/openai/deployments/{deployment}/embeddings",
+                    self._openai_embeddings,
+                    methods=["POST"],
+                ),
+                Route("/api/embed", self._ollama_embed, methods=["POST"]),
+                Route("/api/version", self._ollama_version, methods=["GET"]),
+            ]
+        )
+
+    def _create_server(self) -> uvicorn.Server:
+        return uvicorn.Server(
+            uvicorn.Config(
+                self.build_app(),
+                host=self._host,
+                port=self._port,
+                log_level="warning",
+            )
+        )
+
+    def serve(self) -> None:
+        """Runs the server (blocks until stopped)"""
+        logger.info(f"🚀 Fake LLM server is live at {self.url}")
+        self._create_server().run()
+
+    def start(self) -> None:
+        """Runs the server on a background thread, returning once it accepts requests"""
+        self._server = self._create_server()
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError(f"Fake LLM server failed to start at {self.url}")
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        if self._server is not None and self._thread is not None:
+            self._server.should_exit = True
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+
+def main():
+    configure_logging()
+    parser = argparse.ArgumentParser(description=(__doc__ or "").strip().split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--embedding-dimensions", type=int, default=16)
+    parser.add_argument("--requests-per-minute", type=int)
+    parser.add_argument("--tokens-per-minute", type=int)
+    parser.add_argument("--throttle-probability", type=float, default=0.0)
+    parser.add_argument("--retry-after-sec", type=float, default=1.0)
+    parser.add_argument("--latency-sec", type=float, default=0.0)
+    parser.add_argument("--slow-probability", type=float, default=0.0)
+    parser.add_argument("--slow-latency-sec", type=float, default=10.0)
+    parser.add_argument("--token-latency-sec", type=float, default=0.0)
+    parser.add_argument(
+        "--script",
+        help="JSON file with a list of scripted responses: pattern, content, tool_calls",
+    )
+    args = parser.parse_args()
+    script = []
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = [ScriptedResponse(**response) for response in json.load(f)]
+    settings = FakeServerSettings(
+        embedding_dimensions=args.embedding_dimensions,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        throttle_probability=args.throttle_probability,
+        retry_after_sec=args.retry_after_sec,
+        latency_sec=args.latency_sec,
+        slow_probability=args.slow_probability,
+        slow_latency_sec=args.slow_latency_sec,
+        token_latency_sec=args.token_latency_sec,
+        script=script,
+    )
+    FakeLLMServer(settings, host=args.host, port=args.port).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -28,10 +28,16 @@ class PassingCriteria:
     Attributes:
         min_success_rate: Minimum fraction of tests that must succeed (0.0-1.0)
         max_avg_time: Maximum average execution time in seconds
+        max_p95_time: Maximum 95th percentile of the execution time in seconds
+        max_p95_first_token_time: Maximum 95th percentile of the time to first token in seconds
+        min_tokens_per_sec: Minimum output tokens per second of LLM generation
     """
 
     min_success_rate: float = 0.8
     max_avg_time: float | None = None
+    max_p95_time: float | None = None
+    max_p95_first_token_time: float | None = None
+    min_tokens_per_sec: float | None = None
 
 
 @dataclass
@@ -6,8 +6,8 @@ Provides classes to:
 - Call remote A2A agents as LangChain tools
 """
 
-import asyncio
 import logging
+import threading
 import yaml
 from pathlib import Path
 from typing import Any, Dict, List, override
@@ -35,34 +35,48 @@ from langchain_core.tools import BaseTool
 from starlette.applications import Starlette
 
 from chatbot.services.agent import AgentProtocol
+from chatbot.services.http_client import get_async_http_transport, get_http_client
+from chatbot.utils.event_loop import run_sync
 
 
 logger = logging.getLogger(__name__)
 
+_a2a_http_client: httpx.AsyncClient | None = None
+_a2a_http_client_lock = threading.Lock()
+
+
+def _get_a2a_http_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide client of A2A calls, over the shared connection pool.
+    It is kept apart from the shared client, as A2A sets its own headers on it.
+    """
+    global _a2a_http_client
+    transport = get_async_http_transport()
+    with _a2a_http_client_lock:
+        if _a2a_http_client is None:
+            _a2a_http_client = httpx.AsyncClient(transport=transport, timeout=60.0)
+        return _a2a_http_client
+
 
 # ============================================================================
-# Sync/async adapters — lesson code stays synchronous
+# Sync/async adapters — lesson code can stay synchronous
 # ============================================================================
 
 
 class _A2AServerBridge(AgentExecutor):
-    """Inbound: bridges a synchronous LangChain agent to the async A2A server."""
+    """Inbound: bridges a LangChain agent to the async A2A server."""
 
-    def __init__(self, sync_agent: AgentProtocol):
-        self.sync_agent = sync_agent
+    def __init__(self, agent: AgentProtocol):
+        self.agent = agent
 
     @override
     async def execute(self, context: Any, event_queue: Any) -> None:
         """Execute the agent with incoming A2A message."""
         message = get_message_text(context.message)
+        agent_input = {"messages": [HumanMessage(content=message)]}
 
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            lambda: self.sync_agent.invoke(
-                {"messages": [HumanMessage(content=message)]}
-            ),
-        )
+        # agents serve concurrent requests on the server's event loop
+        result = await self.agent.ainvoke(agent_input)
 
         answer = result["messages"][-1].content
         await event_queue.enqueue_event(
@@ -76,7 +90,7 @@ class _A2AServerBridge(AgentExecutor):
 
 
 class _A2AClientBridge:
-    """Outbound: bridges a synchronous LangChain tool to the async A2A client."""
+    """Outbound: bridges a LangChain tool to the async A2A client."""
 
     def __init__(self, agent_url: str, skill_id: str):
         self._agent_url = agent_url
@@ -86,7 +100,9 @@ class _A2AClientBridge:
         message_content = f"Execute skill '{self._skill_id}' for query: {query}"
         client = await create_client(
             self._agent_url,
-            client_config=ClientConfig(streaming=False),
+            client_config=ClientConfig(
+                streaming=False, httpx_client=_get_a2a_http_client()
+            ),
         )
         request = SendMessageRequest(
             message=new_text_message(message_content, role=Role.ROLE_USER)
@@ -101,7 +117,11 @@ class _A2AClientBridge:
 
     def call_skill(self, query: str) -> str:
         """Synchronous entry point for LangChain tool execution."""
-        return asyncio.run(self._send(query))
+        return run_sync(self._send(query))
+
+    async def acall_skill(self, query: str) -> str:
+        """Asynchronous entry point for LangChain tool execution."""
+        return await self._send(query)
 
 
 # ============================================================================
@@ -208,7 +228,12 @@ class A2AAgentTool(BaseTool):
         skill_id: str,
         skill_description: str,
     ):
-        super().__init__(name=f"{agent_id}.{skill_id}", description=skill_description)
+        # the tag tells remote agent calls apart from local tools, e.g. in latency waterfalls
+        super().__init__(
+            name=f"{agent_id}.{skill_id}",
+            description=skill_description,
+            tags=["a2a"],
+        )
         self._agent_url = agent_url
         self._agent_id = agent_id
         self._skill_id = skill_id
@@ -220,11 +245,22 @@ class A2AAgentTool(BaseTool):
         try:
             return self._client.call_skill(query)
         except Exception as e:
-            logger.error(
-                f"Error calling skill '{self._skill_id}' for A2A agent "
-                f"'{self._agent_id}' at '{self._agent_url}': {repr(e)}"
-            )
-            return f"Error: {str(e)}"
+            return self._on_error(e)
+
+    @override
+    async def _arun(self, query: str) -> str:
+        """Called when LLM decides to use this tool, from an async agent"""
+        try:
+            return await self._client.acall_skill(query)
+        except Exception as e:
+            return self._on_error(e)
+
+    def _on_error(self, error: Exception) -> str:
+        logger.error(
+            f"Error calling skill '{self._skill_id}' for A2A agent "
+            f"'{self._agent_id}' at '{self._agent_url}': {repr(error)}"
+        )
+        return f"Error: {str(error)}"
 
 
 def create_tools_from_a2a_agent_skills(config: Dict[str, Any]) -> List[BaseTool]:
@@ -240,7 +276,7 @@ def create_tools_from_a2a_agent_skills(config: Dict[str, Any]) -> List[BaseTool]
         return []
 
     orchestrator_tools = []
-    http_client = httpx.Client(timeout=60.0)
+    http_client = get_http_client()
 
     for agent_config in config["agents"]:
         agent_id = agent_config["id"]
@@ -248,7 +284,7 @@ def create_tools_from_a2a_agent_skills(config: Dict[str, Any]) -> List[BaseTool]
 
         try:
             agent_card_url = urljoin(agent_url, "/.well-known/agent-card.json")
-            response = http_client.get(agent_card_url)
+            response = http_client.get(agent_card_url, timeout=60.0)
             response.raise_for_status()
             agent_card = parse_agent_card(response.json())
 
@@ -1,18 +1,29 @@
 import logging
-from typing import Type
+import time
+from typing import List, Type
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
 from rich.text import Text
 from rich.markdown import Markdown
 from chatbot.chatbot_base import BaseChatBot
 from chatbot.chat_context import ChatContext
 from chatbot.testing.evaluator import ChatbotEvaluator
+from chatbot.services.batched_embeddings import get_batching_stats
+from chatbot.services.checkpointer import get_checkpointer_stats
+from chatbot.services.http_client import get_http_stats
+from chatbot.services.llm_scheduler import get_llm_scheduler
 from chatbot.start_chat import start_chat_services, stop_chat_services
+from chatbot.utils.metrics import get_rss_bytes
+from chatbot.utils.usage import get_usage_ledger
+from chatbot.utils.waterfall import format_waterfall
 
 logger = logging.getLogger(__name__)
 
 
-def handle_test_command(chatbot: BaseChatBot, rich_console: Console):
+def handle_test_command(
+    chatbot: BaseChatBot, rich_console: Console, memory_samples: List[int]
+):
     """Run the test suite for the current chatbot."""
     test_suite = chatbot.get_test_suite()
     if test_suite is None:
@@ -21,14 +32,71 @@ def handle_test_command(chatbot: BaseChatBot, rich_console: Console):
 
     evaluator = ChatbotEvaluator(chatbot)
     evaluator.run_test_suite(test_suite, rich_console)
+    report_memory(rich_console, memory_samples)
+
+
+def report_memory(rich_console: Console, memory_samples: List[int]):
+    """Show memory use after a test run, and its growth since the first run"""
+    rss_bytes = get_rss_bytes()
+    if rss_bytes is None:
+        return
+    memory_samples.append(rss_bytes)
+    growth_mib = (rss_bytes - memory_samples[0]) / 2**20
+    line = (
+        f"🧠 Memory after test run {len(memory_samples)}: {rss_bytes / 2**20:.0f} MiB"
+        f" ({growth_mib:+.1f} MiB since the first run)"
+    )
+    checkpoints = get_checkpointer_stats()
+    if checkpoints:
+        line += (
+            f" | Checkpoints: {checkpoints['threads']} threads, {checkpoints['bytes'] / 1024:.0f} KiB,"
+            f" {checkpoints['evicted_threads']} evicted, {checkpoints['deleted_threads']} deleted"
+        )
+    rich_console.print(line)
+
+
+def report_service_stats(rich_console: Console):
+    """Show the metrics of the services shared by all chatbots in this process"""
+    batching = get_batching_stats()
+    if batching:
+        batch_size = batching["batch_size"]
+        queue_wait_sec = batching["queue_wait_sec"]
+        rich_console.print(
+            f"🧮 Embeddings batching: {batch_size['count']} batches, {batch_size['mean']:.1f} texts per batch,"
+            f" queue wait p95 {queue_wait_sec['p95'] * 1000:.1f} ms, {batching['queue_depth']} queued"
+        )
+    scheduler = get_llm_scheduler()
+    if scheduler is not None:
+        scheduling = scheduler.get_stats()
+        rich_console.print(
+            f"🚦 LLM scheduling: {scheduling['in_flight']}/{scheduling['max_in_flight']} slots in use"
+        )
+        for priority, wait_sec in scheduling["wait_sec"].items():
+            rich_console.print(
+                f"   {priority}: {wait_sec['count']} requests, queue wait p95 {wait_sec['p95'] * 1000:.1f} ms,"
+                f" {scheduling['queue_depth'][priority]} queued"
+            )
+    ledger = get_usage_ledger()
+    for chatbot_name, usage in ledger.by_chatbot().items():
+        rich_console.print(f"🔢 Token usage of {chatbot_name}: {usage}")
+    # the most recent conversations, the ledger lists them from least to most recent
+    for thread_id, usage in list(ledger.by_thread().items())[-5:]:
+        rich_console.print(f"   conversation {thread_id}: {usage}")
+    for host, host_stats in get_http_stats().items():
+        rich_console.print(
+            f"🌐 HTTP {host}: {host_stats['requests']} requests over {host_stats['connections_opened']} connections"
+            f" ({host_stats['tls_handshakes']} TLS handshakes), {host_stats['errors']} errors, {host_stats['in_flight']} in flight"
+        )
 
 
 def console(chatbot_type: Type[BaseChatBot]):
     start_chat_services()
     chatbot = chatbot_type()
     rich_console = Console()
+    # memory use after each test run, to spot growth across runs
+    memory_samples: List[int] = []
     rich_console.print(
-        f"\n[bold cyan]{chatbot.get_name()}[/bold cyan] console: type /quit to exit, /test to run tests"
+        f"\n[bold cyan]{chatbot.get_name()}[/bold cyan] console: type /quit to exit, /test to run tests, /stats for service metrics"
     )
     try:
         while True:
@@ -41,19 +109,42 @@ def console(chatbot_type: Type[BaseChatBot]):
                 case "/quit" | "/exit":
                     break
                 case "/test":
-                    handle_test_command(chatbot, rich_console)
+                    handle_test_command(chatbot, rich_console, memory_samples)
+                    continue
+                case "/stats":
+                    report_service_stats(rich_console)
                     continue
             # retrieve assistant answer
             ctx = ChatContext(
                 status_update_func=lambda msg: rich_console.print(Text(msg))
             )
-            try:
-                answer = chatbot.get_answer(question, ctx)
-            except Exception as e:
-                answer = repr(e)
-                logger.exception(answer)
-            # assistant prompt
-            rich_console.print(Panel(Markdown(answer)))
+            # assistant prompt, rendered live as the answer is streamed
+            answer = ""
+            start_time = time.perf_counter()
+            first_token_sec: float | None = None
+            with Live(
+                Panel(Markdown(answer)), console=rich_console, auto_refresh=False
+            ) as live:
+                try:
+                    for chunk in chatbot.stream_answer(question, ctx):
+                        if first_token_sec is None and chunk:
+                            first_token_sec = time.perf_counter() - start_time
+                        answer += chunk
+                        live.update(Panel(Markdown(answer)), refresh=True)
+                except Exception as e:
+                    answer = repr(e)
+                    logger.exception(answer)
+                elapsed_sec = time.perf_counter() - start_time
+                subtitle = f"{elapsed_sec:.1f} s"
+                if first_token_sec is not None:
+                    subtitle = f"TTFT {first_token_sec:.1f} s, total {subtitle}"
+                if ctx.usage.total_tokens:
+                    subtitle += f" | {ctx.usage}"
+                live.update(Panel(Markdown(answer), subtitle=subtitle), refresh=True)
+            # where the time went: LLM requests, tool calls, remote agents...
+            waterfall = format_waterfall(ctx.get_waterfall())
+            if waterfall:
+                rich_console.print(Text(waterfall, style="dim"))
     except (KeyboardInterrupt, EOFError):
         print()
         logger.warning("Interrupted by user. Shutting down...")
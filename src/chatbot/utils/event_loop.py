@@ -0,0 +1,60 @@
+"""
+Process-wide event loop, running on a background thread.
+
+Lets synchronous code call coroutines without creating a new event loop per call,
+so async clients and their pooled connections are reused across calls.
+Usage:
+     tools = run_sync(mcp_client.get_tools())
+     for chunk in iterate_sync(chatbot.astream_answer(question, ctx)):
+         print(chunk, end="")
+"""
+
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_thread: threading.Thread | None = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Returns the background event loop, starting it on first use"""
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(
+                target=_loop.run_forever, name="event-loop", daemon=True
+            )
+            _thread.start()
+        return _loop
+
+
+def run_sync(coroutine: Coroutine[Any, Any, T]) -> T:
+    """Runs the coroutine on the background event loop, blocking until it completes"""
+    loop = get_event_loop()
+    if threading.current_thread() is _thread:
+        coroutine.close()
+        # blocking here would wait forever for the loop this call is blocking
+        raise RuntimeError("run_sync() cannot be called from the background event loop")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+
+def iterate_sync(iterator: AsyncIterator[T]) -> Iterator[T]:
+    """Iterates over the async iterator on the background event loop, blocking for each item"""
+    done = object()
+
+    async def next_item() -> Any:
+        return await anext(iterator, done)
+
+    try:
+        while (item := run_sync(next_item())) is not done:
+            yield item
+    finally:
+        # e.g. when the caller stops early, so that the iterator releases its resources
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            run_sync(aclose())
@@ -0,0 +1,93 @@
+import math
+import os
+import sys
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, Iterable
+
+
+def percentile(values: Iterable[float], p: float) -> float:
+    """Returns the p-th percentile (0-100) of the values, using linear interpolation"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * p / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class Histogram:
+    """
+    Thread-safe summary of observed values, e.g. latencies or batch sizes.
+    Totals cover all observations, while percentiles are computed over
+    a bounded window of the most recent samples.
+    Usage:
+         histogram = Histogram()
+         histogram.record(0.25)
+         p95 = histogram.percentile(95)
+    """
+
+    def __init__(self, max_samples: int = 1024):
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+        self._lock = Lock()
+
+    def record(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(value)
+            self._count += 1
+            self._total += value
+            self._max = max(self._max, value)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def total(self) -> float:
+        return self._total
+
+    def mean(self) -> float:
+        with self._lock:
+            return self._total / self._count if self._count else 0.0
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            samples = list(self._samples)
+        return percentile(samples, p)
+
+    def summary(self) -> Dict[str, float]:
+        """Returns count, mean, max and the usual percentiles"""
+        with self._lock:
+            samples = list(self._samples)
+            count, total, maximum = self._count, self._total, self._max
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+            "max": maximum,
+        }
+
+
+def get_rss_bytes() -> int | None:
+    """
+    Returns the memory used by the process (resident set size), where the platform tells:
+    the current size on Linux, the peak size on other Unix systems, None otherwise.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # reported in bytes on macOS, in kilobytes elsewhere
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -0,0 +1,100 @@
+"""
+Coalescing of status updates, between a ChatContext and a slow consumer such as the UI.
+
+Agents can emit bursts of status updates, e.g. one per prompt message in debug mode,
+and the UI renders each update it receives as a separate write to the browser.
+Updates arriving within a frame interval are merged into one, and oversized ones are
+truncated when delivered, so that the work done per update stays bounded.
+Usage:
+     status_sink = CoalescingStatusSink(lambda text: events_q.put(text))
+     ctx = ChatContext(status_update_func=status_sink)
+     ...
+     status_sink.close()
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List
+from chatbot.config import config
+
+
+def _truncate(message: str, max_chars: int) -> str:
+    if len(message) <= max_chars:
+        return message
+    return f"{message[:max_chars]}...[{len(message) - max_chars} more]"
+
+
+class CoalescingStatusSink:
+    """
+    Forwards status updates to a sink, at most once per interval.
+    Updates arriving in between are delivered together, separated by blank lines,
+    once the interval has elapsed. Call close() to deliver the pending ones at once.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[str], None],
+        interval_sec: float | None = None,
+        max_chars: int | None = None,
+    ):
+        self._sink = sink
+        # fetch status updates configuration from the config file, unless given
+        status_config = config.get_status_updates_config()
+        self._interval_sec: float = (
+            status_config.get("interval_ms", 100) / 1000
+            if interval_sec is None
+            else interval_sec
+        )
+        self._max_chars: int = (
+            status_config.get("max_chars", 2000) if max_chars is None else max_chars
+        )
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._last_delivery = 0.0
+        self._timer: threading.Timer | None = None
+        self._closed = False
+        self._stats = {"received": 0, "delivered": 0}
+
+    def __call__(self, message: str) -> None:
+        with self._lock:
+            self._stats["received"] += 1
+            self._pending.append(message)
+            wait_sec = self._last_delivery + self._interval_sec - time.monotonic()
+            # once closed, late updates are delivered without delay
+            if wait_sec > 0 and not self._closed:
+                # deliver the burst when the interval has elapsed
+                if self._timer is None:
+                    self._timer = threading.Timer(wait_sec, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        """Delivers the pending updates, merged into one"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            # oversized updates are only truncated now, once per delivery
+            text = "\n\n".join(
+                _truncate(message, self._max_chars) for message in self._pending
+            )
+            self._pending = []
+            self._last_delivery = time.monotonic()
+            self._stats["delivered"] += 1
+            # delivered under the lock, so that merged updates stay in order
+            self._sink(text)
+
+    def close(self) -> None:
+        """Delivers the pending updates, and any later one without delay"""
+        with self._lock:
+            self._closed = True
+        self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Returns the updates received, and the merged updates delivered"""
+        with self._lock:
+            return self._stats.copy()
@@ -0,0 +1,107 @@
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from threading import Lock
+from typing import Any, Dict
+
+
+@dataclass
+class TokenUsage:
+    """Tokens consumed by LLM requests, and the time spent generating them"""
+
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    generation_sec: float = 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def tokens_per_sec(self) -> float:
+        """Output tokens per second of generation"""
+        return self.output_tokens / self.generation_sec if self.generation_sec else 0.0
+
+    def add(self, other: "TokenUsage") -> None:
+        self.requests += other.requests
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.generation_sec += other.generation_sec
+
+    def minus(self, other: "TokenUsage") -> "TokenUsage":
+        """Returns the usage added since other was taken"""
+        return TokenUsage(
+            requests=self.requests - other.requests,
+            input_tokens=self.input_tokens - other.input_tokens,
+            output_tokens=self.output_tokens - other.output_tokens,
+            generation_sec=self.generation_sec - other.generation_sec,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            **asdict(self),
+            "total_tokens": self.total_tokens,
+            "tokens_per_sec": self.tokens_per_sec,
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{self.input_tokens} prompt + {self.output_tokens} completion tokens"
+            f" in {self.requests} requests, {self.tokens_per_sec:.1f} tokens/s"
+        )
+
+
+class UsageLedger:
+    """
+    Thread-safe token usage totals per conversation (thread_id) and per chatbot.
+    Only the most recent conversations are kept.
+    Usage:
+         get_usage_ledger().record(usage, thread_id="123", chatbot="solutions.s04_rag")
+         totals = get_usage_ledger().by_chatbot()
+         recent = get_usage_ledger().by_thread()  # least recent conversation first
+    """
+
+    def __init__(self, max_threads: int = 1000):
+        self._max_threads = max_threads
+        self._by_thread: OrderedDict[str, TokenUsage] = OrderedDict()
+        self._by_chatbot: Dict[str, TokenUsage] = {}
+        self._lock = Lock()
+
+    def record(
+        self, usage: TokenUsage, thread_id: str | None, chatbot: str | None
+    ) -> None:
+        with self._lock:
+            if thread_id is not None:
+                self._by_thread.setdefault(thread_id, TokenUsage()).add(usage)
+                self._by_thread.move_to_end(thread_id)
+                while len(self._by_thread) > self._max_threads:
+                    self._by_thread.popitem(last=False)
+            if chatbot is not None:
+                self._by_chatbot.setdefault(chatbot, TokenUsage()).add(usage)
+
+    def by_thread(self) -> Dict[str, TokenUsage]:
+        with self._lock:
+            return {k: TokenUsage(**asdict(v)) for k, v in self._by_thread.items()}
+
+    def by_chatbot(self) -> Dict[str, TokenUsage]:
+        with self._lock:
+            return {k: TokenUsage(**asdict(v)) for k, v in self._by_chatbot.items()}
+
+
+def usage_since(
+    before: Dict[str, TokenUsage], after: Dict[str, TokenUsage]
+) -> Dict[str, TokenUsage]:
+    """Returns the usage added between two totals of the ledger, e.g. during a test run"""
+    return {
+        key: usage.minus(before.get(key, TokenUsage()))
+        for key, usage in after.items()
+        if usage.requests != before.get(key, TokenUsage()).requests
+    }
+
+
+_ledger = UsageLedger()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Returns the process-wide usage totals"""
+    return _ledger
@@ -0,0 +1,79 @@
+"""
+Latency waterfall of an answer: when each LLM request, tool call, A2A hop or retrieval
+started and ended, nested under the step that made it.
+
+Usage:
+     ctx = ChatContext()
+     answer = chatbot.get_answer(question, ctx)
+     print(format_waterfall(ctx.get_waterfall()))
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+
+@dataclass
+class LatencySpan:
+    """Timing of a step of an answer, in seconds since the answer started"""
+
+    name: str
+    # llm, tool, a2a, retrieval...
+    kind: str
+    start_sec: float
+    end_sec: float | None = None
+    # when the first token was streamed, for LLM requests
+    first_token_sec: float | None = None
+    # nesting level, 0 for steps made directly by the chatbot
+    depth: int = 0
+    error: bool = False
+
+    @property
+    def duration_sec(self) -> float:
+        return (self.end_sec or self.start_sec) - self.start_sec
+
+
+def summarize_waterfall(spans: List[LatencySpan]) -> Dict[str, Tuple[int, float]]:
+    """Returns the number of steps and their total duration, per kind of step"""
+    summary: Dict[str, Tuple[int, float]] = {}
+    for span in spans:
+        count, duration_sec = summary.get(span.kind, (0, 0.0))
+        summary[span.kind] = (count + 1, duration_sec + span.duration_sec)
+    return summary
+
+
+def format_latency_breakdown(spans: List[LatencySpan]) -> str:
+    """Formats the time spent per kind of step on one line, nested steps included"""
+    first_token_sec = sum(
+        span.first_token_sec - span.start_sec
+        for span in spans
+        if span.first_token_sec is not None
+    )
+    parts = []
+    for kind, (count, duration_sec) in summarize_waterfall(spans).items():
+        part = f"{kind} {duration_sec:.2f} s in {count} {'call' if count == 1 else 'calls'}"
+        if kind == "llm" and first_token_sec:
+            part += f" (waiting for first tokens {first_token_sec:.2f} s)"
+        parts.append(part)
+    return ", ".join(parts)
+
+
+def format_waterfall(spans: List[LatencySpan], width: int = 30) -> str:
+    """Formats the steps as a text chart, one line per step in order of start time"""
+    if not spans:
+        return ""
+    total_sec = max(span.end_sec or span.start_sec for span in spans) or 1e-9
+    lines = []
+    for span in spans:
+        offset = min(width - 1, int(span.start_sec / total_sec * width))
+        length = max(1, round(span.duration_sec / total_sec * width))
+        bar = (" " * offset + "█" * length)[:width].ljust(width)
+        line = (
+            f"{span.start_sec:6.2f} s |{bar}| {span.duration_sec:6.2f} s "
+            f"{'  ' * span.depth}{span.kind} {span.name}"
+        )
+        if span.first_token_sec is not None:
+            line += f" (first token {span.first_token_sec - span.start_sec:.2f} s)"
+        if span.error:
+            line += " ❌"
+        lines.append(line)
+    return "\n".join(lines)
@@ -1,6 +1,8 @@
+import asyncio
 import atexit
 import threading
 import time
+import uuid
 from queue import Queue
 from dataclasses import dataclass
 from pathlib import Path
@@ -10,8 +12,13 @@ import streamlit as st
 from streamlit_chat import message as st_chat_message
 from user_interface.select_chatbot import list_chatbot_names, load_chatbot
 from chatbot.chat_context import ChatContext
-from chatbot.chat_history import user_message, assistant_message, ChatHistory, ChatRole
+from chatbot.chat_history import user_message, assistant_message, ChatRole
+from chatbot.config import config
+from chatbot.services.sqlite_chat_history import create_chat_history
+from chatbot.utils.event_loop import get_event_loop
 from chatbot.utils.logging import configure_logging
+from chatbot.utils.status_sink import CoalescingStatusSink
+from chatbot.utils.waterfall import format_waterfall
 from chatbot.utils.telemetry import Telemetry
 
 configure_logging()
@@ -52,7 +59,17 @@ def status_widget_label() -> str:
             label = "Done"
         case "error":
             label = "Error"
-    return f"{label} `{elapsed_sec:.1f} s`"
+    label = f"{label} `{elapsed_sec:.1f} s`"
+    # time to first token: how long the user waited before the answer started to appear
+    first_token_time = st.session_state.status["first_token_time"]
+    if first_token_time is not None:
+        ttft_sec = first_token_time - st.session_state.status["start_time"]
+        label += f" TTFT `{ttft_sec:.1f} s`"
+    # tokens consumed by all LLM requests behind the answer
+    usage = st.session_state.status["usage"]
+    if usage is not None and usage.total_tokens:
+        label += f" `{usage.total_tokens} tokens` `{usage.tokens_per_sec:.0f} tokens/s`"
+    return label
 
 
 def status_widget():
@@ -61,7 +78,7 @@ def status_widget():
         label=status_widget_label(),
         state=st.session_state.status["state"],
         expanded=expanded,
-        width=300,
+        width=500,
     )
 
 
@@ -73,8 +90,18 @@ st.set_page_config(page_title="GenAI Chat", layout="wide")
 if "profiles" not in st.session_state:
     st.session_state.profiles = create_profiles()
 # list of messages in the conversation so far
+# the conversation id is kept in the URL, so that reloading the page resumes the conversation
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = ChatHistory()
+    if "conversation" not in st.query_params:
+        st.query_params["conversation"] = uuid.uuid4().hex
+    st.session_state.chat_history = create_chat_history(st.query_params["conversation"])
+    # messages of the conversation before this session, e.g. before a restart
+    st.session_state.resumed_messages = len(st.session_state.chat_history)
+# number of latest messages displayed, grows as the user loads older ones
+if "visible_messages" not in st.session_state:
+    st.session_state.visible_messages = (
+        config.get_chat_history_config().get("store") or {}
+    ).get("page_size", 50)
 # chatbot implementation currently selected, among chatbot.lessons.*
 if "chatbot" not in st.session_state:
     all_chatbot_names = list_chatbot_names()
@@ -119,14 +146,38 @@ with right:
         st.rerun()
 
 # --- Chat history ---
-for id, msg in enumerate(st.session_state.chat_history.messages):
-    profile = st.session_state.profiles.get(msg.type, None)
-    if profile is not None and isinstance(msg.content, str):
+# the transcript is resumed from disk, but not every chatbot keeps its memory of it
+if (
+    st.session_state.resumed_messages
+    and st.session_state.chatbot is not None
+    and not st.session_state.chatbot.resumes_conversations()
+):
+    st.caption(
+        f"ℹ️ Resumed the transcript of {st.session_state.resumed_messages} messages:"
+        f" {st.session_state.chatbot.get_name()} does not remember them, and answers from a fresh memory."
+    )
+# only the latest page is rendered, older messages are loaded on demand
+total_messages = len(st.session_state.chat_history)
+if total_messages > st.session_state.visible_messages:
+    if st.button(
+        f"Show older messages ({total_messages - st.session_state.visible_messages} hidden)"
+    ):
+        st.session_state.visible_messages += (
+            config.get_chat_history_config().get("store") or {}
+        ).get("page_size", 50)
+        st.rerun()
+transcript = st.session_state.chat_history.get_transcript(
+    limit=st.session_state.visible_messages
+)
+first_id = total_messages - len(transcript)
+for id, (msg_type, content) in enumerate(transcript, start=first_id):
+    profile = st.session_state.profiles.get(msg_type, None)
+    if profile is not None and isinstance(content, str):
         # message keys have to be unique, even though the content might be repeated
         # is_user: human messages are right-aligned, while AI messages go to the left
         # allow_html: controls markdown rendering
         st_chat_message(
-            msg.content,
+            content,
             key=str(id),
             is_user=profile.role == ChatRole.HUMAN,
             logo=profile.icon,
@@ -143,7 +194,7 @@ if input:
     st.session_state.awaiting_answer = True
     st.rerun()
 
-# --- Chat phase 2: Generate answer, while streaming status updates ---
+# --- Chat phase 2: Generate answer, while streaming status updates and answer tokens ---
 if st.session_state.awaiting_answer:
     # cross-thread data
     # queue operations are atomic
@@ -156,33 +207,47 @@ if st.session_state.awaiting_answer:
         "state": "running",
         "start_time": time.perf_counter(),
         "finish_time": None,
+        "first_token_time": None,
+        "usage": None,
+        "waterfall": None,
         "events": [],
     }
 
-    # assistant thread
-    # IMPORTANT: spawned threads cannot access st.session_state!
+    # the answer is generated on the shared event loop, alongside other conversations
+    # IMPORTANT: the event loop thread cannot access st.session_state!
     chatbot = st.session_state.chatbot
     # this chat context object can be used by the chatbot to display update messages in the UI
+    # bursts of updates are merged, so that each UI write carries several of them
+    status_sink = CoalescingStatusSink(
+        lambda text: events_q.put({"type": "status", "text": text})
+    )
     ctx = ChatContext(
-        status_update_func=lambda msg: events_q.put({"type": "status", "text": msg})
+        status_update_func=status_sink,
+        conversation_id=st.query_params["conversation"],
     )
     # extract the user question, which was added to the chat history during phase 1
     question = str(
         st.session_state.chat_history.get_last_message_from(ChatRole.HUMAN).content
     )
 
-    def query_chatbot() -> None:
+    async def query_chatbot() -> None:
         try:
             if chatbot is None:
                 raise RuntimeError("Error loading chatbot")
-            answer_q.put(chatbot.get_answer(question, ctx))
+            answer = ""
+            async for chunk in chatbot.astream_answer(question, ctx):
+                answer += chunk
+                events_q.put({"type": "token", "text": chunk})
+            answer_q.put(answer)
+            status_sink.close()
             events_q.put({"type": "outcome", "state": "complete"})
         except Exception as e:
             error = repr(e)
             answer_q.put(error)
+            status_sink.close()
             events_q.put({"type": "outcome", "state": "error"})
 
-    threading.Thread(target=query_chatbot, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(query_chatbot(), get_event_loop())
 
     # ticker thread that updates the time in the status label
     # IMPORTANT: spawned threads cannot access st.session_state!
@@ -196,18 +261,36 @@ if st.session_state.awaiting_answer:
 
     threading.Thread(target=ticker, daemon=True).start()
 
-    # display status updates
-    with status_widget() as status:
+    # display status updates, followed by the answer as it is being generated
+    status = status_widget()
+    answer_placeholder = st.empty()
+    with status:
 
         def stream_status_updates():
+            partial_answer = ""
             while True:
                 event = events_q.get()
                 if event["type"] == "tick":
                     status.update(label=status_widget_label())
+                elif event["type"] == "token":
+                    if (
+                        st.session_state.status["first_token_time"] is None
+                        and event["text"]
+                    ):
+                        st.session_state.status["first_token_time"] = (
+                            time.perf_counter()
+                        )
+                    partial_answer += event["text"]
+                    answer_placeholder.markdown(partial_answer)
                 elif event["type"] == "outcome":
                     # inference is done: capture outcome and time, stop ticker
                     st.session_state.status["state"] = event["state"]
                     st.session_state.status["finish_time"] = time.perf_counter()
+                    st.session_state.status["usage"] = ctx.usage
+                    # where the time went: LLM requests, tool calls, remote agents...
+                    st.session_state.status["waterfall"] = format_waterfall(
+                        ctx.get_waterfall()
+                    )
                     stop_ticker.set()
                     break
                 else:
@@ -227,3 +310,5 @@ elif st.session_state.status is not None:
     with status_widget():
         for line in st.session_state.status["events"]:
             st.write(line)
+        if st.session_state.status.get("waterfall"):
+            st.code(st.session_state.status["waterfall"], language=None)